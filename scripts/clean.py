@@ -5,6 +5,10 @@ Clean up temporary files and cache
 import os
 import shutil
 import glob
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
 
 def clean_cache():
     """Remove Python cache files"""
@@ -61,19 +65,32 @@ def clean_logs():
         os.remove(log_file)
 
 def clean_temp_data():
-    """Remove temporary data files"""
-    print("Cleaning temporary data files...")
+    """Apply the snapshot retention policy and remove temporary files"""
+    print("Compacting old snapshots...")
+    
+    # Snapshot cũ được nén vào archive thay vì bị xóa; database, universe
+    # và trạng thái chỉ báo trong data/ được giữ nguyên
+    import config
+    if os.path.isdir(config.DELTA_DIR) and os.path.isdir(config.CHUNK_DIR):
+        from retention import RetentionEngine
+        result = RetentionEngine().run()
+        print(f"Released {result['deltas_released']} delta versions, compacted {result['compacted']} "
+              f"snapshots, removed {result['chunks_removed']} unused chunks")
+    else:
+        # Không tạo data/deltas, data/chunks khi chưa có dữ liệu để dọn
+        print("No snapshot stores found, skipping")
+    
+    print("Cleaning temporary files...")
     
+    # File tạm còn sót lại từ các lần ghi nguyên tử bị gián đoạn
     temp_patterns = [
-        'data/*.json',
-        'data/*.csv',
-        'data/*.db',
+        'data/**/*.tmp',
         '*.tmp',
         '*.temp'
     ]
     
     for pattern in temp_patterns:
-        for file_path in glob.glob(pattern):
+        for file_path in glob.glob(pattern, recursive=True):
             print(f"Removing: {file_path}")
             os.remove(file_path)
 
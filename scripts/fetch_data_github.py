@@ -10,19 +10,24 @@ from datetime import datetime
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
 
-from financial_data_fetcher import FinancialDataFetcher
-from financial_data_fetcher.utils import create_summary_report, get_data_quality_score
+from assets import build_summary
+from financial_data_fetcher import FinancialDataFetcher, json_default
+from delta import DeltaStore
+from publish import Publisher, minify_json, write_bytes_atomic
+from utils import create_summary_report, get_data_quality_score
+
+# Số entry giữ lại trong historical_data.json
+HISTORY_LENGTH = 90
+# Số keyframe (cùng các delta sau chúng) giữ lại trong docs/data/snapshots
+SNAPSHOT_KEYFRAMES = 4
 
 def main():
-    """Fetch dữ liệu và lưu vào file JSON"""
+    """Fetch dữ liệu và publish cho website trong một lượt"""
     
     print("Starting financial data fetch for GitHub Pages...")
     
     # Tạo thư mục docs nếu chưa có
     docs_dir = "docs"
-    if not os.path.exists(docs_dir):
-        os.makedirs(docs_dir)
-    
     data_dir = os.path.join(docs_dir, "data")
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
@@ -31,44 +36,11 @@ def main():
     fetcher = FinancialDataFetcher()
     
     try:
-        # Fetch dữ liệu
+        # Fetch dữ liệu (snapshot được ghi một lần bởi publish_data)
         print("Fetching financial data...")
-        data = fetcher.fetch_all_data()
-        
-        # Lưu dữ liệu chi tiết
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        detailed_file = os.path.join(data_dir, f"financial_data_{timestamp}.json")
-        
-        with open(detailed_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        # Lưu dữ liệu mới nhất (overwrite)
-        latest_file = os.path.join(data_dir, "latest_data.json")
-        with open(latest_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        # Tạo summary data cho website
-        summary_data = create_summary_data(data)
-        summary_file = os.path.join(data_dir, "summary_data.json")
-        
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            json.dump(summary_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"Data saved to {detailed_file}")
-        print(f"Latest data saved to {latest_file}")
-        print(f"Summary data saved to {summary_file}")
-        
-        # Tạo báo cáo text
-        report = create_summary_report(data)
-        report_file = os.path.join(docs_dir, "latest_report.txt")
-        
-        with open(report_file, 'w', encoding='utf-8') as f:
-            f.write(report)
+        data = fetcher.fetch_all_data(save=False)
         
-        print(f"Report saved to {report_file}")
-        
-        # Cập nhật historical data
-        update_historical_data(data)
+        publish_data(data, docs_dir)
         
         print("Financial data fetch completed successfully!")
         
@@ -76,108 +48,113 @@ def main():
         print(f"Error fetching financial data: {str(e)}")
         raise
 
-def create_summary_data(data):
-    """Tạo dữ liệu summary cho website"""
+def publish_data(data, docs_dir="docs", now=None):
+    """
+    Tính các artifact dẫn xuất và ghi toàn bộ output trong một lượt
+
+    Quality score và summary được tính một lần rồi dùng chung cho summary,
+    báo cáo và lịch sử; mỗi payload được serialize một lần và cùng một
+    chuỗi bytes được ghi ra file cố định lẫn bản publish theo hash. Lịch sử
+    snapshot được lưu trong docs/data/snapshots dạng keyframe + delta, chỉ
+    giữ SNAPSHOT_KEYFRAMES keyframe gần nhất. Mọi file được ghi nguyên tử
+    (file tạm + os.replace).
+
+    Args:
+        data: Snapshot từ fetch_all_data
+        docs_dir: Thư mục gốc của website
+        now: Thời điểm publish (mặc định hiện tại)
+
+    Returns:
+        Dict tên file -> đường dẫn đã ghi
+    """
+    now = now or datetime.now()
+    data_dir = os.path.join(docs_dir, "data")
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
     
-    summary = {
-        "timestamp": datetime.now().isoformat(),
-        "update_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC"),
-        "data_quality": get_data_quality_score(data),
-        "assets": {}
+    # Các artifact dẫn xuất, mỗi cái được tính đúng một lần
+    quality = get_data_quality_score(data)
+    summary_data = create_summary_data(data, quality=quality, now=now)
+    historical_data = update_historical_data(summary_data, now=now,
+                                             historical_file=os.path.join(data_dir, "historical_data.json"))
+    report = create_summary_report(data, quality=quality)
+    
+    # Mỗi payload được serialize đúng một lần
+    payloads = {
+        "latest_data.json": minify_json(data, json_default),
+        "summary_data.json": minify_json(summary_data),
+        "historical_data.json": minify_json(historical_data)
     }
     
-    # Precious Metals
-    if 'precious_metals' in data:
-        metals = data['precious_metals']
-        
-        if 'gold' in metals and 'current_price' in metals['gold']:
-            summary["assets"]["gold"] = {
-                "name": "Gold",
-                "price": metals['gold']['current_price'],
-                "change": metals['gold'].get('change', 0),
-                "change_percent": metals['gold'].get('change_percent', 0),
-                "currency": "USD",
-                "unit": "oz"
-            }
-        
-        if 'silver' in metals and 'current_price' in metals['silver']:
-            summary["assets"]["silver"] = {
-                "name": "Silver",
-                "price": metals['silver']['current_price'],
-                "change": metals['silver'].get('change', 0),
-                "change_percent": metals['silver'].get('change_percent', 0),
-                "currency": "USD",
-                "unit": "oz"
-            }
-    
-    # Stock Indices
-    if 'stock_indices' in data:
-        indices = data['stock_indices']
-        
-        if 'dow_jones' in indices and 'current_price' in indices['dow_jones']:
-            summary["assets"]["dow_jones"] = {
-                "name": "Dow Jones",
-                "price": indices['dow_jones']['current_price'],
-                "change": indices['dow_jones'].get('change', 0),
-                "change_percent": indices['dow_jones'].get('change_percent', 0),
-                "currency": "USD",
-                "unit": "points"
-            }
-        
-        if 'vn_index' in indices and 'current_price' in indices['vn_index']:
-            summary["assets"]["vn_index"] = {
-                "name": "VN Index",
-                "price": indices['vn_index']['current_price'],
-                "change": indices['vn_index'].get('change', 0),
-                "change_percent": indices['vn_index'].get('change_percent', 0),
-                "currency": "VND",
-                "unit": "points"
-            }
-    
-    # Bond Yields
-    if 'bond_yields' in data:
-        bonds = data['bond_yields']
-        
-        if 'us_10y_bond_yahoo' in bonds and 'current_price' in bonds['us_10y_bond_yahoo']:
-            summary["assets"]["us_10y_bond"] = {
-                "name": "US 10Y Treasury",
-                "price": bonds['us_10y_bond_yahoo']['current_price'],
-                "change": bonds['us_10y_bond_yahoo'].get('change', 0),
-                "change_percent": bonds['us_10y_bond_yahoo'].get('change_percent', 0),
-                "currency": "USD",
-                "unit": "%"
-            }
-    
-    # FX Rates
-    if 'fx' in data:
-        fx = data['fx']
-        
-        if 'usd_vnd' in fx and 'current_price' in fx['usd_vnd']:
-            summary["assets"]["usd_vnd"] = {
-                "name": "USD/VND",
-                "price": fx['usd_vnd']['current_price'],
-                "change": fx['usd_vnd'].get('change', 0),
-                "change_percent": fx['usd_vnd'].get('change_percent', 0),
-                "currency": "VND",
-                "unit": "rate"
-            }
-        
-        if 'eur_usd' in fx and 'current_price' in fx['eur_usd']:
-            summary["assets"]["eur_usd"] = {
-                "name": "EUR/USD",
-                "price": fx['eur_usd']['current_price'],
-                "change": fx['eur_usd'].get('change', 0),
-                "change_percent": fx['eur_usd'].get('change_percent', 0),
-                "currency": "USD",
-                "unit": "rate"
-            }
+    # Snapshot được lưu dạng keyframe + delta thay vì một bản đầy đủ mỗi lần
+    deltas = DeltaStore(os.path.join(data_dir, "snapshots"))
+    version = deltas.append(json.loads(payloads["latest_data.json"]), normalized=True)
+    written = {f"snapshot version {version}": deltas.directory}
+    # Mỗi lần chạy CI thêm một phiên bản: bỏ các keyframe cũ để thư mục không lớn mãi
+    keyframes = deltas.index["keyframes"]
+    if len(keyframes) > SNAPSHOT_KEYFRAMES:
+        deltas.truncate(keyframes[-SNAPSHOT_KEYFRAMES])
+    
+    publisher = Publisher(data_dir)
+    for name, content in payloads.items():
+        path = os.path.join(data_dir, name)
+        write_bytes_atomic(path, content)
+        written[name] = path
+        publisher.publish_bytes(name, content)
+    publisher.write_manifest(
+        generated_at=summary_data["timestamp"],
+        # index.html giữ bản đã dựng trong localStorage: nếu phiên bản đó >= keyframe
+        # thì chỉ tải các d_<v>.json còn thiếu, nếu không thì tải k_<keyframe>.json
+        snapshots={"path": "snapshots", "version": version,
+                   "keyframe": deltas.index["keyframes"][-1]}
+    )
+    written["manifest.json"] = publisher.manifest_path
+    
+    report_file = os.path.join(docs_dir, "latest_report.txt")
+    write_bytes_atomic(report_file, report.encode("utf-8"))
+    written["latest_report.txt"] = report_file
+    
+    for name, path in written.items():
+        print(f"Saved {name} to {path}")
+    print(f"Historical data updated with {len(historical_data)} entries")
+    return written
+
+def create_summary_data(data, quality=None, now=None):
+    """
+    Tạo dữ liệu summary cho website
+
+    Args:
+        data: Snapshot từ fetch_all_data
+        quality: Kết quả get_data_quality_score(data) đã tính sẵn
+        now: Thời điểm tạo summary (mặc định hiện tại)
+    """
+    
+    now = now or datetime.now()
+    summary = {
+        "timestamp": now.isoformat(),
+        "update_time": now.strftime("%Y-%m-%d %H:%M:%S UTC"),
+        "data_quality": quality or get_data_quality_score(data),
+        # Một dòng cho mỗi tài sản trong registry (assets.ASSETS)
+        "assets": build_summary(data)
+    }
     
     return summary
 
-def update_historical_data(current_data):
-    """Cập nhật dữ liệu lịch sử"""
+def update_historical_data(summary_data, now=None, historical_file=None):
+    """
+    Thêm summary hiện tại vào dữ liệu lịch sử
+
+    Args:
+        summary_data: Kết quả create_summary_data của lần fetch này
+        now: Thời điểm của entry (mặc định hiện tại)
+        historical_file: File lịch sử hiện có
+
+    Returns:
+        List entry lịch sử (HISTORY_LENGTH entry gần nhất); caller ghi file
+    """
     
-    historical_file = os.path.join("docs", "data", "historical_data.json")
+    now = now or datetime.now()
+    historical_file = historical_file or os.path.join("docs", "data", "historical_data.json")
     
     # Đọc dữ liệu lịch sử hiện tại
     historical_data = []
@@ -189,24 +166,15 @@ def update_historical_data(current_data):
             print(f"Error reading historical data: {e}")
             historical_data = []
     
-    # Tạo entry mới
-    new_entry = {
-        "timestamp": datetime.now().isoformat(),
-        "date": datetime.now().strftime("%Y-%m-%d"),
-        "data": create_summary_data(current_data)
-    }
-    
     # Thêm entry mới
-    historical_data.append(new_entry)
+    historical_data.append({
+        "timestamp": now.isoformat(),
+        "date": now.strftime("%Y-%m-%d"),
+        "data": summary_data
+    })
     
     # Giữ lại 90 ngày gần nhất
-    historical_data = historical_data[-90:]
-    
-    # Lưu lại
-    with open(historical_file, 'w', encoding='utf-8') as f:
-        json.dump(historical_data, f, indent=2, ensure_ascii=False)
-    
-    print(f"Historical data updated with {len(historical_data)} entries")
+    return historical_data[-HISTORY_LENGTH:]
 
 if __name__ == "__main__":
     main()
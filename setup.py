@@ -41,10 +41,16 @@ setup(
             "flake8>=3.9",
             "mypy>=0.910",
         ],
+        "parquet": [
+            "pyarrow>=12.0",
+        ],
+        "compression": [
+            "brotli>=1.0",
+        ],
     },
     entry_points={
         "console_scripts": [
-            "financial-data-fetcher=financial_data_fetcher.example:main",
+            "financial-data-fetcher=cli:main",
         ],
     },
     include_package_data=True,
@@ -19,12 +19,18 @@ __version__ = "1.0.0"
 __author__ = "Your Name"
 __email__ = "your.email@example.com"
 
-# Import main modules
-from .financial_data_fetcher import FinancialDataFetcher
-from .dashboard import Dashboard
-from .scheduler import Scheduler
-from . import utils
-from . import config
+import importlib
+
+# Các thành phần được import khi truy cập lần đầu (PEP 562), để
+# "import financial_data_fetcher" không kéo theo dash, plotly, yfinance,
+# pandas và numpy: tên -> (module, thuộc tính; None = chính module)
+_LAZY_ATTRIBUTES = {
+    "FinancialDataFetcher": ("financial_data_fetcher", "FinancialDataFetcher"),
+    "Dashboard": ("dashboard", "FinancialDashboard"),
+    "Scheduler": ("scheduler", "FinancialDataScheduler"),
+    "config": ("config", None),
+    "utils": ("utils", None),
+}
 
 __all__ = [
     "FinancialDataFetcher",
@@ -32,4 +38,18 @@ __all__ = [
     "Scheduler",
     "config",
     "utils"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY_ATTRIBUTES[name]
+    module = importlib.import_module(f".{module_name}", __name__)
+    value = module if attribute is None else getattr(module, attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
@@ -0,0 +1,189 @@
+"""
+Declarative asset registry and a generic one-pass summary builder
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import config
+
+
+@dataclass(frozen=True)
+class AssetSpec:
+    """
+    Description of one displayed asset
+
+    Attributes:
+        key: Asset id used in summaries and element ids
+        name: Display name
+        path: (section, key) of the quote in a fetch_all_data snapshot
+        group: Display group (see ASSET_GROUPS)
+        symbol: Ticker used for history charts
+        currency: Quote currency
+        unit: Quote unit
+        price_format: str.format pattern for the price
+        change_format: str.format pattern for the absolute change
+        color: Accent color on the dashboard
+    """
+
+    key: str
+    name: str
+    path: Tuple[str, str]
+    group: str
+    symbol: Optional[str] = None
+    currency: str = "USD"
+    unit: str = "points"
+    price_format: str = "{:,.2f}"
+    change_format: str = "{:+.2f}"
+    color: str = "#1f77b4"
+
+    def format_price(self, price: float) -> str:
+        return self.price_format.format(price)
+
+    def format_change(self, change: float) -> str:
+        return self.change_format.format(change)
+
+
+# Display groups in page order: key -> (title, report heading)
+ASSET_GROUPS = {
+    "precious_metals": ("Precious Metals", "PRECIOUS METALS"),
+    "stock_indices": ("Stock Indices", "STOCK INDICES"),
+    "bonds": ("Bond Yields", "BOND YIELDS"),
+    "fx": ("Foreign Exchange", "FOREIGN EXCHANGE"),
+}
+
+ASSETS: List[AssetSpec] = [
+    AssetSpec("gold", "Gold", ("precious_metals", "gold"), "precious_metals",
+              symbol=config.SYMBOLS["gold"], unit="oz", price_format="${:,.2f}", color="#FFD700"),
+    AssetSpec("silver", "Silver", ("precious_metals", "silver"), "precious_metals",
+              symbol=config.SYMBOLS["silver"], unit="oz", price_format="${:,.2f}", color="#C0C0C0"),
+    AssetSpec("dow_jones", "Dow Jones", ("stock_indices", "dow_jones"), "stock_indices",
+              symbol=config.SYMBOLS["dow_jones"], color="#1f77b4"),
+    AssetSpec("vn_index", "VN Index", ("stock_indices", "vn_index"), "stock_indices",
+              symbol=config.SYMBOLS["vn_index"], currency="VND", color="#ff7f0e"),
+    AssetSpec("us_10y_bond", "US 10Y Treasury", ("bond_yields", "us_10y_bond_yahoo"), "bonds",
+              symbol=config.SYMBOLS["us_10y_bond"], unit="%", price_format="{:.2f}%", color="#2ca02c"),
+    AssetSpec("usd_vnd", "USD/VND", ("fx", "usd_vnd"), "fx",
+              symbol=config.SYMBOLS["usd_vnd"], currency="VND", unit="rate",
+              price_format="{:,.0f}", color="#d62728"),
+    AssetSpec("eur_usd", "EUR/USD", ("fx", "eur_usd"), "fx",
+              symbol=config.SYMBOLS["eur_usd"], unit="rate", price_format="{:.4f}",
+              change_format="{:+.4f}", color="#9467bd"),
+]
+
+
+def iter_quotes(data: Optional[Dict[str, Any]],
+                registry: Sequence[AssetSpec] = ASSETS) -> Iterator[Tuple[AssetSpec, Optional[Dict[str, Any]]]]:
+    """
+    Pair every registered asset with its quote in a snapshot
+
+    Each asset costs two dict lookups, so the pass is linear in the size of
+    the registry.
+
+    Args:
+        data: Snapshot from fetch_all_data (None or {} yields no quotes)
+        registry: Assets to look up
+
+    Yields:
+        Tuples (spec, quote dict or None if missing or without a price)
+    """
+    data = data or {}
+    for spec in registry:
+        section, key = spec.path
+        quote = (data.get(section) or {}).get(key)
+        if not isinstance(quote, dict) or quote.get("current_price") is None:
+            quote = None
+        yield spec, quote
+
+
+def build_summary(data: Optional[Dict[str, Any]],
+                  registry: Sequence[AssetSpec] = ASSETS) -> Dict[str, Dict[str, Any]]:
+    """
+    Summary rows of all assets present in a snapshot
+
+    Args:
+        data: Snapshot from fetch_all_data
+        registry: Assets to summarize
+
+    Returns:
+        Dict asset key -> {name, price, change, change_percent, currency, unit}
+    """
+    return {
+        spec.key: {
+            "name": spec.name,
+            "price": quote["current_price"],
+            "change": quote.get("change", 0),
+            "change_percent": quote.get("change_percent", 0),
+            "currency": spec.currency,
+            "unit": spec.unit
+        }
+        for spec, quote in iter_quotes(data, registry) if quote is not None
+    }
+
+
+def display_rows(summary: Dict[str, Dict[str, Any]],
+                 registry: Sequence[AssetSpec] = ASSETS) -> List[Dict[str, Any]]:
+    """
+    Formatted rows for pages and reports, in registry order
+
+    Args:
+        summary: Result of build_summary (or the "assets" of summary_data.json)
+        registry: Assets to format
+
+    Returns:
+        List of dicts with spec, group, price, change, change_percent and the
+        formatted price_text, change_text and change_percent_text
+    """
+    rows = []
+    for spec in registry:
+        row = summary.get(spec.key)
+        if row is None:
+            continue
+        change_percent = row.get("change_percent") or 0
+        rows.append({
+            "spec": spec,
+            "group": spec.group,
+            "name": row.get("name", spec.name),
+            "price": row["price"],
+            "change": row.get("change") or 0,
+            "change_percent": change_percent,
+            "price_text": spec.format_price(row["price"]),
+            "change_text": spec.format_change(row.get("change") or 0),
+            "change_percent_text": f"{change_percent:+.2f}%"
+        })
+    return rows
+
+
+def grouped_rows(rows: List[Dict[str, Any]]) -> List[Tuple[str, Tuple[str, str], List[Dict[str, Any]]]]:
+    """
+    Split display rows by group in ASSET_GROUPS order
+
+    Returns:
+        List of (group key, (title, report heading), rows), non-empty groups only
+    """
+    by_group: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_group.setdefault(row["group"], []).append(row)
+    return [(group, ASSET_GROUPS.get(group, (group, group.upper())), by_group[group])
+            for group in list(ASSET_GROUPS) + [g for g in by_group if g not in ASSET_GROUPS]
+            if group in by_group]
+
+
+def report_lines(summary: Dict[str, Dict[str, Any]],
+                 registry: Sequence[AssetSpec] = ASSETS) -> List[str]:
+    """
+    Text report lines of all assets, grouped under their headings
+
+    Args:
+        summary: Result of build_summary
+        registry: Assets to report
+
+    Returns:
+        Report lines (each group followed by a blank line)
+    """
+    lines = []
+    for _, (_, heading), rows in grouped_rows(display_rows(summary, registry)):
+        lines.append(f"{heading}:")
+        lines.extend(f"  {row['name']}: {row['price_text']}" for row in rows)
+        lines.append("")
+    return lines
@@ -0,0 +1,160 @@
+"""
+Parallel historical backfill with chunked date ranges and resumable checkpoints
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+import config
+from financial_data_fetcher import FinancialDataFetcher
+from storage import DataStore
+
+
+def split_date_range(start: str, end: str, chunk_days: int) -> List[Tuple[str, str]]:
+    """
+    Split [start, end) into consecutive date chunks
+
+    Args:
+        start: Start date (YYYY-MM-DD, inclusive)
+        end: End date (YYYY-MM-DD, exclusive)
+        chunk_days: Maximum number of days per chunk
+
+    Returns:
+        List of (chunk_start, chunk_end) ISO date pairs
+    """
+    if chunk_days < 1:
+        raise ValueError("Chunk size must be at least 1 day")
+
+    current = date.fromisoformat(start)
+    stop = date.fromisoformat(end)
+    chunks = []
+    while current < stop:
+        chunk_end = min(current + timedelta(days=chunk_days), stop)
+        chunks.append((current.isoformat(), chunk_end.isoformat()))
+        current = chunk_end
+    return chunks
+
+
+class BackfillEngine:
+    """
+    Lớp backfill dữ liệu lịch sử: chia lịch sử mỗi mã thành các chunk theo
+    ngày, tải song song qua rate limiter của fetcher và ghi thẳng vào store.
+    Mỗi chunk hoàn tất được checkpoint nên có thể chạy lại để tiếp tục.
+    """
+
+    def __init__(self, fetcher: Optional[FinancialDataFetcher] = None,
+                 store: Optional[DataStore] = None,
+                 chunk_days: Optional[int] = None,
+                 max_workers: Optional[int] = None):
+        self.fetcher = fetcher or FinancialDataFetcher()
+        self.store = store or DataStore()
+        self.chunk_days = chunk_days or config.BACKFILL_CHUNK_DAYS
+        self.max_workers = max_workers or config.MAX_WORKERS
+        self.fred_series = set(config.FRED_SERIES.values())
+
+    def _fetch_chunk(self, symbol: str, chunk_start: str, chunk_end: str) -> pd.DataFrame:
+        """Tải một chunk từ nguồn phù hợp (FRED hoặc Yahoo Finance)"""
+        if symbol in self.fred_series:
+            # FRED dùng observation_end bao gồm ngày cuối
+            last_day = (date.fromisoformat(chunk_end) - timedelta(days=1)).isoformat()
+            return self.fetcher.fetch_fred_observations(symbol, chunk_start, last_day)
+        return self.fetcher.fetch_yahoo_history(symbol, chunk_start, chunk_end)
+
+    def plan(self, symbols: List[str], start: str, end: str) -> List[Tuple[str, str, str]]:
+        """
+        Tạo danh sách chunk còn thiếu (bỏ qua các chunk đã checkpoint)
+
+        Returns:
+            List các tuple (symbol, chunk_start, chunk_end)
+        """
+        chunks = split_date_range(start, end, self.chunk_days)
+        tasks = []
+        for symbol in symbols:
+            completed = self.store.completed_chunks(symbol)
+            tasks.extend(
+                (symbol, chunk_start, chunk_end)
+                for chunk_start, chunk_end in chunks
+                if (chunk_start, chunk_end) not in completed
+            )
+        return tasks
+
+    def run(self, symbols: List[str], start: Optional[str] = None,
+            end: Optional[str] = None) -> Dict[str, int]:
+        """
+        Chạy backfill cho danh sách mã
+
+        Args:
+            symbols: Danh sách mã (Yahoo Finance hoặc FRED series ID)
+            start: Ngày bắt đầu (mặc định config.BACKFILL_START)
+            end: Ngày kết thúc, không bao gồm (mặc định ngày mai)
+
+        Returns:
+            Dict thống kê số chunk, số dòng và số lỗi
+        """
+        start = start or config.BACKFILL_START
+        end = end or (date.today() + timedelta(days=1)).isoformat()
+        tasks = self.plan(symbols, start, end)
+
+        stats = {"chunks": len(tasks), "completed": 0, "failed": 0, "rows": 0}
+        if not tasks:
+            return stats
+
+        def store_result(future, task):
+            symbol, chunk_start, chunk_end = task
+            try:
+                hist = future.result()
+            except Exception as e:
+                self.store.save_error(
+                    symbol, f"Backfill {chunk_start}..{chunk_end} failed: {str(e)}"
+                )
+                stats["failed"] += 1
+                return
+
+            stats["rows"] += self.store.save_backfill_chunk(
+                symbol, chunk_start, chunk_end, hist
+            )
+            stats["completed"] += 1
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {}
+            for task in tasks:
+                pending[executor.submit(self._fetch_chunk, *task)] = task
+
+                # Giới hạn số chunk đang chờ; future đã ghi được bỏ khỏi dict
+                # để DataFrame của nó được giải phóng ngay
+                if len(pending) >= self.max_workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        store_result(future, pending.pop(future))
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    store_result(future, pending.pop(future))
+
+        return stats
+
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+    from universe import load_universe
+
+    parser = argparse.ArgumentParser(description="Backfill historical data into the store")
+    parser.add_argument("symbols", nargs="*", help="Symbols (default: whole universe)")
+    parser.add_argument("--start", default=config.BACKFILL_START)
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--chunk-days", type=int, default=config.BACKFILL_CHUNK_DAYS)
+    parser.add_argument("--workers", type=int, default=config.MAX_WORKERS)
+    args = parser.parse_args()
+
+    symbols = args.symbols or [entry["symbol"] for entry in load_universe()]
+    engine = BackfillEngine(chunk_days=args.chunk_days, max_workers=args.workers)
+
+    print(f"Backfilling {len(symbols)} symbols from {args.start}...")
+    started = datetime.now()
+    stats = engine.run(symbols, start=args.start, end=args.end)
+    print(f"Backfill completed in {datetime.now() - started}: {stats}")
@@ -0,0 +1,300 @@
+"""
+Content-addressed storage of historical bars shared across snapshots
+
+Snapshot files keep their quotes inline, but every history container is
+replaced by a reference
+
+    {"$chunks": [hash, ...], "$kind": "records" | "columns", "$meta": {...}}
+
+to immutable chunk objects stored once under ``objects/<hh>/<hash>.json``.
+Chunk boundaries are content-defined (a bar ends a chunk when the hash of
+its serialized form hits a target modulus), so a history window that shifts
+or grows between snapshots reproduces the same chunks and is stored once.
+"""
+
+import glob
+import json
+import os
+import time
+import zlib
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import config
+from publish import content_hash, minify_json, write_bytes_atomic
+from utils import HISTORY_KEYS
+
+SNAPSHOT_PATTERN = "financial_data_*.json"
+
+CHUNK_KEY = "$chunks"
+
+# Độ dài hash của chunk (128 bit, đủ để bỏ qua khả năng trùng)
+DIGEST_LENGTH = 32
+
+
+def _row_bytes(row: Any) -> bytes:
+    return json.dumps(row, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def chunk_boundaries(rows: List[bytes], target: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    Content-defined chunk ranges of serialized rows
+
+    A chunk ends after a row whose CRC32 is divisible by ``target`` (so
+    chunks average ``target`` rows) or after 4 * target rows.
+
+    Args:
+        rows: Serialized rows
+        target: Average rows per chunk (default CHUNK_TARGET_ROWS)
+
+    Returns:
+        List of (start, end) row ranges covering all rows
+    """
+    target = target or config.CHUNK_TARGET_ROWS
+    ranges = []
+    start = 0
+    for position, row in enumerate(rows):
+        if zlib.crc32(row) % target == 0 or position + 1 - start >= 4 * target:
+            ranges.append((start, position + 1))
+            start = position + 1
+    if start < len(rows):
+        ranges.append((start, len(rows)))
+    return ranges
+
+
+class ChunkStore:
+    """
+    Lớp lưu các chunk bars theo hash nội dung và các snapshot tham chiếu chúng
+
+    Mỗi chunk chỉ được ghi một lần (bỏ qua nếu đã tồn tại); chunk không còn
+    snapshot nào tham chiếu được xóa bởi collect_garbage.
+    """
+
+    def __init__(self, directory: Optional[str] = None, snapshot_dir: Optional[str] = None):
+        self.directory = directory or config.CHUNK_DIR
+        self.snapshot_dir = snapshot_dir or config.DATA_DIR
+        self.objects_dir = os.path.join(self.directory, "objects")
+        if not os.path.exists(self.objects_dir):
+            os.makedirs(self.objects_dir)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.json")
+
+    def put(self, content: bytes) -> str:
+        """
+        Ghi một chunk (nếu chưa có)
+
+        Args:
+            content: Nội dung JSON của chunk
+
+        Returns:
+            Hash của chunk
+        """
+        digest = content_hash(content, DIGEST_LENGTH)
+        path = self._object_path(digest)
+        # Cùng hash nghĩa là cùng nội dung: chunk đã có không bao giờ ghi lại,
+        # chỉ cập nhật mtime để collect_garbage không xóa nó trước khi snapshot
+        # mới tham chiếu nó được ghi xong
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_bytes_atomic(path, content)
+        return digest
+
+    def get(self, digest: str) -> Any:
+        """
+        Đọc một chunk (được cache vì chunk không bao giờ thay đổi)
+
+        Giá trị trả về dùng chung với cache, không được sửa trực tiếp.
+        """
+        return _read_object(self._object_path(digest))
+
+    def _encode_history(self, history: Any) -> Any:
+        """Thay một history container bằng tham chiếu tới các chunk"""
+        if isinstance(history, list) and all(isinstance(row, dict) for row in history):
+            rows = [_row_bytes(row) for row in history]
+            chunks = [self.put(b"[" + b",".join(rows[start:end]) + b"]")
+                      for start, end in chunk_boundaries(rows)]
+            return {CHUNK_KEY: chunks, "$kind": "records"}
+
+        if isinstance(history, dict) and isinstance(history.get("index"), list):
+            series = [key for key, value in history.items() if isinstance(value, list)]
+            length = len(history["index"])
+            if any(len(history[key]) != length for key in series):
+                return history
+            rows = [_row_bytes([history[key][i] for key in series]) for i in range(length)]
+            chunks = [
+                self.put(minify_json({key: history[key][start:end] for key in series}))
+                for start, end in chunk_boundaries(rows)
+            ]
+            meta = {key: value for key, value in history.items() if key not in series}
+            return {CHUNK_KEY: chunks, "$kind": "columns", "$series": series, "$meta": meta}
+
+        return history
+
+    def _decode_history(self, reference: Dict[str, Any]) -> Any:
+        """Dựng lại history container từ tham chiếu (sao chép, không dùng chung với cache)"""
+        parts = [self.get(digest) for digest in reference[CHUNK_KEY]]
+        if reference.get("$kind") == "columns":
+            history = dict(reference.get("$meta", {}))
+            for key in reference["$series"]:
+                history[key] = [value for part in parts for value in part[key]]
+            return history
+        return [dict(row) for part in parts for row in part]
+
+    def _transform(self, data: Any, convert: Callable[[Any], Any],
+                   default: Optional[Callable[[Any], Any]] = None) -> Any:
+        """Áp dụng convert cho mọi history container, sao chép các dict trên đường đi"""
+        if not isinstance(data, dict):
+            return data
+        result = {}
+        for key, value in data.items():
+            if key in HISTORY_KEYS:
+                if default is not None and not isinstance(value, (list, dict, type(None))):
+                    value = default(value)
+                result[key] = convert(value)
+            elif isinstance(value, dict):
+                result[key] = self._transform(value, convert, default)
+            else:
+                result[key] = value
+        return result
+
+    def encode(self, snapshot: Dict[str, Any],
+               default: Optional[Callable[[Any], Any]] = None) -> Dict[str, Any]:
+        """
+        Snapshot với các history được thay bằng tham chiếu chunk
+
+        Args:
+            snapshot: Snapshot từ fetch_all_data
+            default: Hàm chuyển đổi history không phải JSON (ví dụ json_default cho Bars)
+        """
+        return self._transform(snapshot, self._encode_history, default)
+
+    def decode(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """Snapshot đầy đủ từ một snapshot đã encode (snapshot cũ được trả về nguyên trạng)"""
+        return self._transform(
+            snapshot,
+            lambda value: self._decode_history(value)
+            if isinstance(value, dict) and CHUNK_KEY in value else value
+        )
+
+    def save_snapshot(self, snapshot: Dict[str, Any], path: str,
+                      default: Optional[Callable[[Any], Any]] = None):
+        """
+        Ghi một snapshot, history được lưu dưới dạng chunk dùng chung
+
+        Args:
+            snapshot: Snapshot từ fetch_all_data
+            path: File snapshot
+            default: Hàm serialize dự phòng (ví dụ json_default)
+        """
+        encoded = self.encode(snapshot, default)
+        write_bytes_atomic(path, json.dumps(encoded, indent=2, ensure_ascii=False,
+                                            default=default).encode("utf-8"))
+
+    def load_snapshot(self, path: str) -> Dict[str, Any]:
+        """
+        Đọc một snapshot (đã encode hoặc dạng đầy đủ cũ)
+
+        Args:
+            path: File snapshot
+
+        Returns:
+            Snapshot đầy đủ
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return self.decode(json.load(f))
+
+    def snapshot_files(self, pattern: str = SNAPSHOT_PATTERN) -> List[str]:
+        """Các file snapshot trong snapshot_dir, cũ nhất trước"""
+        return sorted(glob.glob(os.path.join(self.snapshot_dir, pattern)))
+
+    def referenced(self, paths: Optional[Iterable[str]] = None) -> Set[str]:
+        """
+        Tập hash được các snapshot tham chiếu
+
+        Args:
+            paths: File snapshot (mặc định mọi snapshot trong snapshot_dir)
+        """
+        digests: Set[str] = set()
+        for path in self.snapshot_files() if paths is None else paths:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    stack = [json.load(f)]
+            except (OSError, ValueError):
+                continue
+            while stack:
+                node = stack.pop()
+                if isinstance(node, dict):
+                    if CHUNK_KEY in node:
+                        digests.update(node[CHUNK_KEY])
+                    else:
+                        stack.extend(node.values())
+        return digests
+
+    def collect_garbage(self, paths: Optional[Iterable[str]] = None,
+                        grace_seconds: Optional[float] = None) -> int:
+        """
+        Xóa các chunk không còn snapshot nào tham chiếu
+
+        Chunk mới hơn grace_seconds được giữ lại để không xóa nhầm chunk của
+        một snapshot đang được ghi.
+
+        Args:
+            paths: File snapshot còn giữ (mặc định mọi snapshot trong snapshot_dir)
+            grace_seconds: Tuổi tối thiểu của chunk bị xóa (mặc định CHUNK_GC_GRACE_SECONDS)
+
+        Returns:
+            Số chunk đã xóa
+        """
+        grace_seconds = config.CHUNK_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        live = self.referenced(paths)
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        for path in glob.glob(os.path.join(self.objects_dir, "*", "*.json")):
+            digest = os.path.basename(path)[:-len(".json")]
+            if digest in live or os.path.getmtime(path) > cutoff:
+                continue
+            os.remove(path)
+            removed += 1
+        if removed:
+            _read_object.cache_clear()
+        return removed
+
+    def migrate(self) -> int:
+        """
+        Chuyển các snapshot đầy đủ cũ sang dạng tham chiếu chunk
+
+        Returns:
+            Số file đã chuyển
+        """
+        migrated = 0
+        for path in self.snapshot_files():
+            with open(path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            encoded = self.encode(snapshot)
+            if encoded != snapshot:
+                write_bytes_atomic(path, json.dumps(encoded, indent=2, ensure_ascii=False).encode("utf-8"))
+                migrated += 1
+        return migrated
+
+
+@lru_cache(maxsize=4096)
+def _read_object(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the content-addressed bar store")
+    parser.add_argument("action", choices=["migrate", "gc"])
+    args = parser.parse_args()
+
+    store = ChunkStore()
+    if args.action == "migrate":
+        print(f"Migrated {store.migrate()} snapshot files")
+    else:
+        print(f"Removed {store.collect_garbage()} unreferenced chunks")
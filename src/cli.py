@@ -0,0 +1,370 @@
+"""
+Unified command line interface with an optional warm daemon
+
+    python src/cli.py fetch | report | export | backfill | serve
+
+Commands are sent to a running daemon (``serve``) over a localhost socket
+when one is listening, so repeated invocations reuse its loaded modules,
+open store and cached snapshot; otherwise they run in-process. The daemon
+only accepts commands carrying the secret token it writes to
+DAEMON_TOKEN_FILE (readable by its owner only), and exports only write
+inside EXPORT_DIR.
+
+``report`` prints the plain-text summary; the HTML report is built by
+scripts/generate_html_report.py.
+"""
+
+import argparse
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+
+# Phiên bản giao thức client/daemon: tăng khi đổi tên lệnh hoặc tham số để
+# daemon cũ đang chạy từ chối lệnh thay vì chạy sai
+PROTOCOL_VERSION = 2
+
+# Các module nặng (pandas, yfinance, ...) chỉ được import bên trong từng lệnh
+
+
+class CommandContext:
+    """
+    Lớp giữ các tài nguyên dùng chung giữa các lệnh: fetcher, store và
+    snapshot đã fetch gần nhất. Trong daemon, context sống suốt vòng đời
+    tiến trình nên các lệnh sau không phải khởi tạo lại.
+    """
+
+    def __init__(self):
+        self._fetcher = None
+        self._store = None
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.snapshot_time = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def fetcher(self):
+        if self._fetcher is None:
+            from financial_data_fetcher import FinancialDataFetcher
+            self._fetcher = FinancialDataFetcher()
+        return self._fetcher
+
+    @property
+    def store(self):
+        if self._store is None:
+            from storage import DataStore
+            self._store = DataStore()
+        return self._store
+
+    def latest_snapshot(self, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Snapshot mới nhất, chỉ fetch lại khi cũ hơn max_age giây
+
+        Args:
+            max_age: Tuổi tối đa (mặc định DAEMON_CACHE_SECONDS; 0 = luôn fetch)
+        """
+        max_age = config.DAEMON_CACHE_SECONDS if max_age is None else max_age
+        if self.snapshot is None or time.time() - self.snapshot_time > max_age:
+            self.snapshot = self.fetcher.fetch_all_data()
+            self.snapshot_time = time.time()
+        return self.snapshot
+
+    def close(self):
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+
+def cmd_fetch(ctx: CommandContext, args: argparse.Namespace) -> str:
+    data = ctx.latest_snapshot(max_age=0)
+    if args.json:
+        from financial_data_fetcher import json_default
+        return json.dumps(data, indent=2, ensure_ascii=False, default=json_default)
+    from utils import create_summary_report
+    return create_summary_report(data)
+
+
+def cmd_report(ctx: CommandContext, args: argparse.Namespace) -> str:
+    # Chỉ là báo cáo dạng text; báo cáo HTML do scripts/generate_html_report.py tạo
+    from utils import create_summary_report
+    return create_summary_report(ctx.latest_snapshot(max_age=args.max_age))
+
+
+def export_path(path: str) -> str:
+    """
+    Resolve an export output path inside EXPORT_DIR
+
+    Relative paths are taken relative to EXPORT_DIR; paths that resolve
+    outside it (absolute paths, "..", symlinks) are rejected so a daemon
+    client cannot make it write files anywhere.
+
+    Raises:
+        ValueError: If the path is outside EXPORT_DIR
+    """
+    root = os.path.realpath(config.EXPORT_DIR)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if resolved == root or os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Export path must be inside {root}: {path}")
+    return resolved
+
+
+def cmd_export(ctx: CommandContext, args: argparse.Namespace) -> str:
+    import exporter
+
+    output = export_path(args.output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    if args.kind == "snapshots":
+        written = exporter.export_snapshots(exporter.iter_snapshot_files(), output, fmt=args.format)
+    elif args.kind == "quotes":
+        written = exporter.export_quotes(output, ctx.store, symbols=args.symbols,
+                                         start=args.start, end=args.end, fmt=args.format)
+    else:
+        from datetime import datetime, timezone
+
+        def to_epoch(value):
+            if not value:
+                return None
+            return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+
+        written = exporter.export_bars(output, ctx.store, symbols=args.symbols,
+                                       start=to_epoch(args.start), end=to_epoch(args.end),
+                                       fmt=args.format)
+    return f"Exported {written} rows to {output}"
+
+
+def cmd_backfill(ctx: CommandContext, args: argparse.Namespace) -> str:
+    from backfill import BackfillEngine
+    from universe import load_universe
+
+    symbols = args.symbols or [entry["symbol"] for entry in load_universe()]
+    engine = BackfillEngine(fetcher=ctx.fetcher, store=ctx.store,
+                            chunk_days=args.chunk_days, max_workers=args.workers)
+    stats = engine.run(symbols, start=args.start, end=args.end)
+    return f"Backfill completed: {stats}"
+
+
+# Lệnh có thể chạy trong daemon
+COMMANDS: Dict[str, Callable[[CommandContext, argparse.Namespace], str]] = {
+    "fetch": cmd_fetch,
+    "report": cmd_report,
+    "export": cmd_export,
+    "backfill": cmd_backfill,
+}
+
+
+def write_token(path: Optional[str] = None) -> str:
+    """
+    Create a new random daemon token in a file only its owner can read
+
+    Args:
+        path: Token file (default DAEMON_TOKEN_FILE)
+
+    Returns:
+        The token
+    """
+    path = path or config.DAEMON_TOKEN_FILE
+    token = secrets.token_hex(32)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Tạo file mới để quyền 0600 được áp dụng cả khi file cũ đã tồn tại
+    if os.path.exists(path):
+        os.remove(path)
+    with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w") as f:
+        f.write(token)
+    return token
+
+
+def read_token(path: Optional[str] = None) -> str:
+    """Token of the running daemon ("" if the token file cannot be read)"""
+    try:
+        with open(path or config.DAEMON_TOKEN_FILE, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    """
+    Giao thức: mỗi kết nối gửi một dòng JSON {"command", "args", "version",
+    "token"} và nhận một dòng JSON {"ok", "output", "version"} hoặc
+    {"ok": false, "error", "version"}. Lệnh không có đúng token của daemon bị
+    từ chối (kể cả ping và shutdown). Lệnh có version khác PROTOCOL_VERSION
+    bị từ chối (trừ ping và shutdown, để vẫn dừng được daemon cũ).
+    """
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode("utf-8"))
+            command = request["command"]
+            token = str(request.get("token") or "").encode("utf-8")
+            if not hmac.compare_digest(token, self.server.token.encode("utf-8")):
+                response = {"ok": False, "error": "Invalid daemon token"}
+            elif command == "ping":
+                response = {"ok": True, "output": "pong"}
+            elif command == "shutdown":
+                response = {"ok": True, "output": "Daemon stopping"}
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            elif request.get("version") != PROTOCOL_VERSION:
+                response = {"ok": False, "error": f"Protocol version mismatch: daemon {PROTOCOL_VERSION}, "
+                                                  f"client {request.get('version')}; restart the daemon"}
+            elif command in COMMANDS:
+                args = argparse.Namespace(**request.get("args", {}))
+                # Các lệnh dùng chung fetcher/store nên được chạy lần lượt
+                with self.server.context.lock:
+                    output = COMMANDS[command](self.server.context, args)
+                response = {"ok": True, "output": output}
+            else:
+                response = {"ok": False, "error": f"Unknown command: {command}"}
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        response["version"] = PROTOCOL_VERSION
+        self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+class Daemon(socketserver.ThreadingTCPServer):
+    """
+    Warm daemon giữ CommandContext giữa các lần gọi CLI
+
+    Nếu không truyền token, daemon tạo token mới trong DAEMON_TOKEN_FILE khi
+    khởi động và xóa file khi đóng.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None,
+                 context: Optional[CommandContext] = None, token: Optional[str] = None):
+        super().__init__((host or config.DAEMON_HOST, config.DAEMON_PORT if port is None else port),
+                         DaemonHandler)
+        self.context = context or CommandContext()
+        self.token_file = None if token else config.DAEMON_TOKEN_FILE
+        self.token = token or write_token(self.token_file)
+
+    def server_close(self):
+        super().server_close()
+        self.context.close()
+        if self.token_file and read_token(self.token_file) == self.token:
+            os.remove(self.token_file)
+
+
+def send_command(command: str, args: Optional[Dict[str, Any]] = None,
+                 host: Optional[str] = None, port: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Send a command to a running daemon
+
+    Args:
+        command: Command name
+        args: Command arguments
+        host: Daemon host (default DAEMON_HOST)
+        port: Daemon port (default DAEMON_PORT)
+        timeout: Socket timeout in seconds (None = wait for the command)
+        token: Daemon token (default read from DAEMON_TOKEN_FILE)
+
+    Returns:
+        Response dict, or None if no daemon is listening
+    """
+    address = (host or config.DAEMON_HOST, config.DAEMON_PORT if port is None else port)
+    try:
+        connection = socket.create_connection(address, timeout=1.0)
+    except OSError:
+        return None
+
+    with connection:
+        connection.settimeout(timeout)
+        payload = {"command": command, "args": args or {}, "version": PROTOCOL_VERSION,
+                   "token": read_token() if token is None else token}
+        connection.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        with connection.makefile("r", encoding="utf-8") as reader:
+            return json.loads(reader.readline())
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="financial-data", description="Financial Data Fetcher CLI")
+    parser.add_argument("--port", type=int, default=config.DAEMON_PORT, help="Daemon port")
+    parser.add_argument("--no-daemon", action="store_true",
+                        help="Always run in-process, even if a daemon is listening")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fetch = commands.add_parser("fetch", help="Fetch all data now")
+    fetch.add_argument("--json", action="store_true", help="Print the raw snapshot as JSON")
+
+    report = commands.add_parser("report", help="Print the text summary report (the HTML report is "
+                                                "built by scripts/generate_html_report.py)")
+    report.add_argument("--max-age", type=float, default=None,
+                        help="Reuse a snapshot up to this many seconds old")
+
+    export = commands.add_parser("export", help="Export stored data to CSV or Parquet")
+    export.add_argument("kind", choices=["snapshots", "quotes", "bars"])
+    export.add_argument("output", help="Output file (.csv or .parquet), relative to EXPORT_DIR")
+    export.add_argument("--symbols", nargs="*", default=None)
+    export.add_argument("--start", default=None, help="Start date (YYYY-MM-DD)")
+    export.add_argument("--end", default=None, help="End date (YYYY-MM-DD, exclusive)")
+    export.add_argument("--format", choices=["csv", "parquet"], default=None)
+
+    backfill = commands.add_parser("backfill", help="Backfill historical data into the store")
+    backfill.add_argument("symbols", nargs="*", help="Symbols (default: whole universe)")
+    backfill.add_argument("--start", default=config.BACKFILL_START)
+    backfill.add_argument("--end", default=None)
+    backfill.add_argument("--chunk-days", type=int, default=config.BACKFILL_CHUNK_DAYS)
+    backfill.add_argument("--workers", type=int, default=config.MAX_WORKERS)
+
+    serve = commands.add_parser("serve", help="Run the warm daemon in the foreground")
+    serve.add_argument("--stop", action="store_true", help="Stop a running daemon")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.command == "serve":
+        if args.stop:
+            response = send_command("shutdown", port=args.port)
+            print(response["output"] if response else "No daemon running")
+            return 0
+        with Daemon(port=args.port) as daemon:
+            print(f"Daemon listening on {config.DAEMON_HOST}:{args.port}")
+            try:
+                daemon.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        return 0
+
+    command_args = {key: value for key, value in vars(args).items()
+                    if key not in ("command", "port", "no_daemon")}
+    # Daemon có thư mục làm việc riêng nên gửi đường dẫn tuyệt đối; daemon vẫn kiểm tra lại
+    if command_args.get("output"):
+        try:
+            command_args["output"] = export_path(command_args["output"])
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    response = None if args.no_daemon else send_command(args.command, command_args, port=args.port)
+    if response is None:
+        context = CommandContext()
+        try:
+            print(COMMANDS[args.command](context, args))
+        finally:
+            context.close()
+        return 0
+
+    if response.get("version") != PROTOCOL_VERSION:
+        print(f"Error: daemon speaks protocol {response.get('version')}, client {PROTOCOL_VERSION}; "
+              f"restart it with 'serve --stop'", file=sys.stderr)
+        return 1
+    if not response["ok"]:
+        print(f"Error: {response['error']}", file=sys.stderr)
+        return 1
+    print(response["output"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,6 +27,42 @@ SYMBOLS = {
     "housing_index": "CSUSHPISA"  # Case-Shiller U.S. National Home Price Index
 }
 
+# Thị trường giao dịch của các mã (dùng để xác định lịch giao dịch)
+SYMBOL_MARKETS = {
+    "GC=F": "FUTURES",
+    "SI=F": "FUTURES",
+    "^DJI": "US",
+    "^TNX": "US",
+    "^VNI": "VN",
+    "USDVND=X": "FX",
+    "EURUSD=X": "FX"
+}
+
+# Múi giờ của từng thị trường
+MARKET_TIMEZONES = {
+    "US": "America/New_York",
+    "VN": "Asia/Ho_Chi_Minh",
+    # Yahoo đóng dấu bar FX ngày lúc 00:00 giờ London
+    "FX": "Europe/London",
+    "FUTURES": "America/New_York"
+}
+
+# Lịch giao dịch: số năm tính trước bảng phiên (từ năm BACKFILL_START)
+TRADING_CALENDAR_YEARS_AHEAD = 5
+
+# Ngày nghỉ thêm của HOSE không tính được theo quy tắc (ví dụ nghỉ bù theo
+# quyết định từng năm); Tết và Giỗ Tổ được tính từ âm lịch
+VN_EXTRA_HOLIDAYS = []
+
+# Số ngày tối đa được forward-fill khi ghép panel theo thời gian (as-of join),
+# theo loại series: cổ phiếu/chỉ số, futures, FX 24h, dữ liệu vĩ mô FRED (theo tháng)
+PANEL_FILL_TOLERANCE_DAYS = {
+    "equity": 5,
+    "futures": 5,
+    "fx": 3,
+    "macro": 45
+}
+
 # FRED series IDs
 FRED_SERIES = {
     "us_10y_bond": "DGS10",
@@ -35,6 +71,13 @@ FRED_SERIES = {
     "inflation_rate": "CPIAUCSL"
 }
 
+# API rate limit (requests per minute, dùng chung cho mọi nguồn dữ liệu)
+API_RATE_LIMIT = int(os.getenv("API_RATE_LIMIT", "60"))
+
+# Historical backfill
+BACKFILL_START = os.getenv("BACKFILL_START", "2000-01-01")
+BACKFILL_CHUNK_DAYS = int(os.getenv("BACKFILL_CHUNK_DAYS", "365"))
+
 # Update intervals (in minutes)
 UPDATE_INTERVALS = {
     "real_time": 5,
@@ -42,10 +85,73 @@ UPDATE_INTERVALS = {
     "daily": 1440
 }
 
+# Định dạng historical_data trả về: "records" (list dict mỗi dòng, mặc định cũ),
+# "columns" (dict theo cột, giữ index thời gian) hoặc "bars" (đối tượng Bars, chỉ chuyển đổi khi cần)
+HISTORY_FORMAT = os.getenv("HISTORY_FORMAT", "records")
+
 # Data storage
 DATA_DIR = "data"
 DATABASE_FILE = "financial_data.db"
 
+# Symbol universe (CSV có cột symbol[,name,market] hoặc file text mỗi dòng một mã)
+UNIVERSE_FILE = os.getenv("UNIVERSE_FILE", os.path.join(DATA_DIR, "universe.csv"))
+UNIVERSE_BATCH_SIZE = int(os.getenv("UNIVERSE_BATCH_SIZE", "50"))
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "4"))
+
+# Rollup OHLCV (1h/1d/1w/1mo): số điểm tối đa khi tự chọn độ phân giải cho biểu đồ
+ROLLUP_MAX_POINTS = int(os.getenv("ROLLUP_MAX_POINTS", "2000"))
+
+# Export CSV/Parquet: số dòng mỗi chunk đọc/ghi
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+
+# Streaming indicators (trạng thái được lưu giữa các lần chạy scheduler)
+INDICATOR_WINDOW = 20
+INDICATOR_STATE_FILE = os.path.join(DATA_DIR, "indicator_state.json")
+
 # Dashboard settings
 DASHBOARD_PORT = 8050
-DASHBOARD_HOST = "127.0.0.1"
\ No newline at end of file
+DASHBOARD_HOST = "127.0.0.1"
+
+# Warm daemon cho CLI (chỉ lắng nghe trên localhost)
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = int(os.getenv("DAEMON_PORT", "8765"))
+# Snapshot đã fetch được dùng lại cho report trong khoảng thời gian này (giây)
+DAEMON_CACHE_SECONDS = int(os.getenv("DAEMON_CACHE_SECONDS", "300"))
+# Token bí mật client phải gửi kèm mỗi lệnh; daemon tạo mới khi khởi động
+# và ghi vào file chỉ chủ sở hữu đọc được (0600)
+DAEMON_TOKEN_FILE = os.getenv("DAEMON_TOKEN_FILE", os.path.join(DATA_DIR, ".daemon_token"))
+
+# Thư mục file export (lệnh export chỉ ghi bên trong thư mục này)
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(DATA_DIR, "exports"))
+
+# Site tĩnh cho GitHub Pages
+SITE_OUTPUT_DIR = os.getenv("SITE_OUTPUT_DIR", "docs")
+SITE_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+# Bytecode cache của các template Jinja đã biên dịch
+SITE_CACHE_DIR = os.path.join(DATA_DIR, ".site_cache")
+# Số ký tự hash nội dung trong tên file được publish
+PUBLISH_HASH_LENGTH = 12
+
+# Lưu snapshot dạng keyframe + delta
+DELTA_DIR = os.getenv("DELTA_DIR", os.path.join(DATA_DIR, "deltas"))
+# Cứ mỗi chừng này phiên bản lại ghi một snapshot đầy đủ
+DELTA_KEYFRAME_INTERVAL = int(os.getenv("DELTA_KEYFRAME_INTERVAL", "24"))
+
+# Lưu bars lịch sử theo hash nội dung, dùng chung giữa các snapshot
+CHUNK_DIR = os.getenv("CHUNK_DIR", os.path.join(DATA_DIR, "chunks"))
+# Số bar trung bình mỗi chunk (tối đa gấp 4 lần)
+CHUNK_TARGET_ROWS = int(os.getenv("CHUNK_TARGET_ROWS", "16"))
+# Chunk mới hơn chừng này giây không bị garbage collect
+CHUNK_GC_GRACE_SECONDS = int(os.getenv("CHUNK_GC_GRACE_SECONDS", "3600"))
+
+# Chính sách lưu giữ snapshot: giữ tất cả trong N giờ, mỗi giờ một bản trong
+# N ngày, sau đó mỗi ngày một bản; các bản bị loại được nén vào archive
+RETENTION_KEEP_ALL_HOURS = int(os.getenv("RETENTION_KEEP_ALL_HOURS", "24"))
+RETENTION_HOURLY_DAYS = int(os.getenv("RETENTION_HOURLY_DAYS", "30"))
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", os.path.join(DATA_DIR, "archive"))
+# "parquet" (cần pyarrow, nếu không sẽ dùng csv) hoặc "csv"
+RETENTION_ARCHIVE_FORMAT = os.getenv("RETENTION_ARCHIVE_FORMAT", "parquet")
+# Số snapshot nén mỗi lượt (giới hạn bộ nhớ và thời gian mỗi bước)
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "200"))
+# Chu kỳ chạy retention nền trong scheduler
+RETENTION_INTERVAL_MINUTES = int(os.getenv("RETENTION_INTERVAL_MINUTES", "60"))
@@ -0,0 +1,248 @@
+"""
+Rolling cross-asset correlation and covariance matrices with incremental refresh
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from panel import PanelBuilder
+from storage import DataStore
+
+
+class RollingCorrelation:
+    """
+    Pairwise-complete rolling covariance/correlation over the last
+    ``window`` rows
+
+    Running sums are kept per pair of columns so a missing value only drops
+    the pairs it belongs to (same semantics as ``DataFrame.cov/corr`` on the
+    window). Adding or evicting k rows costs O(k * N^2) matrix products.
+    """
+
+    def __init__(self, size: int, window: int, min_periods: Optional[int] = None):
+        self.size = size
+        self.window = window
+        self.min_periods = min_periods or max(2, window // 2)
+        self.rows = np.empty((0, size))
+        self.count = np.zeros((size, size))
+        self.sum_x = np.zeros((size, size))
+        self.sum_xx = np.zeros((size, size))
+        self.sum_xy = np.zeros((size, size))
+
+    def _accumulate(self, rows: np.ndarray, sign: float):
+        mask = (~np.isnan(rows)).astype(float)
+        values = np.where(mask > 0, rows, 0.0)
+        self.count += sign * (mask.T @ mask)
+        self.sum_x += sign * (values.T @ mask)
+        self.sum_xx += sign * ((values * values).T @ mask)
+        self.sum_xy += sign * (values.T @ values)
+
+    def add(self, rows: np.ndarray):
+        """
+        Append rows (k x N, NaN for missing) and evict rows leaving the window
+
+        Args:
+            rows: New rows in time order
+        """
+        rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        if rows.shape[0] > self.window:
+            rows = rows[-self.window:]
+
+        overflow = self.rows.shape[0] + rows.shape[0] - self.window
+        if overflow > 0:
+            self._accumulate(self.rows[:overflow], -1.0)
+            self.rows = self.rows[overflow:]
+
+        self._accumulate(rows, 1.0)
+        self.rows = np.vstack([self.rows, rows])
+
+    def revise(self, offset: int, row: np.ndarray) -> bool:
+        """
+        Replace a row still in the window
+
+        Args:
+            offset: Position counted from the latest row (0 = latest)
+            row: New values (N, NaN for missing)
+
+        Returns:
+            False if the row already left the window
+        """
+        index = self.rows.shape[0] - 1 - offset
+        if index < 0:
+            return False
+        row = np.asarray(row, dtype=float).reshape(1, -1)
+        self._accumulate(self.rows[index:index + 1], -1.0)
+        self._accumulate(row, 1.0)
+        self.rows[index] = row[0]
+        return True
+
+    def insert(self, offset: int, row: np.ndarray) -> bool:
+        """
+        Insert a row before the ``offset`` latest rows, evicting the oldest
+        row if the window overflows
+
+        Returns:
+            False if the row would fall outside the window
+        """
+        index = self.rows.shape[0] - offset
+        if index < 0 or (index == 0 and self.rows.shape[0] >= self.window):
+            return False
+        row = np.asarray(row, dtype=float).reshape(1, -1)
+        self._accumulate(row, 1.0)
+        self.rows = np.insert(self.rows, index, row, axis=0)
+        if self.rows.shape[0] > self.window:
+            self._accumulate(self.rows[:1], -1.0)
+            self.rows = self.rows[1:]
+        return True
+
+    def covariance(self) -> np.ndarray:
+        """Sample covariance matrix (ddof=1) of the current window"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = (self.sum_xy - self.sum_x * self.sum_x.T / self.count) / (self.count - 1)
+        return np.where(self.count >= self.min_periods, cov, np.nan)
+
+    def correlation(self) -> np.ndarray:
+        """Pearson correlation matrix of the current window"""
+        n = self.count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            numerator = n * self.sum_xy - self.sum_x * self.sum_x.T
+            var_i = n * self.sum_xx - self.sum_x * self.sum_x
+            corr = numerator / np.sqrt(var_i * var_i.T)
+        corr = np.clip(corr, -1.0, 1.0)
+        return np.where(self.count >= self.min_periods, corr, np.nan)
+
+
+class CorrelationService:
+    """
+    Lớp tính ma trận tương quan/hiệp phương sai trượt giữa các tài sản từ
+    dữ liệu trong store. Mỗi lần refresh chỉ đọc và xử lý các dòng mới, kết
+    quả được cache theo từng window.
+    """
+
+    def __init__(self, symbols: List[str], store: Optional[DataStore] = None,
+                 windows: Iterable[int] = (30, 90), min_periods: Optional[int] = None):
+        self.symbols = list(symbols)
+        self.store = store or DataStore()
+        self.windows = list(windows)
+        self.states = {
+            window: RollingCorrelation(len(self.symbols), window, min_periods)
+            for window in self.windows
+        }
+        self.last_prices = np.full(len(self.symbols), np.nan)
+        self.last_date = None
+        # Ngày mới nhất đã xử lý của từng mã: bar đến muộn của một mã (ví dụ
+        # ^DJI cùng ngày với ^VNI đã xử lý) vẫn được nhận
+        self.last_dates: Dict[str, Optional[pd.Timestamp]] = {symbol: None for symbol in self.symbols}
+        # Ngày của các dòng trong window dài nhất, cũ nhất trước
+        self.dates: List[pd.Timestamp] = []
+        self._cache: Dict[tuple, pd.DataFrame] = {}
+
+    def _load_new_closes(self) -> pd.DataFrame:
+        """Đọc giá đóng cửa mới (theo ngày giao dịch địa phương) của từng mã"""
+        builder = PanelBuilder(self.store)
+        for symbol in self.symbols:
+            last = self.last_dates[symbol]
+            # Lùi 1 ngày để không bỏ sót bar bị lệch múi giờ
+            start = None if last is None else int((last - pd.Timedelta(days=1)).tz_localize("UTC").timestamp())
+            builder.add_symbol(symbol, start=start)
+        frame = builder.build(fill=False, columns=self.symbols)
+
+        for symbol, last in self.last_dates.items():
+            if last is not None:
+                frame.loc[frame.index <= last, symbol] = np.nan
+        return frame.dropna(how="all")
+
+    def _merge_row(self, date: pd.Timestamp, returns: np.ndarray):
+        """Đưa lợi suất của một ngày cũ hơn dòng mới nhất vào các window"""
+        position = int(np.searchsorted(np.array(self.dates, dtype="datetime64[ns]"), date.to_datetime64()))
+        exists = position < len(self.dates) and self.dates[position] == date
+        offset = len(self.dates) - position - (1 if exists else 0)
+
+        for state in self.states.values():
+            if exists:
+                row = state.rows[state.rows.shape[0] - 1 - offset].copy() if offset < state.rows.shape[0] else None
+                if row is not None:
+                    observed = ~np.isnan(returns)
+                    row[observed] = returns[observed]
+                    state.revise(offset, row)
+            else:
+                state.insert(offset, returns)
+        if not exists:
+            self.dates.insert(position, date)
+            del self.dates[:-max(self.windows)]
+
+    def refresh(self) -> int:
+        """
+        Cập nhật các window với những dòng mới trong store
+
+        Returns:
+            Số dòng mới đã xử lý
+        """
+        closes = self._load_new_closes()
+        if closes.empty:
+            return 0
+
+        prices = closes.to_numpy()
+        returns = np.full(prices.shape, np.nan)
+        last_prices = self.last_prices.copy()
+        # Lợi suất log so với giá quan sát gần nhất của từng mã; ngày mã không
+        # giao dịch để NaN thay vì forward-fill (tránh kéo tương quan về 0)
+        for row in range(prices.shape[0]):
+            observed = ~np.isnan(prices[row])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                returns[row, observed] = np.log(prices[row, observed] / last_prices[observed])
+            last_prices[observed] = prices[row, observed]
+
+        # Các ngày không mới hơn dòng mới nhất là bar đến muộn: điền vào (hoặc
+        # chèn) dòng của ngày đó; các ngày mới được thêm một lượt
+        late = 0 if self.last_date is None else int(np.searchsorted(closes.index, self.last_date, side="right"))
+        for row in range(late):
+            self._merge_row(closes.index[row], returns[row])
+        if late < len(closes):
+            for state in self.states.values():
+                state.add(returns[late:])
+            self.dates.extend(closes.index[late:])
+            del self.dates[:-max(self.windows)]
+            self.last_date = closes.index[-1]
+
+        for column, symbol in enumerate(self.symbols):
+            observed = closes.index[~np.isnan(prices[:, column])]
+            if len(observed):
+                self.last_dates[symbol] = observed[-1]
+        self.last_prices = last_prices
+        self._cache.clear()
+        return len(closes)
+
+    def _matrix(self, kind: str, window: int) -> pd.DataFrame:
+        key = (kind, window)
+        if key not in self._cache:
+            state = self.states[window]
+            values = state.correlation() if kind == "correlation" else state.covariance()
+            self._cache[key] = pd.DataFrame(values, index=self.symbols, columns=self.symbols)
+        return self._cache[key]
+
+    def correlation(self, window: int) -> pd.DataFrame:
+        """
+        Ma trận tương quan của window
+
+        Args:
+            window: Một trong các window đã cấu hình
+
+        Returns:
+            DataFrame N x N
+        """
+        return self._matrix("correlation", window)
+
+    def covariance(self, window: int) -> pd.DataFrame:
+        """
+        Ma trận hiệp phương sai của window
+
+        Args:
+            window: Một trong các window đã cấu hình
+
+        Returns:
+            DataFrame N x N
+        """
+        return self._matrix("covariance", window)
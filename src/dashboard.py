@@ -1,14 +1,73 @@
 import dash
-from dash import dcc, html, Input, Output, callback
+from collections import OrderedDict
+from dash import dcc, html, Input, Output, State, Patch, callback
 import plotly.graph_objs as go
 import plotly.express as px
 import pandas as pd
 import json
 from datetime import datetime, timedelta
 import os
-from financial_data_fetcher import FinancialDataFetcher
+import uuid
+from assets import ASSET_GROUPS, ASSETS, iter_quotes
+from delta import diff, normalize
+from financial_data_fetcher import FinancialDataFetcher, json_default
 import config
 
+def asset_outputs(data):
+    """
+    Giá trị (giá, thay đổi) của mọi tài sản theo thứ tự ASSETS
+
+    Args:
+        data: Snapshot từ fetch_all_data (có thể rỗng)
+
+    Returns:
+        List phẳng [price_1, change_1, price_2, change_2, ...]
+    """
+    outputs = []
+    for spec, quote in iter_quotes(data):
+        if quote is None:
+            outputs.extend(("N/A", "N/A"))
+            continue
+        change = "N/A"
+        change_pct = quote.get('change_percent')
+        if change_pct is not None:
+            color = 'green' if change_pct >= 0 else 'red'
+            change = html.Span(f"{change_pct:+.2f}%", style={'color': color})
+        outputs.extend((spec.format_price(quote['current_price']), change))
+    return outputs
+
+def to_patch(delta, previous, patch=None):
+    """
+    Chuyển delta thành dash Patch để trình duyệt chỉ nhận phần thay đổi
+
+    Args:
+        delta: Cây delta (delta.diff) từ previous đến snapshot mới nhất
+        previous: Snapshot client đang có (cho biết độ dài các list splice)
+
+    Returns:
+        Patch, hoặc snapshot mới nếu delta thay thế toàn bộ snapshot
+    """
+    if not isinstance(delta, dict):
+        return delta[1]
+    patch = Patch() if patch is None else patch
+    for key, change in delta.items():
+        if isinstance(change, dict):
+            to_patch(change, previous[key], patch[key])
+        elif change[0] == "d":
+            del patch[key]
+        elif change[0] == "l":
+            # Chỉ gửi thao tác cắt list và phần đuôi mới, không gửi lại cả list
+            drop, keep, tail = change[1], change[2], change[3]
+            for _ in range(drop):
+                del patch[key][0]
+            for _ in range(len(previous[key]) - drop - keep):
+                del patch[key][keep]
+            if tail:
+                patch[key].extend(tail)
+        else:
+            patch[key] = change[1]
+    return patch
+
 class FinancialDashboard:
     """
     Dashboard web để hiển thị dữ liệu tài chính real-time
@@ -17,6 +76,11 @@ class FinancialDashboard:
     def __init__(self):
         self.app = dash.Dash(__name__)
         self.fetcher = FinancialDataFetcher()
+        # Các snapshot gần nhất đã gửi cho client, theo phiên bản; tiền tố
+        # riêng cho mỗi lần chạy để client cũ không khớp nhầm sau khi restart
+        self.versions = OrderedDict()
+        self.run_id = uuid.uuid4().hex[:8]
+        self.next_version = 0
         self.setup_layout()
         self.setup_callbacks()
     
@@ -33,84 +97,15 @@ class FinancialDashboard:
                 html.Div(id="last-update", style={'margin': '10px'})
             ], style={'text-align': 'center'}),
             
-            # Precious Metals Section
-            html.Div([
-                html.H2("Precious Metals", style={'text-align': 'center'}),
-                html.Div([
-                    html.Div([
-                        html.H3("Gold", style={'color': '#FFD700'}),
-                        html.Div(id="gold-price", style={'font-size': '24px', 'font-weight': 'bold'}),
-                        html.Div(id="gold-change", style={'font-size': '16px'})
-                    ], className="metric-box", style={'width': '48%', 'display': 'inline-block', 'margin': '1%'}),
-                    
-                    html.Div([
-                        html.H3("Silver", style={'color': '#C0C0C0'}),
-                        html.Div(id="silver-price", style={'font-size': '24px', 'font-weight': 'bold'}),
-                        html.Div(id="silver-change", style={'font-size': '16px'})
-                    ], className="metric-box", style={'width': '48%', 'display': 'inline-block', 'margin': '1%'})
-                ])
-            ], style={'margin': '20px 0'}),
-            
-            # Stock Indices Section
-            html.Div([
-                html.H2("Stock Indices", style={'text-align': 'center'}),
-                html.Div([
-                    html.Div([
-                        html.H3("Dow Jones", style={'color': '#1f77b4'}),
-                        html.Div(id="dow-price", style={'font-size': '24px', 'font-weight': 'bold'}),
-                        html.Div(id="dow-change", style={'font-size': '16px'})
-                    ], className="metric-box", style={'width': '48%', 'display': 'inline-block', 'margin': '1%'}),
-                    
-                    html.Div([
-                        html.H3("VN Index", style={'color': '#ff7f0e'}),
-                        html.Div(id="vn-price", style={'font-size': '24px', 'font-weight': 'bold'}),
-                        html.Div(id="vn-change", style={'font-size': '16px'})
-                    ], className="metric-box", style={'width': '48%', 'display': 'inline-block', 'margin': '1%'})
-                ])
-            ], style={'margin': '20px 0'}),
-            
-            # Bond Yields Section
-            html.Div([
-                html.H2("Bond Yields", style={'text-align': 'center'}),
-                html.Div([
-                    html.H3("US 10Y Treasury", style={'color': '#2ca02c'}),
-                    html.Div(id="bond-yield", style={'font-size': '24px', 'font-weight': 'bold'}),
-                    html.Div(id="bond-change", style={'font-size': '16px'})
-                ], className="metric-box", style={'width': '48%', 'margin': '1% auto', 'display': 'block'})
-            ], style={'margin': '20px 0'}),
-            
-            # FX Section
-            html.Div([
-                html.H2("Foreign Exchange", style={'text-align': 'center'}),
-                html.Div([
-                    html.Div([
-                        html.H3("USD/VND", style={'color': '#d62728'}),
-                        html.Div(id="usdvnd-rate", style={'font-size': '24px', 'font-weight': 'bold'}),
-                        html.Div(id="usdvnd-change", style={'font-size': '16px'})
-                    ], className="metric-box", style={'width': '48%', 'display': 'inline-block', 'margin': '1%'}),
-                    
-                    html.Div([
-                        html.H3("EUR/USD", style={'color': '#9467bd'}),
-                        html.Div(id="eurusd-rate", style={'font-size': '24px', 'font-weight': 'bold'}),
-                        html.Div(id="eurusd-change", style={'font-size': '16px'})
-                    ], className="metric-box", style={'width': '48%', 'display': 'inline-block', 'margin': '1%'})
-                ])
-            ], style={'margin': '20px 0'}),
+            # Một section cho mỗi nhóm tài sản trong registry
+            *self.asset_sections(),
             
             # Chart Section
             html.Div([
                 html.H2("Price Charts", style={'text-align': 'center'}),
                 dcc.Dropdown(
                     id='chart-selector',
-                    options=[
-                        {'label': 'Gold', 'value': 'gold'},
-                        {'label': 'Silver', 'value': 'silver'},
-                        {'label': 'Dow Jones', 'value': 'dow_jones'},
-                        {'label': 'VN Index', 'value': 'vn_index'},
-                        {'label': 'US 10Y Bond', 'value': 'us_10y_bond'},
-                        {'label': 'USD/VND', 'value': 'usd_vnd'},
-                        {'label': 'EUR/USD', 'value': 'eur_usd'}
-                    ],
+                    options=[{'label': spec.name, 'value': spec.key} for spec in ASSETS],
                     value='gold',
                     style={'margin': '10px'}
                 ),
@@ -124,159 +119,83 @@ class FinancialDashboard:
                 n_intervals=0
             ),
             
-            # Store for data
-            dcc.Store(id='financial-data-store')
+            # Store for data (phiên bản để server chỉ gửi delta)
+            dcc.Store(id='financial-data-store'),
+            dcc.Store(id='financial-data-version')
         ])
     
+    def asset_sections(self):
+        """Các section tài sản theo nhóm, sinh từ registry"""
+        sections = []
+        for group, (title, _) in ASSET_GROUPS.items():
+            specs = [spec for spec in ASSETS if spec.group == group]
+            if not specs:
+                continue
+            boxes = [
+                html.Div([
+                    html.H3(spec.name, style={'color': spec.color}),
+                    html.Div(id=f"{spec.key}-price", style={'font-size': '24px', 'font-weight': 'bold'}),
+                    html.Div(id=f"{spec.key}-change", style={'font-size': '16px'})
+                ], className="metric-box", style={'width': '48%', 'display': 'inline-block', 'margin': '1%'})
+                for spec in specs
+            ]
+            sections.append(html.Div([
+                html.H2(title, style={'text-align': 'center'}),
+                html.Div(boxes)
+            ], style={'margin': '20px 0'}))
+        return sections
+    
+    def publish_snapshot(self, data, client_version=None):
+        """
+        Ghi nhận một snapshot mới và tạo dữ liệu gửi cho client
+
+        Args:
+            data: Snapshot từ fetch_all_data
+            client_version: Phiên bản client đang giữ trong store
+
+        Returns:
+            Tuple (phiên bản mới, Patch chứa delta hoặc snapshot đầy đủ)
+        """
+        latest = normalize(data, json_default)
+        version = f"{self.run_id}:{self.next_version}"
+        self.next_version += 1
+        self.versions[version] = latest
+        while len(self.versions) > config.DELTA_KEYFRAME_INTERVAL:
+            self.versions.popitem(last=False)
+        
+        previous = self.versions.get(client_version)
+        if previous is None:
+            return version, latest
+        return version, to_patch(diff(previous, latest), previous)
+    
     def setup_callbacks(self):
         """Thiết lập callbacks cho dashboard"""
         
         @callback(
             [Output('financial-data-store', 'data'),
+             Output('financial-data-version', 'data'),
              Output('last-update', 'children')],
             [Input('refresh-btn', 'n_clicks'),
-             Input('interval-component', 'n_intervals')]
+             Input('interval-component', 'n_intervals')],
+            [State('financial-data-version', 'data')]
         )
-        def update_financial_data(n_clicks, n_intervals):
-            """Cập nhật dữ liệu tài chính"""
+        def update_financial_data(n_clicks, n_intervals, client_version):
+            """Cập nhật dữ liệu tài chính (chỉ gửi delta nếu client đã có bản trước)"""
             try:
                 data = self.fetcher.fetch_all_data()
+                version, payload = self.publish_snapshot(data, client_version)
                 update_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                return data, f"Last updated: {update_time}"
+                return payload, version, f"Last updated: {update_time}"
             except Exception as e:
-                return {}, f"Error updating data: {str(e)}"
-        
-        @callback(
-            [Output('gold-price', 'children'),
-             Output('gold-change', 'children'),
-             Output('silver-price', 'children'),
-             Output('silver-change', 'children')],
-            [Input('financial-data-store', 'data')]
-        )
-        def update_precious_metals(data):
-            """Cập nhật giá kim loại quý"""
-            if not data or 'precious_metals' not in data:
-                return "N/A", "N/A", "N/A", "N/A"
-            
-            metals = data['precious_metals']
-            
-            # Gold
-            gold_price = "N/A"
-            gold_change = "N/A"
-            if 'gold' in metals and 'current_price' in metals['gold']:
-                gold_price = f"${metals['gold']['current_price']:.2f}"
-                if 'change_percent' in metals['gold']:
-                    change_pct = metals['gold']['change_percent']
-                    color = 'green' if change_pct >= 0 else 'red'
-                    gold_change = html.Span(f"{change_pct:+.2f}%", style={'color': color})
-            
-            # Silver
-            silver_price = "N/A"
-            silver_change = "N/A"
-            if 'silver' in metals and 'current_price' in metals['silver']:
-                silver_price = f"${metals['silver']['current_price']:.2f}"
-                if 'change_percent' in metals['silver']:
-                    change_pct = metals['silver']['change_percent']
-                    color = 'green' if change_pct >= 0 else 'red'
-                    silver_change = html.Span(f"{change_pct:+.2f}%", style={'color': color})
-            
-            return gold_price, gold_change, silver_price, silver_change
+                return {}, None, f"Error updating data: {str(e)}"
         
         @callback(
-            [Output('dow-price', 'children'),
-             Output('dow-change', 'children'),
-             Output('vn-price', 'children'),
-             Output('vn-change', 'children')],
+            [Output(f"{spec.key}-{field}", 'children') for spec in ASSETS for field in ("price", "change")],
             [Input('financial-data-store', 'data')]
         )
-        def update_stock_indices(data):
-            """Cập nhật chỉ số chứng khoán"""
-            if not data or 'stock_indices' not in data:
-                return "N/A", "N/A", "N/A", "N/A"
-            
-            indices = data['stock_indices']
-            
-            # Dow Jones
-            dow_price = "N/A"
-            dow_change = "N/A"
-            if 'dow_jones' in indices and 'current_price' in indices['dow_jones']:
-                dow_price = f"{indices['dow_jones']['current_price']:,.2f}"
-                if 'change_percent' in indices['dow_jones']:
-                    change_pct = indices['dow_jones']['change_percent']
-                    color = 'green' if change_pct >= 0 else 'red'
-                    dow_change = html.Span(f"{change_pct:+.2f}%", style={'color': color})
-            
-            # VN Index
-            vn_price = "N/A"
-            vn_change = "N/A"
-            if 'vn_index' in indices and 'current_price' in indices['vn_index']:
-                vn_price = f"{indices['vn_index']['current_price']:,.2f}"
-                if 'change_percent' in indices['vn_index']:
-                    change_pct = indices['vn_index']['change_percent']
-                    color = 'green' if change_pct >= 0 else 'red'
-                    vn_change = html.Span(f"{change_pct:+.2f}%", style={'color': color})
-            
-            return dow_price, dow_change, vn_price, vn_change
-        
-        @callback(
-            [Output('bond-yield', 'children'),
-             Output('bond-change', 'children')],
-            [Input('financial-data-store', 'data')]
-        )
-        def update_bond_yields(data):
-            """Cập nhật lợi suất trái phiếu"""
-            if not data or 'bond_yields' not in data:
-                return "N/A", "N/A"
-            
-            bonds = data['bond_yields']
-            
-            # US 10Y Bond
-            bond_yield = "N/A"
-            bond_change = "N/A"
-            if 'us_10y_bond_yahoo' in bonds and 'current_price' in bonds['us_10y_bond_yahoo']:
-                bond_yield = f"{bonds['us_10y_bond_yahoo']['current_price']:.2f}%"
-                if 'change_percent' in bonds['us_10y_bond_yahoo']:
-                    change_pct = bonds['us_10y_bond_yahoo']['change_percent']
-                    color = 'green' if change_pct >= 0 else 'red'
-                    bond_change = html.Span(f"{change_pct:+.2f}%", style={'color': color})
-            
-            return bond_yield, bond_change
-        
-        @callback(
-            [Output('usdvnd-rate', 'children'),
-             Output('usdvnd-change', 'children'),
-             Output('eurusd-rate', 'children'),
-             Output('eurusd-change', 'children')],
-            [Input('financial-data-store', 'data')]
-        )
-        def update_fx_rates(data):
-            """Cập nhật tỷ giá ngoại tệ"""
-            if not data or 'fx' not in data:
-                return "N/A", "N/A", "N/A", "N/A"
-            
-            fx = data['fx']
-            
-            # USD/VND
-            usdvnd_rate = "N/A"
-            usdvnd_change = "N/A"
-            if 'usd_vnd' in fx and 'current_price' in fx['usd_vnd']:
-                usdvnd_rate = f"{fx['usd_vnd']['current_price']:,.0f}"
-                if 'change_percent' in fx['usd_vnd']:
-                    change_pct = fx['usd_vnd']['change_percent']
-                    color = 'green' if change_pct >= 0 else 'red'
-                    usdvnd_change = html.Span(f"{change_pct:+.2f}%", style={'color': color})
-            
-            # EUR/USD
-            eurusd_rate = "N/A"
-            eurusd_change = "N/A"
-            if 'eur_usd' in fx and 'current_price' in fx['eur_usd']:
-                eurusd_rate = f"{fx['eur_usd']['current_price']:.4f}"
-                if 'change_percent' in fx['eur_usd']:
-                    change_pct = fx['eur_usd']['change_percent']
-                    color = 'green' if change_pct >= 0 else 'red'
-                    eurusd_change = html.Span(f"{change_pct:+.2f}%", style={'color': color})
-            
-            return usdvnd_rate, usdvnd_change, eurusd_rate, eurusd_change
+        def update_assets(data):
+            """Cập nhật giá và thay đổi của mọi tài sản trong một lượt"""
+            return asset_outputs(data)
         
         @callback(
             Output('price-chart', 'figure'),
@@ -290,26 +209,18 @@ class FinancialDashboard:
             
             try:
                 # Lấy dữ liệu lịch sử cho asset được chọn
-                symbol_map = {
-                    'gold': config.SYMBOLS['gold'],
-                    'silver': config.SYMBOLS['silver'],
-                    'dow_jones': config.SYMBOLS['dow_jones'],
-                    'vn_index': config.SYMBOLS['vn_index'],
-                    'us_10y_bond': config.SYMBOLS['us_10y_bond'],
-                    'usd_vnd': config.SYMBOLS['usd_vnd'],
-                    'eur_usd': config.SYMBOLS['eur_usd']
-                }
-                
-                symbol = symbol_map.get(selected_asset, config.SYMBOLS['gold'])
-                hist_data = self.fetcher.fetch_yahoo_finance_data(symbol, period="1mo")
+                symbols = {spec.key: spec.symbol for spec in ASSETS}
+                symbol = symbols.get(selected_asset) or config.SYMBOLS['gold']
+                try:
+                    _, bars = self.fetcher.fetch_quote(symbol, period="1mo")
+                except LookupError:
+                    bars = None
                 
-                if 'historical_data' in hist_data and hist_data['historical_data']:
-                    df = pd.DataFrame(hist_data['historical_data'])
-                    
+                if bars is not None and len(bars) > 0:
                     fig = go.Figure()
                     fig.add_trace(go.Scatter(
-                        x=df.index,
-                        y=df['Close'],
+                        x=bars.datetime_index(),
+                        y=bars.close,
                         mode='lines',
                         name=selected_asset.replace('_', ' ').title(),
                         line=dict(width=2)
@@ -0,0 +1,352 @@
+"""
+Snapshot delta encoding: periodic keyframes plus compact diffs
+
+A delta mirrors the snapshot it applies to: dicts hold the changed keys
+only, and each changed value is a leaf operation list
+
+    ["s", value]                set the value
+    ["d"]                       delete the key
+    ["l", drop, keep, tail]     list splice: drop ``drop`` items from the
+                                head, keep the next ``keep``, append ``tail``
+
+so shared path prefixes are written once. Lists (history columns and
+records) are encoded as a splice when the new list is a shifted and/or
+extended window of the old one, which is how consecutive histories differ,
+and replaced otherwise. An empty dict means "no change".
+"""
+
+import json
+import math
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import config
+from publish import minify_json, write_bytes_atomic
+
+# Cây delta: dict các khóa thay đổi, lá là list thao tác
+Delta = Union[Dict[str, Any], list]
+
+INDEX_FILE = "index.json"
+
+# Số vị trí bắt đầu tối đa được thử khi tìm cửa sổ trượt của một list
+MAX_SPLICE_CANDIDATES = 8
+
+_MISSING = object()
+
+
+def _equal(a: Any, b: Any) -> bool:
+    if a is b:
+        return True
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return type(a) == type(b) and a == b
+
+
+def _common_run(old: list, new: list, start: int) -> int:
+    """Length of the run where old[start:] and new match from the beginning"""
+    limit = min(len(old) - start, len(new))
+    run = 0
+    while run < limit and _equal(old[start + run], new[run]):
+        run += 1
+    return run
+
+
+def _splice(old: list, new: list) -> Optional[Tuple[int, int]]:
+    """
+    Best (drop, keep) such that new == old[drop:drop + keep] + tail
+
+    Returns:
+        (drop, keep) or None if no item of old is reused
+    """
+    if not old or not new:
+        return None
+    best = None
+    candidates = 0
+    for drop, value in enumerate(old):
+        if not _equal(value, new[0]):
+            continue
+        keep = _common_run(old, new, drop)
+        if best is None or keep > best[1]:
+            best = (drop, keep)
+        if drop + keep == len(old):
+            # Cửa sổ khớp đến hết list cũ: không thể tốt hơn
+            break
+        candidates += 1
+        if candidates >= MAX_SPLICE_CANDIDATES:
+            break
+    return best
+
+
+def diff(old: Any, new: Any) -> Delta:
+    """
+    Delta turning old into new
+
+    Args:
+        old: Previous JSON-compatible value
+        new: Current JSON-compatible value
+
+    Returns:
+        Delta tree ({} if equal dicts) or a leaf operation
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes: Dict[str, Delta] = {}
+        for key, value in new.items():
+            previous = old.get(key, _MISSING)
+            if previous is _MISSING:
+                changes[key] = ["s", value]
+            elif previous is not value:
+                change = diff(previous, value)
+                if change != {}:
+                    changes[key] = change
+        for key in old:
+            if key not in new:
+                changes[key] = ["d"]
+        return changes
+
+    if isinstance(old, list) and isinstance(new, list):
+        if len(old) == len(new) and all(_equal(a, b) for a, b in zip(old, new)):
+            return {}
+        splice = _splice(old, new)
+        # Splice chỉ có lợi khi giữ lại phần lớn list cũ
+        if splice is not None and splice[1] * 2 >= len(new):
+            drop, keep = splice
+            return ["l", drop, keep, new[keep:]]
+        return ["s", new]
+
+    if _equal(old, new):
+        return {}
+    return ["s", new]
+
+
+def apply(base: Any, delta: Delta) -> Any:
+    """
+    Apply a delta without modifying base
+
+    Dicts along changed paths are copied; untouched subtrees are shared
+    with base.
+
+    Args:
+        base: Value the delta was computed against
+        delta: Result of diff()
+
+    Returns:
+        New value
+    """
+    if isinstance(delta, dict):
+        if not delta:
+            return base
+        result = dict(base)
+        for key, change in delta.items():
+            if isinstance(change, list) and change[0] == "d":
+                result.pop(key, None)
+            else:
+                result[key] = apply(result.get(key), change)
+        return result
+
+    kind = delta[0]
+    if kind == "s":
+        return delta[1]
+    if kind == "l":
+        drop, keep, tail = delta[1], delta[2], delta[3]
+        return base[drop:drop + keep] + list(tail)
+    raise ValueError(f"Unknown delta operation: {kind}")
+
+
+def compose(base: Any, deltas: List[Delta]) -> Any:
+    """Apply consecutive deltas in order"""
+    for delta in deltas:
+        base = apply(base, delta)
+    return base
+
+
+def normalize(snapshot: Dict[str, Any], default: Optional[Callable[[Any], Any]] = None) -> Dict[str, Any]:
+    """
+    JSON round trip of a snapshot, so stored and reconstructed versions are
+    identical (Bars become columns, tuples become lists)
+
+    Args:
+        snapshot: Snapshot dict
+        default: Fallback serializer (e.g. financial_data_fetcher.json_default)
+    """
+    return json.loads(minify_json(snapshot, default))
+
+
+class DeltaStore:
+    """
+    Lớp lưu chuỗi snapshot dưới dạng keyframe định kỳ và delta liên tiếp
+
+    Phiên bản v được lưu ở k_<v>.json (snapshot đầy đủ, mỗi
+    keyframe_interval phiên bản) hoặc d_<v>.json (delta so với v - 1).
+    index.json ghi phiên bản mới nhất, các keyframe và timestamp. Thư mục
+    có thể được publish nguyên trạng để client tĩnh tải index rồi chỉ tải
+    các delta còn thiếu. truncate xóa các phiên bản trước một keyframe, nên
+    phiên bản cũ nhất còn lại luôn là keyframe đầu tiên trong index.
+    """
+
+    def __init__(self, directory: Optional[str] = None, keyframe_interval: Optional[int] = None):
+        self.directory = directory or config.DELTA_DIR
+        self.keyframe_interval = keyframe_interval or config.DELTA_KEYFRAME_INTERVAL
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        self.index_path = os.path.join(self.directory, INDEX_FILE)
+        self.index = self._load_index()
+        self._latest: Optional[Dict[str, Any]] = None
+        # append và truncate có thể chạy ở hai thread (scheduler và retention)
+        self._lock = threading.Lock()
+
+    def _load_index(self) -> Dict[str, Any]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"latest": None, "keyframes": [], "timestamps": {}}
+
+    def _path(self, prefix: str, version: int) -> str:
+        return os.path.join(self.directory, f"{prefix}_{version}.json")
+
+    def _read(self, prefix: str, version: int) -> Any:
+        with open(self._path(prefix, version), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @property
+    def latest_version(self) -> Optional[int]:
+        return self.index["latest"]
+
+    @property
+    def first_version(self) -> Optional[int]:
+        """Phiên bản cũ nhất còn lưu (None nếu store rỗng)"""
+        return self.index["keyframes"][0] if self.index["keyframes"] else None
+
+    def append(self, snapshot: Dict[str, Any],
+               default: Optional[Callable[[Any], Any]] = None,
+               normalized: bool = False) -> int:
+        """
+        Lưu một snapshot mới
+
+        Args:
+            snapshot: Snapshot từ fetch_all_data
+            default: Hàm serialize dự phòng (ví dụ json_default cho Bars)
+            normalized: snapshot đã là kết quả json.loads (bỏ qua normalize)
+
+        Returns:
+            Số phiên bản của snapshot
+        """
+        if not normalized:
+            snapshot = normalize(snapshot, default)
+        with self._lock:
+            # Đọc lại index: tiến trình khác (retention) có thể đã truncate store
+            latest = self.latest_version
+            self.index = self._load_index()
+            if self.latest_version != latest:
+                self._latest = None
+            previous = self.latest()
+            version = 0 if self.latest_version is None else self.latest_version + 1
+
+            if previous is None or version % self.keyframe_interval == 0:
+                write_bytes_atomic(self._path("k", version), minify_json(snapshot))
+                self.index["keyframes"].append(version)
+            else:
+                write_bytes_atomic(self._path("d", version), minify_json(diff(previous, snapshot)))
+
+            self.index["latest"] = version
+            self.index["timestamps"][str(version)] = snapshot.get("timestamp")
+            write_bytes_atomic(self.index_path, minify_json(self.index))
+            self._latest = snapshot
+        return version
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Snapshot mới nhất (giữ trong bộ nhớ sau lần đọc đầu tiên)"""
+        if self._latest is None and self.latest_version is not None:
+            self._latest = self.get(self.latest_version)
+        return self._latest
+
+    def get(self, version: int) -> Dict[str, Any]:
+        """
+        Dựng lại một phiên bản từ keyframe gần nhất trước nó
+
+        Args:
+            version: Số phiên bản
+
+        Returns:
+            Snapshot
+        """
+        if self.latest_version is None or not self.first_version <= version <= self.latest_version:
+            raise KeyError(f"Unknown snapshot version: {version}")
+        if version == self.latest_version and self._latest is not None:
+            return self._latest
+
+        keyframe = max(k for k in self.index["keyframes"] if k <= version)
+        snapshot = self._read("k", keyframe)
+        return compose(snapshot, [self._read("d", current) for current in range(keyframe + 1, version + 1)])
+
+    def delta_since(self, version: Optional[int]) -> Dict[str, Any]:
+        """
+        Phần thay đổi từ một phiên bản client đang có đến phiên bản mới nhất
+
+        Args:
+            version: Phiên bản client đang có (None nếu chưa có)
+
+        Returns:
+            {"version": mới nhất, "delta": {...}} hoặc, nếu client chưa có hoặc
+            có phiên bản không hợp lệ, {"version": mới nhất, "snapshot": {...}}
+        """
+        latest = self.latest_version
+        if latest is None:
+            return {"version": None, "snapshot": None}
+        if version is None or not self.first_version <= version <= latest:
+            return {"version": latest, "snapshot": self.latest()}
+        if version == latest:
+            return {"version": latest, "delta": {}}
+        if version == latest - 1 and latest not in self.index["keyframes"]:
+            return {"version": latest, "delta": self._read("d", latest)}
+        return {"version": latest, "delta": diff(self.get(version), self.latest())}
+
+    def iter_versions(self, start: int, end: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Dựng lại lần lượt các phiên bản trong [start, end)
+
+        Mỗi delta chỉ được áp dụng một lần, không dựng lại từ keyframe cho
+        từng phiên bản như get.
+
+        Yields:
+            (phiên bản, snapshot)
+        """
+        end = min(end, self.latest_version + 1) if self.latest_version is not None else start
+        if start >= end:
+            return
+        snapshot = self.get(start)
+        yield start, snapshot
+        for version in range(start + 1, end):
+            if version in self.index["keyframes"]:
+                snapshot = self._read("k", version)
+            else:
+                snapshot = apply(snapshot, self._read("d", version))
+            yield version, snapshot
+
+    def truncate(self, keyframe: int) -> int:
+        """
+        Xóa mọi phiên bản trước một keyframe
+
+        Args:
+            keyframe: Keyframe trở thành phiên bản cũ nhất
+
+        Returns:
+            Số phiên bản đã xóa
+        """
+        with self._lock:
+            self.index = self._load_index()
+            if keyframe not in self.index["keyframes"]:
+                raise KeyError(f"Not a keyframe: {keyframe}")
+            first = self.first_version
+            # Ghi index trước: nếu dừng giữa chừng chỉ còn lại file thừa, không có phiên bản hỏng
+            self.index["keyframes"] = [k for k in self.index["keyframes"] if k >= keyframe]
+            self.index["timestamps"] = {key: value for key, value in self.index["timestamps"].items()
+                                        if int(key) >= keyframe}
+            write_bytes_atomic(self.index_path, minify_json(self.index))
+        for version in range(first, keyframe):
+            for prefix in ("k", "d"):
+                path = self._path(prefix, version)
+                if os.path.exists(path):
+                    os.remove(path)
+        return keyframe - first
@@ -0,0 +1,377 @@
+"""
+Streaming CSV/Parquet export of stored snapshots, quotes and bars
+"""
+
+import glob
+import json
+import math
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+import config
+from chunkstore import SNAPSHOT_PATTERN, ChunkStore
+from storage import QUOTE_COLUMNS, DataStore
+from utils import HISTORY_KEYS, FlattenSchema
+
+EXPORT_FORMATS = ("csv", "parquet")
+
+BAR_EXPORT_COLUMNS = ["symbol", "timestamp", "open", "high", "low", "close", "volume"]
+
+
+def require_pyarrow():
+    """
+    Import pyarrow (with pyarrow.parquet) for Parquet files
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "Parquet export requires pyarrow: pip install 'financial-data-fetcher[parquet]'"
+        ) from e
+    return pyarrow
+
+
+def export_format(path: str, fmt: Optional[str] = None) -> str:
+    """
+    Resolve the export format from an explicit value or the file extension
+
+    Args:
+        path: Output file path
+        fmt: csv or parquet (default: from extension)
+
+    Returns:
+        Format name
+    """
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".") or "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return fmt
+
+
+class ChunkWriter:
+    """
+    Lớp ghi lần lượt từng chunk DataFrame ra CSV hoặc Parquet với schema cố định
+
+    Các cột thiếu trong chunk được ghi rỗng, cột thừa bị bỏ qua. Kiểu dữ liệu
+    mỗi cột ("float", "string" hoặc "timestamp") được cố định từ đầu để mọi chunk Parquet
+    có cùng schema.
+    """
+
+    def __init__(self, path: str, columns: List[str], types: Dict[str, str],
+                 fmt: Optional[str] = None):
+        self.path = path
+        self.columns = list(columns)
+        self.types = types
+        self.fmt = export_format(path, fmt)
+        self.rows = 0
+        self._file = None
+        self._writer = None
+        self._schema = None
+        self._pa = None
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        if self.fmt == "parquet":
+            pa = self._pa = require_pyarrow()
+            pa_types = {"float": pa.float64(), "string": pa.string(),
+                        "timestamp": pa.timestamp("s", tz="UTC")}
+            self._schema = pa.schema([(column, pa_types[types.get(column, "string")])
+                                      for column in self.columns])
+            self._writer = pa.parquet.ParquetWriter(path, self._schema)
+        else:
+            self._file = open(path, "w", encoding="utf-8", newline="")
+
+    def _coerce(self, frame: pd.DataFrame) -> pd.DataFrame:
+        frame = frame.reindex(columns=self.columns)
+        for column in self.columns:
+            kind = self.types.get(column, "string")
+            if kind == "float":
+                frame[column] = pd.to_numeric(frame[column], errors="coerce").astype(float)
+            elif kind == "timestamp":
+                frame[column] = pd.to_datetime(frame[column], unit="s", utc=True)
+            else:
+                values = frame[column]
+                frame[column] = values.where(values.isna(), values.astype(str))
+        return frame
+
+    def write(self, frame: pd.DataFrame):
+        """
+        Ghi một chunk
+
+        Args:
+            frame: DataFrame có (một phần) các cột của schema
+        """
+        frame = self._coerce(frame)
+        if self.fmt == "parquet":
+            table = self._pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self._file, header=self.rows == 0, index=False,
+                         date_format="%Y-%m-%dT%H:%M:%SZ")
+        self.rows += len(frame)
+
+    def close(self):
+        """Hoàn tất file (ghi header nếu chưa có dòng nào)"""
+        if self.fmt == "parquet":
+            self._writer.close()
+        else:
+            if self.rows == 0:
+                self._file.write(",".join(self.columns) + "\n")
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_snapshot_files(directory: Optional[str] = None,
+                        pattern: str = SNAPSHOT_PATTERN,
+                        store: Optional[ChunkStore] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Read saved snapshot files one at a time, oldest first
+
+    Chunked histories are reassembled, legacy full files are read as is.
+
+    Args:
+        directory: Snapshot directory (default DATA_DIR)
+        pattern: File name glob
+        store: Chunk store holding the bars (default CHUNK_DIR)
+
+    Yields:
+        Snapshot dicts
+    """
+    store = store or ChunkStore(snapshot_dir=directory)
+    for path in sorted(glob.glob(os.path.join(directory or store.snapshot_dir, pattern))):
+        yield store.load_snapshot(path)
+
+
+def schema_path(path: str) -> str:
+    """Sidecar file holding the FlattenSchema of a snapshot export"""
+    return path + ".schema.json"
+
+
+def column_type(values: Iterable[Any]) -> str:
+    """
+    Export type of a column from every non-null value
+
+    Returns:
+        "float" if all non-null values are numbers, "string" otherwise
+        (including a column with no value at all)
+    """
+    kind = None
+    for value in values:
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            continue
+        value_kind = "float" if isinstance(value, (int, float)) else "string"
+        if kind is None:
+            kind = value_kind
+        elif kind != value_kind:
+            return "string"
+    return kind or "string"
+
+
+def snapshot_schema(snapshots: Iterable[Dict[str, Any]],
+                    sep: str = '_') -> Tuple[FlattenSchema, Dict[str, str]]:
+    """
+    Union column schema and types of a batch of snapshots
+
+    Every key path found in any snapshot (without history containers)
+    becomes a column, in order of first appearance. A path that is a leaf
+    in one snapshot and a dict in another only keeps the nested columns.
+
+    Args:
+        snapshots: Snapshot dicts (iterated once)
+        sep: Separator for flattened keys
+
+    Returns:
+        (schema, column types) for export_snapshots
+    """
+    paths: Dict[Tuple[str, ...], List[Any]] = {}
+    for snapshot in snapshots:
+        compiled = FlattenSchema.compile(snapshot, sep, exclude=HISTORY_KEYS)
+        for path, value in zip(compiled.paths, compiled.values(snapshot, strict=False)):
+            paths.setdefault(path, []).append(value)
+
+    prefixes = {path[:depth] for path in paths for depth in range(1, len(path))}
+    kept = [path for path in paths if path not in prefixes]
+    schema = FlattenSchema(kept, sep)
+    types = {key: column_type(paths[path]) for key, path in zip(schema.keys, kept)}
+    return schema, types
+
+
+def export_snapshots(snapshots: Iterable[Dict[str, Any]], path: str,
+                     schema: Optional[FlattenSchema] = None, fmt: Optional[str] = None,
+                     chunk_size: Optional[int] = None,
+                     types: Optional[Dict[str, str]] = None) -> int:
+    """
+    Stream snapshots to one row each with a fixed column schema
+
+    The schema is ``schema`` or compiled once from the first snapshot
+    (without history containers); values are then extracted along its key
+    paths, keys that appear later are dropped and missing keys are left
+    empty (use snapshot_schema() for a batch whose keys vary). Column types
+    default to column_type() of each column of the first chunk. The schema is saved next
+    to the export for read_snapshots().
+
+    Args:
+        snapshots: Iterable of snapshot dicts (e.g. iter_snapshot_files())
+        path: Output file
+        schema: Column schema
+        fmt: csv or parquet (default: from extension)
+        chunk_size: Rows per written chunk
+        types: Dict column -> "float" or "string"
+
+    Returns:
+        Number of rows written
+    """
+    chunk_size = chunk_size or config.EXPORT_CHUNK_SIZE
+    iterator = iter(snapshots)
+    first = next(iterator, None)
+    if schema is None:
+        schema = FlattenSchema.compile(first or {}, exclude=HISTORY_KEYS)
+
+    # Chunk đầu được giữ lại cho tới khi biết kiểu của các cột
+    chunk = [schema.values(first, strict=False)] if first is not None else []
+    for snapshot in iterator:
+        chunk.append(schema.values(snapshot, strict=False))
+        if len(chunk) >= chunk_size:
+            break
+    types = types or {key: column_type(row[position] for row in chunk)
+                      for position, key in enumerate(schema.keys)}
+
+    with ChunkWriter(path, schema.keys, types, fmt) as writer:
+        for snapshot in iterator:
+            if len(chunk) >= chunk_size:
+                writer.write(pd.DataFrame(chunk, columns=schema.keys))
+                chunk = []
+            chunk.append(schema.values(snapshot, strict=False))
+        if chunk:
+            writer.write(pd.DataFrame(chunk, columns=schema.keys))
+
+    with open(schema_path(path), "w", encoding="utf-8") as f:
+        json.dump(dict(schema.to_dict(), types=types), f)
+    return writer.rows
+
+
+def read_snapshots(path: str, fmt: Optional[str] = None,
+                   chunk_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Read an export written by export_snapshots back into nested snapshots
+
+    Args:
+        path: Exported file
+        fmt: csv or parquet (default: from extension)
+        chunk_size: Rows read at a time
+
+    Yields:
+        Snapshot dicts (empty values as None)
+    """
+    with open(schema_path(path), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    schema = FlattenSchema.from_dict(meta)
+    chunk_size = chunk_size or config.EXPORT_CHUNK_SIZE
+
+    if export_format(path, fmt) == "parquet":
+        parquet_file = require_pyarrow().parquet.ParquetFile(path)
+        frames = (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=chunk_size))
+    else:
+        frames = pd.read_csv(path, chunksize=chunk_size, dtype={
+            key: str for key, kind in meta.get("types", {}).items() if kind == "string"
+        })
+
+    for frame in frames:
+        frame = frame.astype(object).where(frame.notna(), None)
+        for row in frame.itertuples(index=False, name=None):
+            yield schema.unflatten(list(row))
+
+
+def export_bars(path: str, store: Optional[DataStore] = None,
+                symbols: Optional[Iterable[str]] = None, start: Optional[int] = None,
+                end: Optional[int] = None, fmt: Optional[str] = None,
+                chunk_size: Optional[int] = None) -> int:
+    """
+    Stream a range of stored bars
+
+    Args:
+        path: Output file
+        store: Data store (default: the configured database)
+        symbols: Symbols to export (default: all)
+        start: Epoch seconds start (inclusive)
+        end: Epoch seconds end (exclusive)
+        fmt: csv or parquet (default: from extension)
+        chunk_size: Rows per read/write chunk
+
+    Returns:
+        Number of rows written
+    """
+    store = store or DataStore()
+    types = {column: "float" for column in BAR_EXPORT_COLUMNS}
+    types.update(symbol="string", timestamp="timestamp")
+
+    with ChunkWriter(path, BAR_EXPORT_COLUMNS, types, fmt) as writer:
+        for rows in store.iter_bars(symbols, start, end, chunk_size or config.EXPORT_CHUNK_SIZE):
+            writer.write(pd.DataFrame(rows, columns=BAR_EXPORT_COLUMNS))
+        return writer.rows
+
+
+def export_quotes(path: str, store: Optional[DataStore] = None,
+                  symbols: Optional[Iterable[str]] = None, start: Optional[str] = None,
+                  end: Optional[str] = None, fmt: Optional[str] = None,
+                  chunk_size: Optional[int] = None) -> int:
+    """
+    Stream stored quote snapshots
+
+    Args:
+        path: Output file
+        store: Data store (default: the configured database)
+        symbols: Symbols to export (default: all)
+        start: ISO timestamp start (inclusive)
+        end: ISO timestamp end (exclusive)
+        fmt: csv or parquet (default: from extension)
+        chunk_size: Rows per read/write chunk
+
+    Returns:
+        Number of rows written
+    """
+    store = store or DataStore()
+    types = {column: "float" for column in QUOTE_COLUMNS}
+    types.update(symbol="string", timestamp="string")
+
+    with ChunkWriter(path, QUOTE_COLUMNS, types, fmt) as writer:
+        for rows in store.iter_quotes(symbols, start, end, chunk_size or config.EXPORT_CHUNK_SIZE):
+            writer.write(pd.DataFrame(rows, columns=QUOTE_COLUMNS))
+        return writer.rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export stored data to CSV or Parquet")
+    parser.add_argument("kind", choices=["snapshots", "quotes", "bars"])
+    parser.add_argument("output", help="Output file (.csv or .parquet)")
+    parser.add_argument("--symbols", nargs="*", default=None)
+    parser.add_argument("--start", default=None, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="End date (YYYY-MM-DD, exclusive)")
+    parser.add_argument("--format", dest="fmt", choices=EXPORT_FORMATS, default=None)
+    args = parser.parse_args()
+
+    if args.kind == "snapshots":
+        written = export_snapshots(iter_snapshot_files(), args.output, fmt=args.fmt)
+    elif args.kind == "quotes":
+        written = export_quotes(args.output, symbols=args.symbols, start=args.start,
+                                end=args.end, fmt=args.fmt)
+    else:
+        to_epoch = lambda value: int(pd.Timestamp(value, tz="UTC").timestamp()) if value else None
+        written = export_bars(args.output, symbols=args.symbols, start=to_epoch(args.start),
+                              end=to_epoch(args.end), fmt=args.fmt)
+    print(f"Exported {written} rows to {args.output}")
@@ -1,12 +1,34 @@
-import yfinance as yf
 import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
 import os
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 import config
+from storage import DataStore
+from rate_limiter import RateLimiter
+from models import Quote, Bars
+from universe import load_universe, batched
+from lazy import lazy_import
+from chunkstore import ChunkStore
+
+# yfinance chỉ được import khi thực sự gọi Yahoo Finance
+yf = lazy_import("yfinance")
+
+# Cách chuyển Bars sang historical_data theo từng định dạng
+HISTORY_FORMATS = {
+    "records": Bars.to_records,
+    "columns": Bars.to_columns,
+    "bars": lambda bars: bars
+}
+
+def json_default(obj: Any) -> Any:
+    """Serialize các đối tượng không phải JSON (Bars chỉ được chuyển đổi khi ghi)"""
+    if isinstance(obj, Bars):
+        return obj.to_columns()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 class FinancialDataFetcher:
     """
@@ -17,50 +39,223 @@ class FinancialDataFetcher:
         self.symbols = config.SYMBOLS
         self.fred_series = config.FRED_SERIES
         self.data_dir = config.DATA_DIR
+        self.rate_limiter = RateLimiter(config.API_RATE_LIMIT)
         self._ensure_data_dir()
+        self._chunks: Optional[ChunkStore] = None
+    
+    @property
+    def chunks(self) -> ChunkStore:
+        """ChunkStore chứa bars lịch sử của các snapshot (tạo khi dùng lần đầu)"""
+        if self._chunks is None:
+            self._chunks = ChunkStore(snapshot_dir=self.data_dir)
+        return self._chunks
     
     def _ensure_data_dir(self):
         """Tạo thư mục data nếu chưa tồn tại"""
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
     
-    def fetch_yahoo_finance_data(self, symbol: str, period: str = "1d") -> Dict[str, Any]:
+    def fetch_yahoo_finance_data(self, symbol: str, period: str = "1d",
+                                 history_format: Optional[str] = None) -> Dict[str, Any]:
         """
         Lấy dữ liệu từ Yahoo Finance
         
         Args:
             symbol: Mã chứng khoán (VD: "GC=F" cho vàng)
             period: Khoảng thời gian ("1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max")
+            history_format: Định dạng historical_data: "records", "columns" hoặc
+                "bars" (mặc định config.HISTORY_FORMAT)
         
         Returns:
             Dict chứa thông tin giá và metadata
         """
+        history_format = history_format or config.HISTORY_FORMAT
+        if history_format not in HISTORY_FORMATS:
+            return {"error": f"Unknown history format: {history_format}"}
+        
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=period)
+            quote, bars = self.fetch_quote(symbol, period=period)
             
-            if hist.empty:
-                return {"error": f"No data found for {symbol}"}
-            
-            current_price = hist['Close'].iloc[-1]
-            change = current_price - hist['Close'].iloc[-2] if len(hist) > 1 else 0
-            change_percent = (change / hist['Close'].iloc[-2] * 100) if len(hist) > 1 and hist['Close'].iloc[-2] != 0 else 0
-            
-            return {
-                "symbol": symbol,
-                "current_price": float(current_price),
-                "change": float(change),
-                "change_percent": float(change_percent),
-                "high": float(hist['High'].iloc[-1]),
-                "low": float(hist['Low'].iloc[-1]),
-                "volume": int(hist['Volume'].iloc[-1]) if 'Volume' in hist.columns else 0,
-                "timestamp": datetime.now().isoformat(),
-                "historical_data": hist.to_dict('records')
-            }
+            # Chuyển sang dict cũ chỉ ở đầu ra
+            result = quote.to_dict()
+            result["historical_data"] = HISTORY_FORMATS[history_format](bars)
+            return result
             
+        except LookupError as e:
+            return {"error": str(e)}
         except Exception as e:
             return {"error": f"Error fetching data for {symbol}: {str(e)}"}
     
+    def fetch_quote(self, symbol: str, period: str = "1d") -> Tuple[Quote, Bars]:
+        """
+        Lấy quote và dữ liệu lịch sử dạng gọn (Quote + Bars) từ Yahoo Finance
+        
+        Args:
+            symbol: Mã chứng khoán
+            period: Khoảng thời gian (giống fetch_yahoo_finance_data)
+        
+        Returns:
+            Tuple (Quote, Bars)
+        
+        Raises:
+            LookupError: Nếu không có dữ liệu
+        """
+        self.rate_limiter.acquire()
+        ticker = yf.Ticker(symbol)
+        hist = ticker.history(period=period)
+        
+        if hist.empty:
+            raise LookupError(f"No data found for {symbol}")
+        
+        bars = Bars.from_dataframe(hist)
+        return self._build_quote(symbol, bars), bars
+    
+    def _build_quote(self, symbol: str, bars: Bars) -> Quote:
+        """
+        Tính giá hiện tại và biến động từ dữ liệu lịch sử
+        
+        Args:
+            symbol: Mã chứng khoán
+            bars: Dữ liệu lịch sử (không rỗng)
+        
+        Returns:
+            Quote
+        """
+        close = bars.close
+        current_price = float(close[-1])
+        previous = float(close[-2]) if len(close) > 1 else None
+        change = current_price - previous if previous is not None else 0.0
+        change_percent = (change / previous * 100) if previous else 0.0
+        volume = bars.volume[-1]
+        
+        return Quote(
+            symbol=symbol,
+            current_price=current_price,
+            change=float(change),
+            change_percent=float(change_percent),
+            high=float(bars.high[-1]),
+            low=float(bars.low[-1]),
+            volume=int(volume) if not np.isnan(volume) else 0,
+            timestamp=datetime.now().isoformat()
+        )
+    
+    def fetch_yahoo_batch(self, symbols: List[str], period: str = "1d",
+                          start: Optional[str] = None,
+                          end: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Lấy dữ liệu lịch sử cho nhiều mã trong một request Yahoo Finance
+        
+        Args:
+            symbols: Danh sách mã chứng khoán
+            period: Khoảng thời gian (giống fetch_yahoo_finance_data)
+            start: Ngày bắt đầu (YYYY-MM-DD), nếu có sẽ thay cho period
+            end: Ngày kết thúc (YYYY-MM-DD, không bao gồm)
+        
+        Returns:
+            Dict symbol -> DataFrame OHLCV (rỗng nếu không có dữ liệu)
+        """
+        if start:
+            window = {"start": start, "end": end}
+        else:
+            window = {"period": period}
+        
+        self.rate_limiter.acquire()
+        frame = yf.download(
+            symbols,
+            **window,
+            group_by="ticker",
+            auto_adjust=True,
+            threads=False,
+            progress=False
+        )
+        
+        histories = {}
+        for symbol in symbols:
+            if isinstance(frame.columns, pd.MultiIndex):
+                if symbol not in frame.columns.get_level_values(0):
+                    histories[symbol] = pd.DataFrame()
+                    continue
+                hist = frame[symbol]
+            else:
+                hist = frame
+            histories[symbol] = hist.dropna(how="all")
+        
+        return histories
+    
+    def _fetch_universe_batch(self, symbols: List[str], period: str) -> Dict[str, Any]:
+        """Lấy một batch của universe, trả về quotes, histories và lỗi"""
+        result = {"quotes": [], "histories": {}, "errors": {}}
+        
+        try:
+            histories = self.fetch_yahoo_batch(symbols, period=period)
+        except Exception as e:
+            result["errors"] = {symbol: f"Error fetching batch: {str(e)}" for symbol in symbols}
+            return result
+        
+        for symbol, hist in histories.items():
+            if hist.empty:
+                result["errors"][symbol] = f"No data found for {symbol}"
+                continue
+            bars = Bars.from_dataframe(hist)
+            result["quotes"].append(self._build_quote(symbol, bars))
+            result["histories"][symbol] = bars
+        
+        return result
+    
+    def fetch_universe_data(self, symbols: Optional[List[str]] = None,
+                            store: Optional[DataStore] = None,
+                            batch_size: Optional[int] = None,
+                            max_workers: Optional[int] = None,
+                            period: str = "1d") -> Dict[str, int]:
+        """
+        Lấy dữ liệu cho toàn bộ universe theo từng batch chạy song song.
+        Kết quả mỗi batch được ghi thẳng vào store ngay khi hoàn tất, không
+        giữ toàn bộ dữ liệu trong bộ nhớ.
+        
+        Args:
+            symbols: Danh sách mã (mặc định đọc từ config.UNIVERSE_FILE)
+            store: DataStore để ghi kết quả (mặc định mở database trong data_dir
+                và đóng lại khi xong)
+            batch_size: Số mã mỗi batch
+            max_workers: Số batch chạy song song
+            period: Khoảng thời gian lịch sử
+        
+        Returns:
+            Dict thống kê số batch, số mã thành công và lỗi
+        """
+        if store is None:
+            with DataStore() as store:
+                return self.fetch_universe_data(symbols, store, batch_size, max_workers, period)
+        if symbols is None:
+            symbols = [entry["symbol"] for entry in load_universe()]
+        batch_size = batch_size or config.UNIVERSE_BATCH_SIZE
+        max_workers = max_workers or config.MAX_WORKERS
+        
+        stats = {"batches": 0, "succeeded": 0, "failed": 0}
+        
+        def store_result(future):
+            result = future.result()
+            store.save_batch(result["quotes"], result["histories"], result["errors"])
+            stats["batches"] += 1
+            stats["succeeded"] += len(result["quotes"])
+            stats["failed"] += len(result["errors"])
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+            for batch in batched(symbols, batch_size):
+                pending.add(executor.submit(self._fetch_universe_batch, batch, period))
+                
+                # Giới hạn số batch đang chờ để bộ nhớ không tăng theo kích thước universe
+                if len(pending) >= max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        store_result(future)
+            
+            for future in as_completed(pending):
+                store_result(future)
+        
+        return stats
+    
     def fetch_fred_data(self, series_id: str, limit: int = 1) -> Dict[str, Any]:
         """
         Lấy dữ liệu từ FRED (Federal Reserve Economic Data)
@@ -85,6 +280,7 @@ class FinancialDataFetcher:
                 "sort_order": "desc"
             }
             
+            self.rate_limiter.acquire()
             response = requests.get(url, params=params)
             response.raise_for_status()
             
@@ -104,6 +300,60 @@ class FinancialDataFetcher:
         except Exception as e:
             return {"error": f"Error fetching FRED data for {series_id}: {str(e)}"}
     
+    def fetch_yahoo_history(self, symbol: str, start: str, end: str,
+                            interval: str = "1d") -> pd.DataFrame:
+        """
+        Lấy dữ liệu lịch sử Yahoo Finance trong một khoảng ngày
+        
+        Args:
+            symbol: Mã chứng khoán
+            start: Ngày bắt đầu (YYYY-MM-DD, bao gồm)
+            end: Ngày kết thúc (YYYY-MM-DD, không bao gồm)
+            interval: Độ phân giải ("1d", "1h", ...)
+        
+        Returns:
+            DataFrame OHLCV (có thể rỗng)
+        """
+        self.rate_limiter.acquire()
+        return yf.Ticker(symbol).history(start=start, end=end, interval=interval)
+    
+    def fetch_fred_observations(self, series_id: str, start: str, end: str) -> pd.DataFrame:
+        """
+        Lấy toàn bộ quan sát FRED trong một khoảng ngày
+        
+        Args:
+            series_id: ID của series dữ liệu
+            start: Ngày bắt đầu (YYYY-MM-DD, bao gồm)
+            end: Ngày kết thúc (YYYY-MM-DD, bao gồm)
+        
+        Returns:
+            DataFrame với cột Close, index theo ngày quan sát
+        """
+        if not config.FRED_API_KEY or config.FRED_API_KEY == "your_fred_api_key":
+            raise ValueError("FRED API key not configured")
+        
+        params = {
+            "series_id": series_id,
+            "api_key": config.FRED_API_KEY,
+            "file_type": "json",
+            "observation_start": start,
+            "observation_end": end,
+            "sort_order": "asc",
+            "limit": 100000
+        }
+        
+        self.rate_limiter.acquire()
+        response = requests.get(config.FRED_BASE_URL, params=params)
+        response.raise_for_status()
+        
+        observations = response.json().get('observations', [])
+        if not observations:
+            return pd.DataFrame(columns=["Close"])
+        
+        values = [float(obs['value']) if obs['value'] != '.' else np.nan for obs in observations]
+        index = pd.to_datetime([obs['date'] for obs in observations])
+        return pd.DataFrame({"Close": values}, index=index)
+    
     def fetch_vn_index_data(self) -> Dict[str, Any]:
         """
         Lấy dữ liệu VN Index
@@ -204,10 +454,13 @@ class FinancialDataFetcher:
             "timestamp": datetime.now().isoformat()
         }
     
-    def fetch_all_data(self) -> Dict[str, Any]:
+    def fetch_all_data(self, save: bool = True) -> Dict[str, Any]:
         """
         Lấy tất cả dữ liệu tài chính
         
+        Args:
+            save: Lưu snapshot vào DATA_DIR (tắt khi caller tự ghi dữ liệu)
+        
         Returns:
             Dict chứa tất cả dữ liệu
         """
@@ -221,7 +474,8 @@ class FinancialDataFetcher:
         }
         
         # Lưu dữ liệu vào file
-        self.save_data_to_file(all_data)
+        if save:
+            self.save_data_to_file(all_data)
         
         return all_data
     
@@ -229,6 +483,9 @@ class FinancialDataFetcher:
         """
         Lưu dữ liệu vào file JSON
         
+        Bars lịch sử được lưu một lần trong ChunkStore và file snapshot chỉ
+        giữ tham chiếu tới các chunk.
+        
         Args:
             data: Dữ liệu cần lưu
             filename: Tên file (nếu không có sẽ tự động tạo theo timestamp)
@@ -239,8 +496,7 @@ class FinancialDataFetcher:
         
         filepath = os.path.join(self.data_dir, filename)
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        self.chunks.save_snapshot(data, filepath, default=json_default)
         
         print(f"Data saved to {filepath}")
     
@@ -257,8 +513,7 @@ class FinancialDataFetcher:
         filepath = os.path.join(self.data_dir, filename)
         
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self.chunks.load_snapshot(filepath)
         except Exception as e:
             print(f"Error loading data from {filepath}: {str(e)}")
             return None
@@ -0,0 +1,217 @@
+"""
+Gap detection and targeted repair of stored time series
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+from storage import DataStore
+from trading_calendar import get_calendar
+
+# Series không theo phiên giao dịch (FRED công bố theo tháng/tuần, không so
+# được với lịch phiên ngày; chúng được tải lại bằng backfill)
+UNSCHEDULED_MARKETS = {"FRED"}
+
+
+def infer_market(symbol: str) -> str:
+    """
+    Infer the market of a symbol
+
+    Args:
+        symbol: Ticker symbol
+
+    Returns:
+        Market code (US, VN, FX, FUTURES, or FRED for FRED series IDs)
+    """
+    if symbol in config.FRED_SERIES.values():
+        return "FRED"
+    if symbol in config.SYMBOL_MARKETS:
+        return config.SYMBOL_MARKETS[symbol]
+    if symbol.endswith("=X"):
+        return "FX"
+    if symbol.endswith("=F"):
+        return "FUTURES"
+    if symbol.endswith(".VN"):
+        return "VN"
+    return "US"
+
+
+def expected_sessions(market: str, start: str, end: str) -> np.ndarray:
+    """
+    Expected daily sessions of a market in [start, end)
+
+    Args:
+        market: Market code
+        start: Start date (YYYY-MM-DD, inclusive)
+        end: End date (YYYY-MM-DD, exclusive)
+
+    Returns:
+        Sorted datetime64[D] array of session dates
+    """
+    return get_calendar(market).sessions(start, end)
+
+
+def stored_session_dates(store: DataStore, symbol: str, market: str) -> np.ndarray:
+    """
+    Session dates (in the market's time zone) that already have a stored bar
+
+    Returns:
+        Sorted unique datetime64[D] array
+    """
+    bars = store.load_bars(symbol)
+    if bars.empty:
+        return np.array([], dtype="datetime64[D]")
+    timezone = config.MARKET_TIMEZONES.get(market, "UTC")
+    local = bars.index.tz_convert(timezone).tz_localize(None)
+    return np.unique(local.values.astype("datetime64[D]"))
+
+
+def missing_ranges(expected: np.ndarray, present: np.ndarray,
+                   merge_within: int = 0) -> List[Tuple[str, str]]:
+    """
+    Collapse missing sessions into the minimal list of date ranges
+
+    Args:
+        expected: Expected session dates (datetime64[D], sorted)
+        present: Dates that already have data
+        merge_within: Merge two ranges separated by at most this many
+            present sessions (trades a few re-fetched bars for fewer requests)
+
+    Returns:
+        List of (start, end) ISO date pairs, end exclusive
+    """
+    missing = np.flatnonzero(~np.isin(expected, present))
+    if missing.size == 0:
+        return []
+
+    breaks = np.flatnonzero(np.diff(missing) > merge_within + 1)
+    starts = missing[np.concatenate(([0], breaks + 1))]
+    ends = missing[np.concatenate((breaks, [missing.size - 1]))]
+
+    one_day = np.timedelta64(1, "D")
+    return [
+        (str(expected[s]), str(expected[e] + one_day))
+        for s, e in zip(starts, ends)
+    ]
+
+
+class GapScanner:
+    """
+    Lớp tìm các khoảng dữ liệu bị thiếu so với lịch giao dịch của từng thị
+    trường và chỉ tải lại đúng những khoảng đó
+    """
+
+    def __init__(self, store: Optional[DataStore] = None, fetcher=None,
+                 merge_within: int = 0):
+        self.store = store or DataStore()
+        self.fetcher = fetcher
+        self.merge_within = merge_within
+
+    def find_gaps(self, symbol: str, market: Optional[str] = None,
+                  start: Optional[str] = None,
+                  end: Optional[str] = None) -> List[Tuple[str, str]]:
+        """
+        Tìm các khoảng thiếu của một mã
+
+        Args:
+            symbol: Mã chứng khoán
+            market: Mã thị trường (mặc định suy ra từ symbol)
+            start: Ngày bắt đầu (mặc định ngày đầu tiên có dữ liệu)
+            end: Ngày kết thúc, không bao gồm (mặc định hôm nay, vì phiên
+                hôm nay có thể chưa kết thúc)
+
+        Returns:
+            List các khoảng (start, end)
+        """
+        market = market or infer_market(symbol)
+        if market in UNSCHEDULED_MARKETS:
+            return []
+        present = stored_session_dates(self.store, symbol, market)
+
+        if start is None:
+            if present.size == 0:
+                return []
+            start = str(present[0])
+        end = end or date.today().isoformat()
+
+        expected = expected_sessions(market, start, end)
+        return missing_ranges(expected, present, self.merge_within)
+
+    def scan(self, universe: List[Dict[str, str]], start: Optional[str] = None,
+             end: Optional[str] = None) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Quét toàn bộ universe
+
+        Args:
+            universe: List dict có key symbol (và market nếu có)
+
+        Returns:
+            Dict symbol -> các khoảng thiếu (chỉ gồm mã có gap)
+        """
+        gaps = {}
+        for entry in universe:
+            symbol = entry["symbol"]
+            ranges = self.find_gaps(symbol, entry.get("market") or None, start, end)
+            if ranges:
+                gaps[symbol] = ranges
+        return gaps
+
+    def repair(self, gaps: Dict[str, List[Tuple[str, str]]],
+               universe: Optional[List[Dict[str, str]]] = None) -> Dict[str, int]:
+        """
+        Tải lại các khoảng thiếu. Các mã có cùng khoảng thiếu được gộp vào
+        một request batch.
+
+        Args:
+            gaps: Kết quả của scan()
+            universe: Universe đã truyền cho scan(); market trong đó được ưu
+                tiên hơn market suy ra từ symbol
+
+        Returns:
+            Dict thống kê số request, số dòng và số lỗi
+        """
+        if self.fetcher is None:
+            from financial_data_fetcher import FinancialDataFetcher
+            self.fetcher = FinancialDataFetcher()
+
+        markets = {entry["symbol"]: entry.get("market") for entry in universe or []}
+        by_range = defaultdict(list)
+        for symbol, ranges in gaps.items():
+            if (markets.get(symbol) or infer_market(symbol)) in UNSCHEDULED_MARKETS:
+                continue
+            for gap in ranges:
+                by_range[gap].append(symbol)
+
+        stats = {"requests": 0, "rows": 0, "failed": 0}
+        for (start, end), symbols in sorted(by_range.items()):
+            stats["requests"] += 1
+            try:
+                histories = self.fetcher.fetch_yahoo_batch(symbols, start=start, end=end)
+            except Exception as e:
+                for symbol in symbols:
+                    self.store.save_error(symbol, f"Gap repair {start}..{end} failed: {str(e)}")
+                stats["failed"] += len(symbols)
+                continue
+
+            for symbol, hist in histories.items():
+                stats["rows"] += self.store.save_bars(symbol, hist)
+
+        return stats
+
+
+# Example usage
+if __name__ == "__main__":
+    from universe import load_universe
+
+    scanner = GapScanner()
+    universe = load_universe()
+    gaps = scanner.scan(universe)
+    print(f"Found gaps in {len(gaps)} symbols "
+          f"({sum(len(r) for r in gaps.values())} ranges)")
+    if gaps:
+        print(f"Repair completed: {scanner.repair(gaps, universe)}")
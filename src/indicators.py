@@ -0,0 +1,624 @@
+"""
+Technical indicators: vectorized price panels (time x symbols) and
+streaming O(1) indicator state
+"""
+
+import math
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from models import Bars
+
+PANEL_INDICATORS = ("sma", "ema", "volatility", "rsi")
+
+
+def as_panel(prices: Union[np.ndarray, pd.DataFrame, Sequence[float]]) -> np.ndarray:
+    """
+    Convert prices to a float 2D array (time x symbols)
+
+    Args:
+        prices: 1D series or 2D matrix of prices
+
+    Returns:
+        2D float array
+    """
+    values = np.asarray(prices, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    if values.ndim != 2:
+        raise ValueError("Prices must be a 1D series or a 2D (time x symbols) matrix")
+    return values
+
+
+def _window_sums(values: np.ndarray, window: int):
+    """Rolling sums and valid-value counts over the last ``window`` rows"""
+    valid = ~np.isnan(values)
+    zero_filled = np.where(valid, values, 0.0)
+
+    padded_sum = np.zeros((values.shape[0] + 1, values.shape[1]))
+    padded_count = np.zeros_like(padded_sum)
+    np.cumsum(zero_filled, axis=0, out=padded_sum[1:])
+    np.cumsum(valid, axis=0, out=padded_count[1:])
+
+    sums = np.full(values.shape, np.nan)
+    counts = np.zeros(values.shape)
+    sums[window - 1:] = padded_sum[window:] - padded_sum[:-window]
+    counts[window - 1:] = padded_count[window:] - padded_count[:-window]
+    return sums, counts
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling mean down each column
+
+    Rows before the first full window, and windows containing NaN, are NaN.
+
+    Args:
+        values: 2D array (time x symbols)
+        window: Window size
+
+    Returns:
+        2D array aligned with ``values``
+    """
+    sums, counts = _window_sums(values, window)
+    with np.errstate(invalid="ignore"):
+        return np.where(counts == window, sums / window, np.nan)
+
+
+def rolling_moments(values: np.ndarray, window: int):
+    """
+    Rolling mean and population standard deviation from one set of sums
+
+    Args:
+        values: 2D array (time x symbols)
+        window: Window size
+
+    Returns:
+        Tuple (mean, std) of 2D arrays aligned with ``values``
+    """
+    # Center each column first so the sum-of-squares does not lose precision
+    # on high price levels
+    with np.errstate(all="ignore"):
+        offset = np.nan_to_num(np.nanmean(values, axis=0))
+    centered = values - offset
+
+    sums, counts = _window_sums(centered, window)
+    squares, _ = _window_sums(centered * centered, window)
+    full = counts == window
+    with np.errstate(invalid="ignore"):
+        mean = sums / window
+        variance = np.maximum(squares / window - mean * mean, 0.0)
+        return (np.where(full, mean + offset, np.nan),
+                np.where(full, np.sqrt(variance), np.nan))
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling population standard deviation (ddof=0, like ``np.std``)
+
+    Args:
+        values: 2D array (time x symbols)
+        window: Window size
+
+    Returns:
+        2D array aligned with ``values``
+    """
+    return rolling_moments(values, window)[1]
+
+
+def exponential_mean(values: np.ndarray, span: int) -> np.ndarray:
+    """
+    Exponential moving average (same weights as ``Series.ewm(span).mean()``)
+
+    Args:
+        values: 2D array (time x symbols)
+        span: EMA span
+
+    Returns:
+        2D array aligned with ``values``
+    """
+    return pd.DataFrame(values).ewm(span=span).mean().to_numpy()
+
+
+def rolling_rsi(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    RSI from the simple average of gains and losses over ``window`` changes
+
+    Args:
+        values: 2D array (time x symbols)
+        window: Window size
+
+    Returns:
+        2D array aligned with ``values`` (first ``window`` rows are NaN)
+    """
+    deltas = np.full(values.shape, np.nan)
+    deltas[1:] = np.diff(values, axis=0)
+    gains = np.where(deltas > 0, deltas, np.where(np.isnan(deltas), np.nan, 0.0))
+    losses = np.where(deltas < 0, -deltas, np.where(np.isnan(deltas), np.nan, 0.0))
+
+    avg_gains = rolling_mean(gains, window)
+    avg_losses = rolling_mean(losses, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gains / avg_losses)
+    return np.where(avg_losses == 0, 100.0, rsi)
+
+
+def compute_indicator_panel(prices: Union[np.ndarray, pd.DataFrame],
+                            windows: Iterable[int] = (20,),
+                            indicators: Iterable[str] = PANEL_INDICATORS
+                            ) -> Dict[str, Dict[int, np.ndarray]]:
+    """
+    Compute full indicator series for every symbol and window in one pass
+
+    The last row of each output matches ``utils.calculate_technical_indicators``
+    for the corresponding column and window.
+
+    Args:
+        prices: Price matrix (time x symbols) or a single series
+        windows: Window sizes
+        indicators: Any of sma, ema, volatility, rsi
+
+    Returns:
+        Dict indicator -> {window: 2D array aligned with prices}
+    """
+    values = as_panel(prices)
+    indicators = list(indicators)
+    unknown = set(indicators) - set(PANEL_INDICATORS)
+    if unknown:
+        raise ValueError(f"Unknown indicators: {sorted(unknown)}")
+
+    calculators = {
+        "sma": rolling_mean,
+        "ema": exponential_mean,
+        "volatility": rolling_std,
+        "rsi": rolling_rsi
+    }
+
+    return {
+        name: {window: calculators[name](values, window) for window in windows}
+        for name in indicators
+    }
+
+
+EXTENDED_INDICATORS = PANEL_INDICATORS + ("macd", "bollinger", "atr", "drawdown", "sharpe")
+
+
+def compute_indicators(prices: Union[Bars, np.ndarray, pd.DataFrame, Sequence[float]],
+                       high: Optional[np.ndarray] = None,
+                       low: Optional[np.ndarray] = None,
+                       indicators: Iterable[str] = EXTENDED_INDICATORS,
+                       window: int = 20,
+                       bollinger_k: float = 2.0,
+                       macd_spans: Tuple[int, int, int] = (12, 26, 9),
+                       periods_per_year: int = 252) -> Dict[str, np.ndarray]:
+    """
+    Compute several indicators together in a single fused pass
+
+    Each input array is converted once and shared intermediates (rolling
+    mean/std, EMAs, returns, previous close) are computed at most once, no
+    matter how many indicators use them.
+
+    Args:
+        prices: Close prices (1D or time x symbols), or Bars (uses Close,
+            High and Low)
+        high: High prices, required for ATR unless ``prices`` is Bars
+        low: Low prices, required for ATR unless ``prices`` is Bars
+        indicators: Any of sma, ema, volatility, rsi, macd, bollinger,
+            atr, drawdown, sharpe
+        window: Window for sma, ema, volatility, rsi, bollinger, atr,
+            drawdown and sharpe
+        bollinger_k: Band width in standard deviations
+        macd_spans: (fast, slow, signal) EMA spans
+        periods_per_year: Annualization factor for the rolling Sharpe ratio
+
+    Returns:
+        Dict output name -> 2D array aligned with the prices. MACD emits
+        macd, macd_signal and macd_hist; Bollinger emits bollinger_middle,
+        bollinger_upper and bollinger_lower.
+    """
+    if isinstance(prices, Bars):
+        prices, high, low = prices.close, prices.high, prices.low
+
+    indicators = list(indicators)
+    unknown = set(indicators) - set(EXTENDED_INDICATORS)
+    if unknown:
+        raise ValueError(f"Unknown indicators: {sorted(unknown)}")
+
+    close = as_panel(prices)
+    cache: Dict[str, Any] = {}
+
+    def shared(name, compute):
+        if name not in cache:
+            cache[name] = compute()
+        return cache[name]
+
+    def moments():
+        return shared("moments", lambda: rolling_moments(close, window))
+
+    def ema(span):
+        return shared(f"ema_{span}", lambda: exponential_mean(close, span))
+
+    def previous_close():
+        def compute():
+            shifted = np.full(close.shape, np.nan)
+            shifted[1:] = close[:-1]
+            return shifted
+        return shared("previous_close", compute)
+
+    outputs: Dict[str, np.ndarray] = {}
+    for name in indicators:
+        if name == "sma":
+            outputs["sma"] = moments()[0]
+        elif name == "volatility":
+            outputs["volatility"] = moments()[1]
+        elif name == "ema":
+            outputs["ema"] = ema(window)
+        elif name == "rsi":
+            outputs["rsi"] = rolling_rsi(close, window)
+        elif name == "macd":
+            fast, slow, signal = macd_spans
+            macd = ema(fast) - ema(slow)
+            macd_signal = pd.DataFrame(macd).ewm(span=signal).mean().to_numpy()
+            outputs["macd"] = macd
+            outputs["macd_signal"] = macd_signal
+            outputs["macd_hist"] = macd - macd_signal
+        elif name == "bollinger":
+            mean, std = moments()
+            outputs["bollinger_middle"] = mean
+            outputs["bollinger_upper"] = mean + bollinger_k * std
+            outputs["bollinger_lower"] = mean - bollinger_k * std
+        elif name == "atr":
+            if high is None or low is None:
+                raise ValueError("ATR needs high and low prices")
+            high_values, low_values = as_panel(high), as_panel(low)
+            prev = previous_close()
+            true_range = np.fmax(
+                high_values - low_values,
+                np.fmax(np.abs(high_values - prev), np.abs(low_values - prev))
+            )
+            # Wilder smoothing
+            outputs["atr"] = pd.DataFrame(true_range).ewm(
+                alpha=1 / window, adjust=False
+            ).mean().to_numpy()
+        elif name == "drawdown":
+            peak = pd.DataFrame(close).rolling(window, min_periods=1).max().to_numpy()
+            outputs["drawdown"] = close / peak - 1
+        elif name == "sharpe":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                returns = close / previous_close() - 1
+                mean, std = rolling_moments(returns, window)
+                outputs["sharpe"] = np.where(std > 0, mean / std, np.nan) * math.sqrt(periods_per_year)
+
+    return outputs
+
+
+def history_closes(history: Any) -> List[float]:
+    """
+    Closing prices of a history container, oldest first
+
+    Args:
+        history: Bars, "columns" dict or "records" list (historical_data)
+
+    Returns:
+        List of floats (empty if the history has no Close values)
+    """
+    if isinstance(history, Bars):
+        closes = history.close
+    elif isinstance(history, dict):
+        closes = history.get("Close") or []
+    elif isinstance(history, list):
+        closes = [row.get("Close") for row in history if isinstance(row, dict)]
+    else:
+        return []
+    return [float(value) for value in closes if value is not None]
+
+
+
+def history_last_time(history: Any) -> Optional[pd.Timestamp]:
+    """
+    Timestamp of the last bar of a history container
+
+    Args:
+        history: Bars, "columns" dict or "records" list (historical_data)
+
+    Returns:
+        Time-zone-aware Timestamp (UTC when the history has no time zone),
+        or None for empty histories and "records" lists, which carry no
+        timestamps
+    """
+    if isinstance(history, Bars):
+        if len(history.index) == 0:
+            return None
+        stamp, tz = pd.Timestamp(history.index[-1]), "UTC"
+    elif isinstance(history, dict) and history.get("index"):
+        stamp, tz = pd.Timestamp(history["index"][-1]), history.get("tz") or "UTC"
+    else:
+        return None
+    return stamp.tz_localize(tz) if stamp.tzinfo is None else stamp
+
+class RollingWindow:
+    """
+    O(1) rolling mean and population standard deviation from a running sum
+    and sum of squares over the last ``window`` values
+    """
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError("Window must be at least 1")
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.offset = None
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, value: float):
+        """Append a new value, dropping the oldest one when the window is full"""
+        if not math.isfinite(value):
+            # Một giá NaN/inf sẽ làm hỏng vĩnh viễn các tổng tích lũy
+            return
+        if self.offset is None:
+            # Values are stored relative to the first one to keep sums precise
+            self.offset = value
+        centered = value - self.offset
+        if len(self.values) == self.window:
+            oldest = self.values[0]
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.values.append(centered)
+        self.total += centered
+        self.total_sq += centered * centered
+
+    def revise(self, value: float):
+        """Replace the most recent value (e.g. a still-forming bar)"""
+        if not math.isfinite(value):
+            return
+        if not self.values:
+            self.update(value)
+            return
+        centered = value - self.offset
+        latest = self.values[-1]
+        self.total += centered - latest
+        self.total_sq += centered * centered - latest * latest
+        self.values[-1] = centered
+
+    @property
+    def ready(self) -> bool:
+        return len(self.values) == self.window
+
+    @property
+    def mean(self) -> Optional[float]:
+        if not self.ready:
+            return None
+        return self.offset + self.total / self.window
+
+    @property
+    def std(self) -> Optional[float]:
+        if not self.ready:
+            return None
+        mean = self.total / self.window
+        return math.sqrt(max(self.total_sq / self.window - mean * mean, 0.0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "window": self.window,
+            "values": list(self.values),
+            "offset": self.offset,
+            "total": self.total,
+            "total_sq": self.total_sq
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RollingWindow":
+        state = cls(data["window"])
+        state.values.extend(data["values"])
+        state.offset = data["offset"]
+        state.total = data["total"]
+        state.total_sq = data["total_sq"]
+        return state
+
+
+class IncrementalEMA:
+    """
+    O(1) exponential moving average with the same weights as
+    ``Series.ewm(span).mean()`` (adjust=True)
+    """
+
+    def __init__(self, span: int):
+        self.span = span
+        self.decay = 1 - 2 / (span + 1)
+        self.numerator = 0.0
+        self.denominator = 0.0
+        self.last = None
+
+    def update(self, value: float):
+        """Add a new value"""
+        self.numerator = value + self.decay * self.numerator
+        self.denominator = 1 + self.decay * self.denominator
+        self.last = value
+
+    def revise(self, value: float):
+        """Replace the most recent value (its weight is always 1)"""
+        if self.last is None:
+            self.update(value)
+            return
+        self.numerator += value - self.last
+        self.last = value
+
+    @property
+    def value(self) -> Optional[float]:
+        if not self.denominator:
+            return None
+        return self.numerator / self.denominator
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span": self.span,
+            "numerator": self.numerator,
+            "denominator": self.denominator,
+            "last": self.last
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IncrementalEMA":
+        state = cls(data["span"])
+        state.numerator = data["numerator"]
+        state.denominator = data["denominator"]
+        state.last = data["last"]
+        return state
+
+
+class WilderRSI:
+    """
+    O(1) RSI with Wilder smoothing: the first ``period`` changes seed simple
+    averages, later changes update ``avg = (avg * (period - 1) + x) / period``
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.last_price = None
+        self._previous = None
+
+    def _snapshot(self):
+        return (self.count, self.avg_gain, self.avg_loss, self.last_price)
+
+    def update(self, price: float):
+        """Add a new price"""
+        self._previous = self._snapshot()
+        if self.last_price is not None:
+            delta = price - self.last_price
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            self.count += 1
+            if self.count <= self.period:
+                # Seed phase: running simple average of the first changes
+                self.avg_gain += (gain - self.avg_gain) / self.count
+                self.avg_loss += (loss - self.avg_loss) / self.count
+            else:
+                self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+                self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        self.last_price = price
+
+    def revise(self, price: float):
+        """Replace the most recent price"""
+        if self._previous is not None:
+            self.count, self.avg_gain, self.avg_loss, self.last_price = self._previous
+        self.update(price)
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.count < self.period:
+            return None
+        if self.avg_loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "period": self.period,
+            "count": self.count,
+            "avg_gain": self.avg_gain,
+            "avg_loss": self.avg_loss,
+            "last_price": self.last_price,
+            "previous": list(self._previous) if self._previous is not None else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WilderRSI":
+        state = cls(data["period"])
+        state.count = data["count"]
+        state.avg_gain = data["avg_gain"]
+        state.avg_loss = data["avg_loss"]
+        state.last_price = data["last_price"]
+        state._previous = tuple(data["previous"]) if data.get("previous") is not None else None
+        return state
+
+
+class IndicatorState:
+    """
+    Live SMA/volatility, EMA and Wilder RSI for one symbol, updated in
+    constant time per price and serializable between scheduler runs
+
+    Prices sharing the same ``bar_key`` (e.g. the trading date) revise the
+    current bar instead of appending a new one, so intraday ticks keep the
+    indicators live without distorting the daily series.
+    """
+
+    def __init__(self, window: int = 20):
+        self.window = window
+        self.rolling = RollingWindow(window)
+        self.ema = IncrementalEMA(window)
+        self.rsi = WilderRSI(window)
+        self.bar_key = None
+
+    def update(self, price: float, bar_key: Optional[str] = None) -> Dict[str, Optional[float]]:
+        """
+        Feed a new price
+
+        Args:
+            price: Latest price
+            bar_key: Identifier of the bar the price belongs to
+
+        Returns:
+            Dict with the current sma, ema, volatility and rsi
+            (unchanged if the price is missing or not finite)
+        """
+        if price is None or not math.isfinite(price):
+            return self.values()
+        if bar_key is not None and bar_key == self.bar_key:
+            for indicator in (self.rolling, self.ema, self.rsi):
+                indicator.revise(price)
+        else:
+            for indicator in (self.rolling, self.ema, self.rsi):
+                indicator.update(price)
+            self.bar_key = bar_key
+        return self.values()
+
+    def seed(self, prices: Iterable[float], bar_key: Optional[str] = None) -> "IndicatorState":
+        """
+        Warm up from a price history, one bar per price
+
+        Args:
+            prices: Past closes, oldest first
+            bar_key: Identifier of the bar of the last price, so later
+                prices of the same bar revise it
+
+        Returns:
+            self
+        """
+        for price in prices:
+            self.update(price)
+        self.bar_key = bar_key
+        return self
+
+    def values(self) -> Dict[str, Optional[float]]:
+        """Current indicator values (None until enough data)"""
+        return {
+            "sma": self.rolling.mean,
+            "ema": self.ema.value,
+            "volatility": self.rolling.std,
+            "rsi": self.rsi.value
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "window": self.window,
+            "bar_key": self.bar_key,
+            "rolling": self.rolling.to_dict(),
+            "ema": self.ema.to_dict(),
+            "rsi": self.rsi.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndicatorState":
+        state = cls(data["window"])
+        state.bar_key = data.get("bar_key")
+        state.rolling = RollingWindow.from_dict(data["rolling"])
+        state.ema = IncrementalEMA.from_dict(data["ema"])
+        state.rsi = WilderRSI.from_dict(data["rsi"])
+        return state
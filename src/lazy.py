@@ -0,0 +1,64 @@
+"""
+Lazy module loading for fast startup of lightweight entry points
+"""
+
+import importlib
+import sys
+import types
+from typing import Any, Optional
+
+
+class LazyModule(types.ModuleType):
+    """
+    Module proxy that imports the real module on first attribute access
+
+    Attributes are always read from the real module (never copied onto the
+    proxy), so patching the real module, e.g. in tests, stays visible.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_target"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_lazy_target"] = module
+        return module
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_lazy_target"] is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Return a module, importing it only when one of its attributes is used
+
+    Args:
+        name: Absolute module name (e.g. "pandas")
+
+    Returns:
+        The module itself if already imported, otherwise a LazyModule proxy
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
+def loaded_module(name: str) -> Optional[types.ModuleType]:
+    """
+    A module if it has already been imported, without importing it
+
+    Useful for isinstance checks against classes of heavy modules: if the
+    module was never imported, no instance can exist.
+    """
+    return sys.modules.get(name)
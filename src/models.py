@@ -0,0 +1,195 @@
+"""
+Compact typed records for quotes and price bars
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class Quote:
+    """
+    Latest quote of a symbol (slotted to keep per-object overhead small)
+    """
+
+    __slots__ = ("symbol", "current_price", "change", "change_percent",
+                 "high", "low", "volume", "timestamp")
+
+    symbol: str
+    current_price: float
+    change: float
+    change_percent: float
+    high: float
+    low: float
+    volume: int
+    timestamp: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert to the legacy quote dict
+
+        Returns:
+            Dict with the same keys as fetch_yahoo_finance_data
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Quote":
+        """
+        Build a Quote from a legacy quote dict
+
+        Args:
+            data: Dict with at least symbol and current_price
+
+        Returns:
+            Quote instance
+        """
+        return cls(
+            symbol=data["symbol"],
+            current_price=data["current_price"],
+            change=data.get("change", 0.0),
+            change_percent=data.get("change_percent", 0.0),
+            high=data.get("high"),
+            low=data.get("low"),
+            volume=data.get("volume", 0),
+            timestamp=data.get("timestamp"),
+        )
+
+
+class Bars:
+    """
+    Column-oriented OHLCV bars backed by NumPy arrays
+
+    ``index`` holds UTC timestamps as datetime64[ns]; ``tz`` keeps the
+    original time zone so the DataFrame view can be restored exactly.
+    ``columns`` keeps every source column (Open, High, Low, Close, Volume,
+    Dividends, ...) in its original order and dtype.
+    """
+
+    __slots__ = ("index", "columns", "tz")
+
+    def __init__(self, index: np.ndarray, columns: Dict[str, np.ndarray],
+                 tz: Optional[str] = None):
+        self.index = index
+        self.columns = columns
+        self.tz = tz
+
+    @classmethod
+    def from_dataframe(cls, frame: pd.DataFrame) -> "Bars":
+        """
+        Build Bars from a history DataFrame (e.g. Ticker.history)
+
+        Args:
+            frame: DataFrame with a DatetimeIndex
+
+        Returns:
+            Bars instance
+        """
+        index = pd.DatetimeIndex(frame.index)
+        tz = str(index.tz) if index.tz is not None else None
+        if tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        columns = {str(name): frame[name].to_numpy() for name in frame.columns}
+        return cls(index.as_unit("ns").values, columns, tz)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _column(self, name: str) -> np.ndarray:
+        values = self.columns.get(name)
+        if values is None:
+            return np.full(len(self), np.nan)
+        return values
+
+    @property
+    def open(self) -> np.ndarray:
+        return self._column("Open")
+
+    @property
+    def high(self) -> np.ndarray:
+        return self._column("High")
+
+    @property
+    def low(self) -> np.ndarray:
+        return self._column("Low")
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._column("Close")
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self._column("Volume")
+
+    def datetime_index(self) -> pd.DatetimeIndex:
+        """Timestamps as a DatetimeIndex in the original time zone"""
+        index = pd.DatetimeIndex(self.index)
+        if self.tz is not None:
+            index = index.tz_localize("UTC").tz_convert(self.tz)
+        return index
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Materialize as a DataFrame
+
+        Returns:
+            DataFrame equivalent to the source history
+        """
+        return pd.DataFrame(self.columns, index=self.datetime_index())
+
+    def to_columns(self) -> Dict[str, Any]:
+        """
+        Convert to a JSON-friendly column-oriented dict
+
+        The timestamp index is kept as ISO strings in the original time
+        zone (named by ``tz``), one list per column.
+
+        Returns:
+            Dict with index, tz and one list per column
+        """
+        index = self.index
+        if self.tz is not None:
+            index = self.datetime_index().tz_localize(None).values
+        result: Dict[str, Any] = {
+            "index": np.datetime_as_string(index, unit="s").tolist(),
+            "tz": self.tz
+        }
+        for name, values in self.columns.items():
+            result[name] = values.tolist()
+        return result
+
+    @classmethod
+    def from_columns(cls, data: Dict[str, Any]) -> "Bars":
+        """
+        Build Bars from the dict produced by to_columns()
+
+        Args:
+            data: Column-oriented history dict
+
+        Returns:
+            Bars instance
+        """
+        index = pd.DatetimeIndex(data["index"])
+        tz = data.get("tz")
+        if tz is not None:
+            index = index.tz_localize(tz).tz_convert("UTC").tz_localize(None)
+        columns = {
+            name: np.asarray(values, dtype=float)
+            for name, values in data.items()
+            if name not in ("index", "tz")
+        }
+        return cls(index.as_unit("ns").values, columns, tz)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        Convert to the legacy list of row dicts (``to_dict('records')``)
+
+        Returns:
+            List of dicts, one per bar
+        """
+        names = list(self.columns)
+        values = [self.columns[name].tolist() for name in names]
+        return [dict(zip(names, row)) for row in zip(*values)]
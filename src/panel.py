@@ -0,0 +1,170 @@
+"""
+Time-aligned panel builder with as-of joins across markets
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+import config
+from gaps import infer_market
+from storage import DataStore
+
+MARKET_KINDS = {
+    "US": "equity",
+    "VN": "equity",
+    "FUTURES": "futures",
+    "FX": "fx"
+}
+
+
+def series_kind(symbol: str) -> str:
+    """
+    Series type of a symbol, used to pick its forward-fill rule
+
+    Args:
+        symbol: Ticker symbol or FRED series ID
+
+    Returns:
+        One of equity, futures, fx, macro
+    """
+    if symbol in config.FRED_SERIES.values():
+        return "macro"
+    return MARKET_KINDS.get(infer_market(symbol), "equity")
+
+
+def asof_align(target: np.ndarray, times: np.ndarray, values: np.ndarray,
+               tolerance: Optional[np.timedelta64] = None) -> np.ndarray:
+    """
+    As-of join: for each target time take the latest value at or before it
+
+    Args:
+        target: Sorted datetime64 target times
+        times: Sorted datetime64 observation times
+        values: Observed values aligned with ``times``
+        tolerance: Maximum age of the value (None = unlimited)
+
+    Returns:
+        Float array aligned with ``target`` (NaN where no value qualifies)
+    """
+    result = np.full(len(target), np.nan)
+    if len(times) == 0:
+        return result
+
+    positions = np.searchsorted(times, target, side="right") - 1
+    valid = positions >= 0
+    if tolerance is not None:
+        clipped = np.clip(positions, 0, None)
+        valid &= (target - times[clipped]) <= tolerance
+    result[valid] = values[positions[valid]]
+    return result
+
+
+class PanelBuilder:
+    """
+    Lớp ghép nhiều series có lịch giao dịch và múi giờ khác nhau thành một
+    ma trận theo thời gian duy nhất bằng as-of join, với quy tắc
+    forward-fill riêng cho từng loại series
+
+    Ở chế độ daily, mỗi quan sát được gán vào ngày giao dịch theo múi giờ
+    của thị trường đó (phiên VN và phiên US cùng ngày nằm cùng một dòng).
+    Ở chế độ intraday, thời gian được giữ nguyên theo UTC.
+    """
+
+    def __init__(self, store: Optional[DataStore] = None, daily: bool = True):
+        self.store = store
+        self.daily = daily
+        self.series: Dict[str, Tuple[np.ndarray, np.ndarray, str]] = {}
+
+    def add_series(self, name: str, index: Union[pd.DatetimeIndex, np.ndarray],
+                   values: np.ndarray, kind: str = "equity",
+                   timezone: Optional[str] = None):
+        """
+        Thêm một series vào panel
+
+        Args:
+            name: Tên cột
+            index: Thời gian quan sát (có hoặc không có timezone)
+            values: Giá trị tương ứng
+            kind: Loại series (equity, futures, fx, macro)
+            timezone: Múi giờ dùng để xác định ngày giao dịch (chế độ daily)
+        """
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            if not self.daily:
+                index = index.tz_convert("UTC")
+            elif timezone:
+                index = index.tz_convert(timezone)
+            index = index.tz_localize(None)
+        if self.daily:
+            index = index.normalize()
+
+        times = index.as_unit("ns").values
+        values = np.asarray(values, dtype=float)
+        order = np.argsort(times, kind="stable")
+        times, values = times[order], values[order]
+
+        # Nhiều quan sát trong cùng một mốc: giữ quan sát cuối
+        if len(times) > 1:
+            keep = np.append(times[1:] != times[:-1], True)
+            times, values = times[keep], values[keep]
+
+        self.series[name] = (times, values, kind)
+
+    def add_symbol(self, symbol: str, column: str = "Close",
+                   start: Optional[int] = None, end: Optional[int] = None):
+        """
+        Thêm series của một mã từ store
+
+        Args:
+            symbol: Mã chứng khoán hoặc FRED series ID
+            column: Cột giá (Open, High, Low, Close, Volume)
+            start: Epoch seconds bắt đầu
+            end: Epoch seconds kết thúc
+        """
+        if self.store is None:
+            self.store = DataStore()
+        bars = self.store.load_bars(symbol, start=start, end=end)
+        timezone = config.MARKET_TIMEZONES.get(infer_market(symbol), "UTC")
+        self.add_series(
+            symbol,
+            bars.index,
+            bars[column].to_numpy(dtype=float),
+            kind=series_kind(symbol),
+            timezone=timezone
+        )
+
+    def build(self, index: Optional[Union[pd.DatetimeIndex, np.ndarray]] = None,
+              fill: bool = True, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Tạo panel
+
+        Args:
+            index: Các mốc thời gian của panel (mặc định hợp của mọi series)
+            fill: Forward-fill theo PANEL_FILL_TOLERANCE_DAYS; False chỉ giữ
+                giá trị quan sát đúng tại mốc đó
+            columns: Thứ tự cột (mặc định thứ tự thêm series)
+
+        Returns:
+            DataFrame thời gian x series
+        """
+        columns = columns or list(self.series)
+
+        if index is None:
+            all_times = [self.series[name][0] for name in columns]
+            target = np.unique(np.concatenate(all_times)) if all_times else np.array([], dtype="datetime64[ns]")
+        else:
+            target = pd.DatetimeIndex(index).as_unit("ns").values
+
+        data = {}
+        for name in columns:
+            times, values, kind = self.series[name]
+            if fill:
+                days = config.PANEL_FILL_TOLERANCE_DAYS.get(kind)
+                tolerance = np.timedelta64(days, "D") if days is not None else None
+            else:
+                tolerance = np.timedelta64(0, "ns")
+            data[name] = asof_align(target, times, values, tolerance)
+
+        return pd.DataFrame(data, index=pd.DatetimeIndex(target), columns=columns)
@@ -0,0 +1,219 @@
+"""
+Publishing of static artifacts: minified, content-hashed and precompressed
+
+Each published artifact is written as ``<stem>.<hash>.<ext>`` with ``.gz``
+(and ``.br`` when brotli is installed) siblings for servers or CDNs that
+serve precompressed files. A small ``manifest.json`` maps logical names to
+the current hashed files; it is the only file that must be revalidated,
+everything else can be cached forever.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Optional
+
+import config
+from site_builder import write_atomic
+
+MANIFEST_FILE = "manifest.json"
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def minify_json(payload: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    Serialize a payload as compact UTF-8 JSON
+
+    Args:
+        payload: JSON-serializable value
+        default: Fallback serializer (e.g. financial_data_fetcher.json_default)
+
+    Returns:
+        Encoded JSON
+    """
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False,
+                      default=default).encode("utf-8")
+
+
+def content_hash(content: bytes, length: Optional[int] = None) -> str:
+    """Truncated SHA-256 of the content, used in file names"""
+    return hashlib.sha256(content).hexdigest()[:length or config.PUBLISH_HASH_LENGTH]
+
+
+def write_bytes_atomic(path: str, content: bytes):
+    """Write a binary file through a temporary sibling and os.replace"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+def compressed_variants(content: bytes) -> Dict[str, bytes]:
+    """
+    Precompressed encodings of the content
+
+    Returns:
+        Dict suffix -> compressed bytes (".gz" always, ".br" if brotli is installed)
+    """
+    # mtime=0 giữ file .gz giống hệt nhau giữa các lần build
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    brotli = _brotli()
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    return variants
+
+
+def compress_file(path: str) -> Dict[str, str]:
+    """
+    Write missing precompressed siblings of an immutable file
+
+    Args:
+        path: File whose name already changes with its content
+
+    Returns:
+        Dict suffix -> sibling path
+    """
+    siblings = {suffix: path + suffix for suffix in (".gz", ".br")
+                if suffix == ".gz" or _brotli() is not None}
+    if all(os.path.exists(sibling) for sibling in siblings.values()):
+        return siblings
+
+    with open(path, "rb") as f:
+        content = f.read()
+    for suffix, compressed in compressed_variants(content).items():
+        if not os.path.exists(siblings[suffix]):
+            write_bytes_atomic(siblings[suffix], compressed)
+    return siblings
+
+
+class Publisher:
+    """
+    Lớp ghi các artifact tĩnh vào một thư mục và duy trì manifest
+
+    Manifest hiện có được nạp lại, nên nhiều bước build (fetch dữ liệu,
+    render biểu đồ) có thể cùng cập nhật một manifest. Mỗi tên logic giữ
+    phiên bản hiện tại và phiên bản trước đó (để trang đang tải dở vẫn lấy
+    được file cũ); các phiên bản cũ hơn bị xóa khi ghi manifest.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.path.join(config.SITE_OUTPUT_DIR, "data")
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        self.manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        self.manifest = self._load_manifest()
+        self._stale = set()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.setdefault("files", {})
+        return manifest
+
+    def _remove(self, file_name: str):
+        for suffix in ("", ".gz", ".br"):
+            path = os.path.join(self.directory, file_name + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def publish_bytes(self, name: str, content: bytes) -> str:
+        """
+        Ghi một artifact với tên theo hash nội dung và các bản nén
+
+        Args:
+            name: Tên logic (ví dụ "summary_data.json")
+            content: Nội dung file
+
+        Returns:
+            Tên file đã hash (tương đối với thư mục)
+        """
+        stem, ext = os.path.splitext(name)
+        file_name = f"{stem}.{content_hash(content)}{ext}"
+        path = os.path.join(self.directory, file_name)
+
+        # Cùng hash nghĩa là cùng nội dung: không cần ghi lại
+        if not os.path.exists(path):
+            write_bytes_atomic(path, content)
+            for suffix, compressed in compressed_variants(content).items():
+                write_bytes_atomic(path + suffix, compressed)
+
+        entry = self.manifest["files"].get(name)
+        if entry is None or entry["file"] != file_name:
+            if entry is not None:
+                if entry.get("previous"):
+                    self._stale.add(entry["previous"])
+                previous = entry["file"]
+            else:
+                previous = None
+            self._stale.discard(file_name)
+            self.manifest["files"][name] = {
+                "file": file_name,
+                "bytes": len(content),
+                "previous": previous
+            }
+        return file_name
+
+    def publish_json(self, name: str, payload: Any,
+                     default: Optional[Callable[[Any], Any]] = None) -> str:
+        """
+        Ghi một payload JSON đã minify
+
+        Args:
+            name: Tên logic (ví dụ "summary_data.json")
+            payload: Dữ liệu
+            default: Hàm serialize dự phòng cho json.dumps
+
+        Returns:
+            Tên file đã hash
+        """
+        return self.publish_bytes(name, minify_json(payload, default))
+
+    def publish_file(self, path: str, name: Optional[str] = None) -> str:
+        """
+        Ghi bản hash của một file đã có (ví dụ biểu đồ HTML)
+
+        Args:
+            path: Đường dẫn file nguồn
+            name: Tên logic (mặc định tên file)
+
+        Returns:
+            Tên file đã hash
+        """
+        with open(path, "rb") as f:
+            content = f.read()
+        return self.publish_bytes(name or os.path.basename(path), content)
+
+    def url(self, name: str) -> Optional[str]:
+        """Tên file hiện tại của một tên logic (None nếu chưa publish)"""
+        entry = self.manifest["files"].get(name)
+        return entry["file"] if entry else None
+
+    def write_manifest(self, **extra: Any) -> str:
+        """
+        Ghi manifest (minify, không hash) và xóa các phiên bản đã hết hạn
+
+        Args:
+            **extra: Trường bổ sung (ví dụ generated_at)
+
+        Returns:
+            Đường dẫn manifest
+        """
+        self.manifest.update(extra)
+        write_atomic(self.manifest_path, minify_json(self.manifest).decode("utf-8"))
+        current = {file_name for entry in self.manifest["files"].values()
+                   for file_name in (entry["file"], entry.get("previous")) if file_name}
+        for file_name in self._stale - current:
+            self._remove(file_name)
+        self._stale = set()
+        return self.manifest_path
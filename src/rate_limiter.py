@@ -0,0 +1,38 @@
+"""
+Thread-safe rate limiter shared by all data source requests
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket limiter: allows bursts up to ``rate_per_minute`` requests,
+    then refills at ``rate_per_minute / 60`` tokens per second
+    """
+
+    def __init__(self, rate_per_minute: int):
+        if rate_per_minute < 1:
+            raise ValueError("Rate limit must be at least 1 request per minute")
+        self.capacity = float(rate_per_minute)
+        self.refill_rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a request is allowed"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.refill_rate
+            time.sleep(wait_time)
@@ -0,0 +1,376 @@
+"""
+Tiered retention and compaction of saved snapshot files
+
+Snapshots younger than RETENTION_KEEP_ALL_HOURS are all kept; older ones
+are thinned to the latest snapshot of each hour until RETENTION_HOURLY_DAYS
+and to the latest snapshot of each day after that, forever. Evicted
+snapshots are not lost: their quotes are compacted into columnar archive
+parts (Parquet, or CSV without pyarrow) that exporter.read_snapshots reads
+back, and a snapshot file is only deleted once its archived row reads back
+equal. Their history bars are daily and remain in the kept snapshot of the
+same day, so only unreferenced chunks are collected afterwards.
+
+The delta store keeps every version from the keyframe covering the
+keep-all window on. Older versions are written out as snapshot files, so
+the same tiers apply to them, before the store is truncated.
+"""
+
+import glob
+import json
+import logging
+import math
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import config
+from chunkstore import SNAPSHOT_PATTERN, ChunkStore
+from delta import DeltaStore
+from exporter import export_snapshots, read_snapshots, require_pyarrow, schema_path, snapshot_schema
+from utils import HISTORY_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Định dạng timestamp trong tên file snapshot (financial_data_<ts>.json, hoặc
+# financial_data_<ts>_v<phiên bản>.json với snapshot chuyển từ delta store)
+SNAPSHOT_TIME_FORMAT = "%Y%m%d_%H%M%S"
+
+ARCHIVE_PREFIX = "snapshots_"
+
+
+def snapshot_time(path: str) -> Optional[datetime]:
+    """
+    Timestamp encoded in a snapshot file name
+
+    Returns:
+        datetime or None if the name does not follow save_data_to_file or
+        release_deltas
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    stamp = stem[len("financial_data_"):].partition("_v")[0]
+    try:
+        return datetime.strptime(stamp, SNAPSHOT_TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def archived_form(data: Any) -> Any:
+    """
+    What an archive row of a snapshot reads back as
+
+    History containers, empty values (None, NaN) and dicts left empty are
+    dropped, since archives do not store them.
+    """
+    if isinstance(data, dict):
+        result = {}
+        for key, value in data.items():
+            if key in HISTORY_KEYS:
+                continue
+            value = archived_form(value)
+            if value is not None and value != {}:
+                result[key] = value
+        return result
+    if isinstance(data, float) and math.isnan(data):
+        return None
+    return data
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    Retention tiers by snapshot age
+
+    Attributes:
+        keep_all: Age below which every snapshot is kept
+        hourly: Age below which the latest snapshot of each hour is kept;
+            older snapshots keep the latest of each day
+    """
+
+    keep_all: timedelta = timedelta(hours=config.RETENTION_KEEP_ALL_HOURS)
+    hourly: timedelta = timedelta(days=config.RETENTION_HOURLY_DAYS)
+
+    def bucket(self, stamp: datetime, now: datetime) -> Optional[Tuple[str, datetime]]:
+        """
+        Retention bucket of a snapshot (None if it is kept unconditionally)
+        """
+        age = now - stamp
+        if age < self.keep_all:
+            return None
+        if age < self.hourly:
+            return "hour", stamp.replace(minute=0, second=0, microsecond=0)
+        return "day", stamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def evictions(self, stamps: Dict[str, datetime], now: datetime) -> List[str]:
+        """
+        Snapshots to compact, oldest first
+
+        A snapshot survives if it is the latest one (among all snapshots,
+        whatever their tier) in its hour or day bucket, so a kept snapshot
+        stays kept as it moves to a coarser tier.
+
+        Args:
+            stamps: Dict path -> snapshot time
+            now: Reference time
+
+        Returns:
+            Paths of evicted snapshots
+        """
+        latest: Dict[Tuple[str, datetime], datetime] = {}
+        for stamp in stamps.values():
+            for key in (("hour", stamp.replace(minute=0, second=0, microsecond=0)),
+                        ("day", stamp.replace(hour=0, minute=0, second=0, microsecond=0))):
+                if key not in latest or stamp > latest[key]:
+                    latest[key] = stamp
+
+        evicted = []
+        for path, stamp in stamps.items():
+            bucket = self.bucket(stamp, now)
+            if bucket is not None and latest[bucket] != stamp:
+                evicted.append(path)
+        return sorted(evicted, key=stamps.get)
+
+
+class RetentionEngine:
+    """
+    Lớp áp dụng chính sách lưu giữ cho thư mục snapshot
+
+    Mỗi lượt run_once nén tối đa batch_size snapshot bị loại thành một
+    archive part rồi mới xóa chúng, nên có thể dừng giữa chừng mà không mất
+    dữ liệu; snapshot không đọc lại được y nguyên từ archive được giữ lại
+    (ghi vào skipped). run chuyển các phiên bản cũ của delta store thành
+    snapshot, lặp run_once đến khi hết việc rồi thu gom các chunk không còn
+    dùng. start chạy run trong một thread nền để không chặn scheduler.
+    """
+
+    def __init__(self, data_dir: Optional[str] = None, archive_dir: Optional[str] = None,
+                 policy: Optional[RetentionPolicy] = None, chunks: Optional[ChunkStore] = None,
+                 batch_size: Optional[int] = None, archive_format: Optional[str] = None,
+                 deltas: Optional[DeltaStore] = None):
+        self.data_dir = data_dir or config.DATA_DIR
+        self.archive_dir = archive_dir or config.RETENTION_ARCHIVE_DIR
+        self.policy = policy or RetentionPolicy()
+        self.chunks = chunks or ChunkStore(snapshot_dir=self.data_dir)
+        self.deltas = deltas or DeltaStore()
+        self.batch_size = batch_size or config.RETENTION_BATCH_SIZE
+        self.archive_format = archive_format or config.RETENTION_ARCHIVE_FORMAT
+        if self.archive_format == "parquet":
+            try:
+                require_pyarrow()
+            except ImportError:
+                self.archive_format = "csv"
+        if not os.path.exists(self.archive_dir):
+            os.makedirs(self.archive_dir)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # Snapshot không nén được mà không mất dữ liệu, bỏ qua trong tiến trình này
+        self.skipped = set()
+
+    def snapshot_times(self) -> Dict[str, datetime]:
+        """Dict file snapshot -> thời điểm (bỏ qua file không đúng tên)"""
+        stamps = {}
+        for path in glob.glob(os.path.join(self.data_dir, SNAPSHOT_PATTERN)):
+            stamp = snapshot_time(path)
+            if stamp is not None:
+                stamps[path] = stamp
+        return stamps
+
+    def plan(self, now: Optional[datetime] = None) -> List[str]:
+        """Các snapshot cần nén, cũ nhất trước (trừ các snapshot trong skipped)"""
+        evicted = self.policy.evictions(self.snapshot_times(), now or datetime.now())
+        return [path for path in evicted if path not in self.skipped]
+
+    def _read_raw(self, path: str) -> Dict[str, Any]:
+        # Không dựng lại history: archive không lưu các history container
+        with open(path, "r", encoding="utf-8") as f:
+            return archived_form(json.load(f))
+
+    def _export(self, snapshots: List[Dict[str, Any]], path: str) -> List[int]:
+        """Ghi snapshots vào path, trả về vị trí các snapshot không đọc lại được y nguyên"""
+        schema, types = snapshot_schema(snapshots)
+        export_snapshots(snapshots, path, schema=schema, types=types, fmt=self.archive_format)
+        rows = [archived_form(row) for row in read_snapshots(path, fmt=self.archive_format)]
+        return [position for position, snapshot in enumerate(snapshots)
+                if position >= len(rows) or rows[position] != snapshot]
+
+    def compact(self, paths: List[str]) -> Optional[str]:
+        """
+        Nén các snapshot thành một archive part rồi xóa file gốc
+
+        Schema là hợp các key của cả batch; snapshot nào không đọc lại được
+        y nguyên từ archive bị loại khỏi batch, giữ nguyên file và ghi vào
+        skipped.
+
+        Args:
+            paths: File snapshot (cũ nhất trước)
+
+        Returns:
+            Đường dẫn archive part (None nếu không nén được snapshot nào)
+        """
+        batch = {path: self._read_raw(path) for path in paths}
+        temp_path = os.path.join(self.archive_dir, f"{ARCHIVE_PREFIX}batch.{self.archive_format}.tmp")
+        while batch:
+            mismatched = self._export(list(batch.values()), temp_path)
+            if not mismatched:
+                break
+            for path in [list(batch)[position] for position in mismatched]:
+                logger.warning(f"Snapshot {path} does not round-trip through the archive, keeping it")
+                self.skipped.add(path)
+                del batch[path]
+
+        if not batch:
+            for leftover in (temp_path, schema_path(temp_path)):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            return None
+
+        kept = list(batch)
+        first, last = snapshot_time(kept[0]), snapshot_time(kept[-1])
+        name = (f"{ARCHIVE_PREFIX}{first.strftime(SNAPSHOT_TIME_FORMAT)}"
+                f"_{last.strftime(SNAPSHOT_TIME_FORMAT)}.{self.archive_format}")
+        path = os.path.join(self.archive_dir, name)
+
+        # Ghi ra file tạm rồi os.replace: archive chỉ xuất hiện khi đã đầy đủ
+        os.replace(schema_path(temp_path), schema_path(path))
+        os.replace(temp_path, path)
+
+        for snapshot_path in kept:
+            os.remove(snapshot_path)
+        return path
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """
+        Nén một batch snapshot bị loại
+
+        Returns:
+            Số snapshot đã xử lý (đã nén hoặc chuyển vào skipped)
+        """
+        batch = self.plan(now)[:self.batch_size]
+        skipped = len(self.skipped)
+        path = self.compact(batch)
+        if path is not None:
+            logger.info(f"Compacted {len(batch) - (len(self.skipped) - skipped)} snapshots into {path}")
+        return len(batch)
+
+    def delta_cutoff(self, now: Optional[datetime] = None) -> Optional[int]:
+        """
+        Keyframe cũ nhất cần giữ trong delta store
+
+        Là keyframe cuối cùng không muộn hơn phiên bản cũ nhất trong cửa sổ
+        keep_all (hoặc phiên bản mới nhất nếu cửa sổ rỗng); phiên bản không
+        có timestamp được coi là còn trong cửa sổ.
+
+        Returns:
+            Số phiên bản của keyframe, None nếu store rỗng
+        """
+        store = self.deltas
+        if store.latest_version is None:
+            return None
+        window_start = (now or datetime.now()) - self.policy.keep_all
+        oldest = store.latest_version
+        for version in range(store.first_version, store.latest_version + 1):
+            stamp = _parse_time(store.index["timestamps"].get(str(version)))
+            if stamp is None or stamp >= window_start:
+                oldest = version
+                break
+        return max(keyframe for keyframe in store.index["keyframes"] if keyframe <= oldest)
+
+    def release_deltas(self, now: Optional[datetime] = None) -> int:
+        """
+        Chuyển các phiên bản trước delta_cutoff thành file snapshot rồi xóa
+        chúng khỏi delta store, từng đoạn keyframe một
+
+        Một đoạn chỉ bị xóa khi mọi phiên bản của nó đã được ghi và đọc lại
+        y nguyên. Tên file chứa số phiên bản nên các phiên bản cùng một giây
+        không ghi đè lên nhau.
+
+        Returns:
+            Số phiên bản đã chuyển
+        """
+        cutoff = self.delta_cutoff(now)
+        released = 0
+        while cutoff is not None and self.deltas.first_version < cutoff:
+            start = self.deltas.first_version
+            end = min(keyframe for keyframe in self.deltas.index["keyframes"] if keyframe > start)
+            for version, snapshot in self.deltas.iter_versions(start, end):
+                stamp = _parse_time(self.deltas.index["timestamps"].get(str(version)))
+                path = os.path.join(self.data_dir,
+                                    f"financial_data_{stamp.strftime(SNAPSHOT_TIME_FORMAT)}_v{version}.json")
+                # Đã được ghi ở một lượt trước bị dừng giữa chừng
+                if not os.path.exists(path):
+                    self.chunks.save_snapshot(snapshot, path)
+                if self.chunks.load_snapshot(path) != snapshot:
+                    logger.warning(f"Snapshot version {version} does not match {path}, keeping deltas")
+                    return released
+            released += self.deltas.truncate(end)
+        return released
+
+    def run(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Áp dụng chính sách cho đến khi không còn snapshot bị loại
+
+        Returns:
+            {"deltas_released": số phiên bản chuyển từ delta store,
+             "compacted": số snapshot đã nén, "chunks_removed": số chunk đã xóa}
+        """
+        with self._lock:
+            released = self.release_deltas(now)
+            compacted = 0
+            while True:
+                skipped = len(self.skipped)
+                count = self.run_once(now)
+                if count == 0:
+                    break
+                compacted += count - (len(self.skipped) - skipped)
+            removed = self.chunks.collect_garbage()
+        return {"deltas_released": released, "compacted": compacted, "chunks_removed": removed}
+
+    def _run_logged(self):
+        try:
+            result = self.run()
+            logger.info(f"Retention pass finished: {result}")
+        except Exception as e:
+            logger.error(f"Retention pass failed: {str(e)}")
+
+    def start(self) -> Optional[threading.Thread]:
+        """
+        Chạy run trong thread nền (bỏ qua nếu lượt trước chưa xong)
+
+        Returns:
+            Thread vừa khởi động hoặc None
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return None
+        self._thread = threading.Thread(target=self._run_logged, name="retention", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def archives(self) -> List[str]:
+        """Các archive part, theo thời điểm snapshot đầu tiên"""
+        return sorted(path for path in glob.glob(os.path.join(self.archive_dir, f"{ARCHIVE_PREFIX}*"))
+                      if os.path.splitext(path)[1] in (".parquet", ".csv"))
+
+    def iter_archived(self) -> Iterator[Dict[str, Any]]:
+        """
+        Đọc lại các snapshot đã nén (không có history)
+
+        Yields:
+            Snapshot dicts, theo thứ tự trong từng archive part
+        """
+        for path in self.archives():
+            yield from read_snapshots(path)
+
+
+if __name__ == "__main__":
+    engine = RetentionEngine()
+    result = engine.run()
+    print(f"Released {result['deltas_released']} delta versions, compacted {result['compacted']} "
+          f"snapshots, removed {result['chunks_removed']} chunks")
@@ -0,0 +1,223 @@
+"""
+OHLCV rollups: materialized 1h/1d/1w/1mo aggregates with incremental refresh
+"""
+
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+from gaps import infer_market
+from storage import BAR_COLUMNS, DataStore
+
+# Nominal bucket length in seconds, from finest to coarsest
+RESOLUTIONS = {
+    "1h": 3600,
+    "1d": 86400,
+    "1w": 7 * 86400,
+    "1mo": 30 * 86400
+}
+
+
+def bucket_starts(index: pd.DatetimeIndex, resolution: str,
+                  timezone: str = "UTC") -> pd.DatetimeIndex:
+    """
+    Start of the bucket containing each timestamp
+
+    Hourly buckets are aligned in UTC; daily, weekly (Monday) and monthly
+    buckets follow the calendar of the market's time zone.
+
+    Args:
+        index: UTC DatetimeIndex
+        resolution: One of RESOLUTIONS
+        timezone: Market time zone
+
+    Returns:
+        UTC DatetimeIndex of bucket starts
+    """
+    if resolution == "1h":
+        return index.floor("h")
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+
+    local = index.tz_convert(timezone).tz_localize(None).normalize()
+    if resolution == "1w":
+        local = local - pd.to_timedelta(local.dayofweek, unit="D")
+    elif resolution == "1mo":
+        local = local - pd.to_timedelta(local.day - 1, unit="D")
+    return local.tz_localize(
+        timezone, ambiguous=np.ones(len(local), dtype=bool), nonexistent="shift_forward"
+    ).tz_convert("UTC")
+
+
+def aggregate(frame: pd.DataFrame, starts: pd.DatetimeIndex) -> pd.DataFrame:
+    """
+    Aggregate OHLCV rows into buckets
+
+    Args:
+        frame: Time-ordered OHLCV frame (optional Count column)
+        starts: Bucket start of each row
+
+    Returns:
+        OHLCV + Count frame indexed by bucket start
+    """
+    if "Count" not in frame.columns:
+        frame = frame.assign(Count=1)
+    grouped = frame.groupby(starts, sort=True)
+    result = grouped.agg({
+        "Open": "first",
+        "High": "max",
+        "Low": "min",
+        "Close": "last",
+        "Volume": "sum",
+        "Count": "sum"
+    })
+    result.index.name = None
+    return result
+
+
+def select_resolution(span: float, interval: Optional[float] = None,
+                      max_points: Optional[int] = None) -> str:
+    """
+    Pick the resolution that serves a query
+
+    Args:
+        span: Queried time span in seconds
+        interval: Largest acceptable bucket length in seconds; picks the
+            coarsest resolution not above it ("raw" below one hour)
+        max_points: Point budget; picks the finest resolution within it
+
+    Returns:
+        Resolution name or "raw"
+    """
+    if interval is not None:
+        fitting = [name for name, seconds in RESOLUTIONS.items() if seconds <= interval]
+        return fitting[-1] if fitting else "raw"
+
+    max_points = max_points or config.ROLLUP_MAX_POINTS
+    for name, seconds in RESOLUTIONS.items():
+        if span / seconds <= max_points:
+            return name
+    return list(RESOLUTIONS)[-1]
+
+
+class RollupEngine:
+    """
+    Lớp duy trì các bảng tổng hợp OHLCV theo nhiều độ phân giải trong store
+
+    Khi bars mới được ghi, store đánh dấu thời điểm sớm nhất bị thay đổi của
+    mã đó; refresh chỉ tính lại các bucket (ở mỗi độ phân giải) kể từ bucket
+    chứa thời điểm này.
+    """
+
+    def __init__(self, store: Optional[DataStore] = None):
+        self.store = store or DataStore()
+
+    def _timezone(self, symbol: str) -> str:
+        return config.MARKET_TIMEZONES.get(infer_market(symbol), "UTC")
+
+    def rebuild(self, symbol: str, since: Optional[int] = None,
+                seq: Optional[int] = None) -> int:
+        """
+        Tính lại các bucket của một mã kể từ một thời điểm
+
+        Args:
+            symbol: Mã chứng khoán
+            since: Epoch seconds của bar sớm nhất bị thay đổi (None = toàn bộ)
+            seq: Số thứ tự thay đổi đang xử lý (xem DataStore.save_rollups)
+
+        Returns:
+            Số bucket đã ghi
+        """
+        timezone = self._timezone(symbol)
+        starts = dict.fromkeys(RESOLUTIONS)
+        if since is not None:
+            # Bucket tuần có thể bắt đầu trước bucket tháng và ngược lại, nên
+            # mỗi độ phân giải được tính lại từ đầu bucket của chính nó
+            since_index = pd.DatetimeIndex([pd.Timestamp(since, unit="s", tz="UTC")])
+            starts = {
+                resolution: bucket_starts(since_index, resolution, timezone)[0]
+                for resolution in RESOLUTIONS
+            }
+
+        first = None if since is None else int(min(starts.values()).timestamp())
+        bars = self.store.load_bars(symbol, start=first)
+        frames: Dict[str, pd.DataFrame] = {}
+        if len(bars) > 0:
+            for resolution, start in starts.items():
+                subset = bars if start is None else bars[bars.index >= start]
+                frames[resolution] = aggregate(subset, bucket_starts(subset.index, resolution, timezone))
+
+        self.store.save_rollups(symbol, frames, seq=seq)
+        return sum(len(frame) for frame in frames.values())
+
+    def refresh(self, symbols: Optional[Iterable[str]] = None) -> int:
+        """
+        Cập nhật rollup của các mã có bars mới
+
+        Args:
+            symbols: Chỉ xử lý các mã này (mặc định mọi mã có thay đổi)
+
+        Returns:
+            Số bucket đã ghi
+        """
+        dirty = self.store.dirty_rollups()
+        if symbols is not None:
+            wanted = set(symbols)
+            dirty = {symbol: mark for symbol, mark in dirty.items() if symbol in wanted}
+
+        written = 0
+        for symbol, (since, seq) in dirty.items():
+            written += self.rebuild(symbol, since=since, seq=seq)
+        return written
+
+    def query(self, symbol: str, start: Optional[int] = None, end: Optional[int] = None,
+              resolution: Optional[str] = None, interval: Optional[float] = None,
+              max_points: Optional[int] = None) -> Tuple[str, pd.DataFrame]:
+        """
+        Đọc dữ liệu OHLCV của một mã ở độ phân giải thô nhất đáp ứng truy vấn
+
+        Args:
+            symbol: Mã chứng khoán
+            start: Epoch seconds bắt đầu (bao gồm)
+            end: Epoch seconds kết thúc (không bao gồm)
+            resolution: Ép dùng một độ phân giải ("raw" hoặc một trong RESOLUTIONS)
+            interval: Độ dài bucket lớn nhất chấp nhận được (giây)
+            max_points: Số điểm tối đa (mặc định ROLLUP_MAX_POINTS)
+
+        Returns:
+            Tuple (độ phân giải đã dùng, DataFrame OHLCV với index UTC)
+        """
+        self.refresh([symbol])
+
+        if resolution is None:
+            # Khoảng không giới hạn được thu hẹp theo phạm vi dữ liệu thực có
+            months = self.store.load_rollups(symbol, "1mo")
+            span_start, span_end = start, end if end is not None else time.time()
+            if len(months) > 0:
+                first = int(months.index[0].timestamp())
+                last = int(months.index[-1].timestamp()) + RESOLUTIONS["1mo"]
+                span_start = max(span_start, first) if span_start is not None else first
+                span_end = min(span_end, last)
+            elif span_start is None:
+                span_start = span_end
+            resolution = select_resolution(max(span_end - span_start, 0), interval, max_points)
+
+        if resolution == "raw":
+            return resolution, self.store.load_bars(symbol, start=start, end=end)
+
+        if start is not None:
+            # Giữ cả bucket chứa thời điểm bắt đầu
+            start_index = pd.DatetimeIndex([pd.Timestamp(start, unit="s", tz="UTC")])
+            start = int(bucket_starts(start_index, resolution, self._timezone(symbol))[0].timestamp())
+        frame = self.store.load_rollups(symbol, resolution, start=start, end=end)
+        return resolution, frame[BAR_COLUMNS]
+
+
+if __name__ == "__main__":
+    engine = RollupEngine()
+    started = time.time()
+    written = engine.refresh()
+    print(f"Rollup refresh wrote {written} buckets in {time.time() - started:.2f}s")
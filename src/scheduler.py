@@ -1,8 +1,17 @@
 import schedule
 import time
+import json
+import os
 import logging
-from datetime import datetime
-from financial_data_fetcher import FinancialDataFetcher
+from datetime import timedelta
+import pandas as pd
+from delta import DeltaStore
+from financial_data_fetcher import FinancialDataFetcher, json_default
+from gaps import UNSCHEDULED_MARKETS, infer_market
+from indicators import IndicatorState, history_closes, history_last_time
+from models import Bars
+from retention import RetentionEngine
+from trading_calendar import get_calendar
 import config
 
 # Cấu hình logging
@@ -23,12 +32,132 @@ class FinancialDataScheduler:
     def __init__(self):
         self.fetcher = FinancialDataFetcher()
         self.logger = logging.getLogger(__name__)
+        self.indicators = self.load_indicator_states()
+        self.deltas = DeltaStore()
+        self.retention = RetentionEngine(chunks=self.fetcher.chunks, deltas=self.deltas)
+    
+    def load_indicator_states(self):
+        """Đọc trạng thái chỉ báo đã lưu từ lần chạy trước"""
+        if not os.path.exists(config.INDICATOR_STATE_FILE):
+            return {}
+        try:
+            with open(config.INDICATOR_STATE_FILE, 'r', encoding='utf-8') as f:
+                return {
+                    symbol: IndicatorState.from_dict(state)
+                    for symbol, state in json.load(f).items()
+                }
+        except Exception as e:
+            self.logger.error(f"Error loading indicator state: {str(e)}")
+            return {}
+    
+    def save_indicator_states(self):
+        """Lưu trạng thái chỉ báo để lần chạy sau tiếp tục"""
+        with open(config.INDICATOR_STATE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(
+                {symbol: state.to_dict() for symbol, state in self.indicators.items()},
+                f
+            )
+    
+    def session_key(self, market, history=None, now=None):
+        """
+        Phiên giao dịch (YYYY-MM-DD theo múi giờ của thị trường) mà giá mới
+        nhất thuộc về
+        
+        Lấy từ timestamp bar cuối của history; history dạng records không có
+        timestamp nên dùng phiên đang mở, hoặc phiên vừa đóng cửa khi thị
+        trường đóng (cuối tuần, ngày lễ, ngoài giờ).
+        
+        Args:
+            market: Mã thị trường (US, VN, FX, FUTURES)
+            history: historical_data của mã (Bars, columns hoặc records)
+            now: Thời điểm hiện tại (mặc định bây giờ; naive được hiểu là UTC)
+        
+        Returns:
+            Ngày phiên dạng chuỗi, None nếu không có phiên giao dịch
+        """
+        calendar = get_calendar(market)
+        stamp = history_last_time(history)
+        if stamp is None:
+            now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+            if now.tzinfo is None:
+                now = now.tz_localize("UTC")
+            stamp = now if calendar.is_open(now) else calendar.previous_close(now)
+            if stamp is None:
+                return None
+        day = stamp.tz_convert(config.MARKET_TIMEZONES.get(market, "UTC")).date()
+        return day.isoformat() if calendar.is_session(day) else None
+    
+    def seed_indicators(self, symbols, now=None):
+        """
+        Khởi tạo chỉ báo cho các mã mới từ INDICATOR_WINDOW phiên gần nhất
+        (một request batch), để chỉ báo có giá trị ngay thay vì chờ
+        INDICATOR_WINDOW phiên
+        
+        Mã lỗi fetch không được khởi tạo và sẽ được thử lại ở lần chạy sau.
+        """
+        window = config.INDICATOR_WINDOW
+        # Đủ ngày lịch để chứa window phiên (cuối tuần, ngày lễ)
+        today = (pd.Timestamp(now) if now is not None else pd.Timestamp.now(tz="UTC")).date()
+        start = (today - timedelta(days=window * 2 + 14)).isoformat()
+        try:
+            histories = self.fetcher.fetch_yahoo_batch(symbols, start=start)
+        except Exception as e:
+            self.logger.error(f"Error seeding indicators: {str(e)}")
+            return
+        
+        for symbol in symbols:
+            frame = histories.get(symbol)
+            state = IndicatorState(window)
+            if frame is not None and not frame.empty:
+                bars = Bars.from_dataframe(frame)
+                state.seed(history_closes(bars)[-window:], self.session_key(infer_market(symbol), bars))
+            self.indicators[symbol] = state
+    
+    def update_indicators(self, data, now=None):
+        """
+        Cập nhật chỉ báo kỹ thuật với giá mới nhất của từng mã (O(1) mỗi mã)
+        
+        Mỗi giá được gán vào phiên giao dịch của thị trường của mã; lần chạy
+        ngoài phiên (cuối tuần, ngày lễ) chỉ sửa lại bar của phiên gần nhất
+        thay vì đẩy thêm bar giả. Mã mới được khởi tạo bằng seed_indicators.
+        """
+        quotes = []
+        stack = [data]
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, dict):
+                continue
+            if 'symbol' in node and 'current_price' in node:
+                quotes.append(node)
+                continue
+            stack.extend(node.values())
+        
+        new_symbols = sorted({node['symbol'] for node in quotes} - set(self.indicators))
+        if new_symbols:
+            self.seed_indicators(new_symbols, now)
+        
+        for node in quotes:
+            symbol = node['symbol']
+            market = infer_market(symbol)
+            state = self.indicators.get(symbol)
+            if state is None or market in UNSCHEDULED_MARKETS:
+                continue
+            bar_key = self.session_key(market, node.get('historical_data'), now)
+            # Không đẩy bar cho ngày không có phiên hoặc cho phiên cũ hơn bar cuối
+            if bar_key is None or (state.bar_key is not None and bar_key < state.bar_key):
+                continue
+            values = state.update(node['current_price'], bar_key)
+            if values['rsi'] is not None:
+                self.logger.info(f"{symbol} SMA: {values['sma']:,.2f}, RSI: {values['rsi']:.1f}")
+        
+        self.save_indicator_states()
     
     def fetch_and_log_data(self):
         """Lấy dữ liệu và ghi log"""
         try:
             self.logger.info("Starting data fetch...")
-            data = self.fetcher.fetch_all_data()
+            # Snapshot chỉ được lưu một lần, dạng delta ở cuối hàm
+            data = self.fetcher.fetch_all_data(save=False)
             
             # Log một số thông tin quan trọng
             if 'precious_metals' in data:
@@ -50,16 +179,31 @@ class FinancialDataScheduler:
                 if 'usd_vnd' in fx and 'current_price' in fx['usd_vnd']:
                     self.logger.info(f"USD/VND: {fx['usd_vnd']['current_price']:,.0f}")
             
-            self.logger.info("Data fetch completed successfully")
+            self.update_indicators(data)
+            
+            # Lưu snapshot dạng delta so với lần fetch trước
+            version = self.deltas.append(data, default=json_default)
+            
+            self.logger.info(f"Data fetch completed successfully (snapshot version {version})")
             
         except Exception as e:
             self.logger.error(f"Error fetching data: {str(e)}")
     
+    def markets_open(self):
+        """Có thị trường nào đang giao dịch không (tra bảng phiên, O(log n))"""
+        markets = set(config.SYMBOL_MARKETS.values())
+        return any(get_calendar(market).is_open() for market in markets)
+    
+    def fetch_if_market_open(self):
+        """Chỉ fetch khi có ít nhất một thị trường đang mở cửa"""
+        if self.markets_open():
+            self.fetch_and_log_data()
+    
     def setup_schedules(self):
         """Thiết lập lịch cập nhật dữ liệu"""
         
         # Cập nhật mỗi 5 phút trong giờ giao dịch
-        schedule.every(5).minutes.do(self.fetch_and_log_data)
+        schedule.every(5).minutes.do(self.fetch_if_market_open)
         
         # Cập nhật mỗi giờ
         schedule.every().hour.do(self.fetch_and_log_data)
@@ -72,6 +216,9 @@ class FinancialDataScheduler:
         # Cập nhật cuối tuần
         schedule.every().sunday.at("10:00").do(self.fetch_and_log_data)
         
+        # Nén và dọn snapshot cũ trong thread nền (không chặn các lần fetch)
+        schedule.every(config.RETENTION_INTERVAL_MINUTES).minutes.do(self.retention.start)
+        
         self.logger.info("Schedules set up successfully")
     
     def run(self):
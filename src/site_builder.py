@@ -0,0 +1,175 @@
+"""
+Incremental static site builder for the GitHub Pages output
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Optional
+
+import config
+
+STATE_FILE = ".site_state.json"
+
+
+def fingerprint(*inputs: Any) -> str:
+    """
+    Stable hash of JSON-serializable inputs
+
+    Args:
+        *inputs: Values a page or chart is built from
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def write_atomic(path: str, content: str):
+    """Write a text file through a temporary sibling and os.replace"""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+def plotly_bundle_name() -> str:
+    """File name of the shared Plotly bundle, versioned so it can be cached forever"""
+    import plotly
+    return f"plotly-{plotly.__version__}.min.js"
+
+
+class SiteBuilder:
+    """
+    Lớp build site tĩnh theo kiểu incremental
+
+    Template được nạp qua một Environment dùng chung với bytecode cache trên
+    đĩa, nên chỉ được biên dịch lại khi file template thay đổi. Mỗi trang và
+    biểu đồ lưu fingerprint của đầu vào (mã nguồn template + dữ liệu) trong
+    STATE_FILE ở thư mục output; lần build sau bỏ qua các output có
+    fingerprint không đổi. Biểu đồ tham chiếu một bundle Plotly dùng chung
+    thay vì nhúng toàn bộ thư viện vào từng file.
+    """
+
+    def __init__(self, output_dir: Optional[str] = None, template_dir: Optional[str] = None,
+                 cache_dir: Optional[str] = None):
+        from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+        self.output_dir = output_dir or config.SITE_OUTPUT_DIR
+        self.template_dir = template_dir or config.SITE_TEMPLATE_DIR
+        cache_dir = cache_dir or config.SITE_CACHE_DIR
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        self.env = Environment(
+            loader=FileSystemLoader(self.template_dir),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir)
+        )
+        self.state_path = os.path.join(self.output_dir, STATE_FILE)
+        self.state = self._load_state()
+        self.built = []
+        self.skipped = []
+
+    def _load_state(self) -> Dict[str, str]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _is_fresh(self, name: str, digest: str) -> bool:
+        path = os.path.join(self.output_dir, name)
+        return self.state.get(name) == digest and os.path.exists(path)
+
+    def _record(self, name: str, digest: Optional[str], built: bool):
+        if built:
+            self.state[name] = digest
+            self.built.append(name)
+        else:
+            self.skipped.append(name)
+
+    def render(self, template_name: str, **context: Any) -> str:
+        """
+        Render một template (không ghi file)
+
+        Args:
+            template_name: Tên file trong thư mục template
+            **context: Biến truyền vào template
+
+        Returns:
+            Nội dung đã render
+        """
+        return self.env.get_template(template_name).render(**context)
+
+    def render_page(self, name: str, template_name: str, inputs: Any = None, **context: Any) -> bool:
+        """
+        Render một trang nếu template hoặc dữ liệu đã thay đổi
+
+        Args:
+            name: Đường dẫn output, tương đối với output_dir
+            template_name: Tên file trong thư mục template
+            inputs: Dữ liệu dùng để tính fingerprint thay cho context (ví dụ
+                context đã bỏ các trường thay đổi ở mỗi lần chạy)
+            **context: Biến truyền vào template
+
+        Returns:
+            True nếu trang được ghi lại, False nếu bỏ qua
+        """
+        source, _, _ = self.env.loader.get_source(self.env, template_name)
+        digest = fingerprint(source, context if inputs is None else inputs)
+        if self._is_fresh(name, digest):
+            self._record(name, digest, False)
+            return False
+
+        write_atomic(os.path.join(self.output_dir, name), self.render(template_name, **context))
+        self._record(name, digest, True)
+        return True
+
+    def write_chart(self, name: str, make_figure: Callable[[], Any], inputs: Any) -> bool:
+        """
+        Ghi một biểu đồ Plotly nếu dữ liệu đã thay đổi
+
+        Args:
+            name: Đường dẫn output, tương đối với output_dir
+            make_figure: Hàm tạo Figure (chỉ được gọi khi cần build lại)
+            inputs: Dữ liệu biểu đồ dùng để tính fingerprint
+
+        Returns:
+            True nếu biểu đồ được ghi lại, False nếu bỏ qua
+        """
+        path = os.path.join(self.output_dir, name)
+        bundle = self.ensure_plotly_bundle(os.path.dirname(path))
+        digest = fingerprint(bundle, inputs)
+        if self._is_fresh(name, digest):
+            self._record(name, digest, False)
+            return False
+
+        html = make_figure().to_html(include_plotlyjs=bundle, full_html=True)
+        write_atomic(path, html)
+        self._record(name, digest, True)
+        return True
+
+    def ensure_plotly_bundle(self, directory: Optional[str] = None) -> str:
+        """
+        Ghi bundle Plotly dùng chung vào thư mục nếu chưa có
+
+        Args:
+            directory: Thư mục chứa bundle (mặc định output_dir)
+
+        Returns:
+            Tên file bundle (tương đối với thư mục)
+        """
+        name = plotly_bundle_name()
+        path = os.path.join(directory or self.output_dir, name)
+        if not os.path.exists(path):
+            from plotly.offline import get_plotlyjs
+            write_atomic(path, get_plotlyjs())
+        return name
+
+    def save_state(self):
+        """Lưu fingerprint của các output đã build"""
+        write_atomic(self.state_path, json.dumps(self.state, indent=2, sort_keys=True))
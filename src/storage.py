@@ -0,0 +1,495 @@
+"""
+Persistent storage for Financial Data Fetcher (SQLite)
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+import config
+from models import Quote, Bars
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+QUOTE_COLUMNS = ["symbol", "timestamp", "current_price", "change", "change_percent",
+                 "high", "low", "volume"]
+
+History = Union[Bars, pd.DataFrame]
+
+
+def to_epoch_seconds(index: pd.Index) -> List[int]:
+    """
+    Chuyển index thời gian sang epoch seconds (UTC)
+
+    Args:
+        index: DatetimeIndex (có hoặc không có timezone)
+
+    Returns:
+        List epoch seconds
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    return index.tz_convert("UTC").as_unit("s").asi8.tolist()
+
+
+class DataStore:
+    """
+    Lớp lưu trữ quote và dữ liệu giá (bars) vào SQLite
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(config.DATA_DIR, config.DATABASE_FILE)
+        self._ensure_parent_dir()
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+
+    def _ensure_parent_dir(self):
+        """Tạo thư mục chứa database nếu chưa tồn tại"""
+        directory = os.path.dirname(self.db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def _create_tables(self):
+        """Tạo các bảng nếu chưa có"""
+        with self._lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS quotes (
+                    symbol TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    current_price REAL,
+                    change REAL,
+                    change_percent REAL,
+                    high REAL,
+                    low REAL,
+                    volume INTEGER,
+                    PRIMARY KEY (symbol, timestamp)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume REAL,
+                    PRIMARY KEY (symbol, ts)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS rollups (
+                    symbol TEXT NOT NULL,
+                    resolution TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume REAL,
+                    count INTEGER,
+                    PRIMARY KEY (symbol, resolution, ts)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS rollup_dirty (
+                    symbol TEXT PRIMARY KEY,
+                    from_ts INTEGER NOT NULL,
+                    seq INTEGER NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS backfill_chunks (
+                    symbol TEXT NOT NULL,
+                    chunk_start TEXT NOT NULL,
+                    chunk_end TEXT NOT NULL,
+                    rows INTEGER,
+                    completed_at TEXT,
+                    PRIMARY KEY (symbol, chunk_start, chunk_end)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS fetch_errors (
+                    symbol TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    message TEXT
+                )
+            """)
+
+    def _quote_row(self, quote: Union[Quote, Dict[str, Any]]) -> Tuple:
+        if isinstance(quote, Quote):
+            return (
+                quote.symbol,
+                quote.timestamp or datetime.now().isoformat(),
+                quote.current_price,
+                quote.change,
+                quote.change_percent,
+                quote.high,
+                quote.low,
+                quote.volume,
+            )
+        return (
+            quote["symbol"],
+            quote.get("timestamp") or datetime.now().isoformat(),
+            quote.get("current_price"),
+            quote.get("change"),
+            quote.get("change_percent"),
+            quote.get("high"),
+            quote.get("low"),
+            quote.get("volume"),
+        )
+
+    def _bar_rows(self, symbol: str, hist: History) -> List[Tuple]:
+        if isinstance(hist, Bars):
+            timestamps = hist.index.astype("datetime64[s]").astype(np.int64).tolist()
+            columns = [
+                hist.columns[column].tolist() if column in hist.columns else [None] * len(hist)
+                for column in BAR_COLUMNS
+            ]
+            return [
+                (symbol, ts, o, h, l, c, v)
+                for ts, o, h, l, c, v in zip(timestamps, *columns)
+            ]
+
+        timestamps = to_epoch_seconds(hist.index)
+        columns = [
+            hist[column].tolist() if column in hist.columns else [None] * len(hist)
+            for column in BAR_COLUMNS
+        ]
+        return [
+            (symbol, ts, o, h, l, c, v)
+            for ts, o, h, l, c, v in zip(timestamps, *columns)
+        ]
+
+    def _write_bars(self, rows: List[Tuple]):
+        """Upsert bars và đánh dấu rollup cần cập nhật (gọi trong transaction)"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        earliest: Dict[str, int] = {}
+        for row in rows:
+            if row[0] not in earliest or row[1] < earliest[row[0]]:
+                earliest[row[0]] = row[1]
+        self.conn.executemany(
+            "INSERT INTO rollup_dirty VALUES (?, ?, 1) ON CONFLICT(symbol) DO UPDATE "
+            "SET from_ts = MIN(from_ts, excluded.from_ts), seq = seq + 1",
+            list(earliest.items())
+        )
+
+    def save_quote(self, quote: Union[Quote, Dict[str, Any]]):
+        """
+        Lưu một quote
+
+        Args:
+            quote: Quote hoặc dict có ít nhất key "symbol"
+        """
+        self.save_batch([quote], {})
+
+    def save_bars(self, symbol: str, hist: History) -> int:
+        """
+        Lưu (upsert) dữ liệu giá theo thời gian
+
+        Args:
+            symbol: Mã chứng khoán
+            hist: Bars hoặc DataFrame OHLCV với index thời gian
+
+        Returns:
+            Số dòng đã ghi
+        """
+        if hist is None or len(hist) == 0:
+            return 0
+        rows = self._bar_rows(symbol, hist)
+        with self._lock, self.conn:
+            self._write_bars(rows)
+        return len(rows)
+
+    def save_error(self, symbol: str, message: str):
+        """Ghi lại lỗi fetch cho một mã"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO fetch_errors VALUES (?, ?, ?)",
+                (symbol, datetime.now().isoformat(), message)
+            )
+
+    def save_batch(self, quotes: Iterable[Union[Quote, Dict[str, Any]]],
+                   histories: Dict[str, History],
+                   errors: Optional[Dict[str, str]] = None):
+        """
+        Lưu kết quả của một batch trong cùng một transaction
+
+        Args:
+            quotes: Các quote cần lưu
+            histories: Dict symbol -> Bars hoặc DataFrame OHLCV
+            errors: Dict symbol -> thông báo lỗi
+        """
+        quote_rows = [self._quote_row(quote) for quote in quotes]
+        bar_rows = []
+        for symbol, hist in histories.items():
+            if hist is not None and len(hist) > 0:
+                bar_rows.extend(self._bar_rows(symbol, hist))
+        now = datetime.now().isoformat()
+        error_rows = [(symbol, now, message) for symbol, message in (errors or {}).items()]
+
+        with self._lock, self.conn:
+            if quote_rows:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO quotes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    quote_rows
+                )
+            if bar_rows:
+                self._write_bars(bar_rows)
+            if error_rows:
+                self.conn.executemany(
+                    "INSERT INTO fetch_errors VALUES (?, ?, ?)", error_rows
+                )
+
+    def load_bars(self, symbol: str, start: Optional[int] = None,
+                  end: Optional[int] = None) -> pd.DataFrame:
+        """
+        Đọc dữ liệu giá của một mã
+
+        Args:
+            symbol: Mã chứng khoán
+            start: Epoch seconds bắt đầu (bao gồm)
+            end: Epoch seconds kết thúc (không bao gồm)
+
+        Returns:
+            DataFrame OHLCV với index UTC
+        """
+        query = "SELECT ts, open, high, low, close, volume FROM bars WHERE symbol = ?"
+        params: List[Any] = [symbol]
+        if start is not None:
+            query += " AND ts >= ?"
+            params.append(int(start))
+        if end is not None:
+            query += " AND ts < ?"
+            params.append(int(end))
+        query += " ORDER BY ts"
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        if not rows:
+            return pd.DataFrame(columns=BAR_COLUMNS,
+                                index=pd.DatetimeIndex([], tz="UTC"))
+        frame = pd.DataFrame(rows, columns=["ts"] + BAR_COLUMNS)
+        frame.index = pd.to_datetime(frame.pop("ts"), unit="s", utc=True)
+        return frame
+
+    def dirty_rollups(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Các mã có bars mới chưa được tổng hợp vào rollup
+
+        Returns:
+            Dict symbol -> (epoch seconds sớm nhất thay đổi, số thứ tự thay đổi)
+        """
+        with self._lock:
+            rows = self.conn.execute("SELECT symbol, from_ts, seq FROM rollup_dirty").fetchall()
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def save_rollups(self, symbol: str, frames: Dict[str, pd.DataFrame],
+                     seq: Optional[int] = None):
+        """
+        Ghi (upsert) các bucket rollup của một mã trong cùng transaction
+
+        Args:
+            symbol: Mã chứng khoán
+            frames: Dict resolution -> DataFrame OHLCV + Count, index là thời
+                điểm bắt đầu bucket
+            seq: Số thứ tự thay đổi đã xử lý; đánh dấu dirty chỉ bị xoá nếu
+                không có bars mới được ghi trong lúc tổng hợp
+        """
+        rows = []
+        for resolution, frame in frames.items():
+            timestamps = to_epoch_seconds(frame.index)
+            columns = [frame[column].tolist() for column in BAR_COLUMNS + ["Count"]]
+            rows.extend(
+                (symbol, resolution, ts, o, h, l, c, v, n)
+                for ts, o, h, l, c, v, n in zip(timestamps, *columns)
+            )
+        with self._lock, self.conn:
+            if rows:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+            if seq is not None:
+                self.conn.execute(
+                    "DELETE FROM rollup_dirty WHERE symbol = ? AND seq = ?", (symbol, seq)
+                )
+
+    def load_rollups(self, symbol: str, resolution: str, start: Optional[int] = None,
+                     end: Optional[int] = None) -> pd.DataFrame:
+        """
+        Đọc các bucket rollup của một mã
+
+        Args:
+            symbol: Mã chứng khoán
+            resolution: Độ phân giải (1h, 1d, 1w, 1mo)
+            start: Epoch seconds bắt đầu (bao gồm)
+            end: Epoch seconds kết thúc (không bao gồm)
+
+        Returns:
+            DataFrame OHLCV + Count với index UTC là thời điểm bắt đầu bucket
+        """
+        query = ("SELECT ts, open, high, low, close, volume, count FROM rollups "
+                 "WHERE symbol = ? AND resolution = ?")
+        params: List[Any] = [symbol, resolution]
+        if start is not None:
+            query += " AND ts >= ?"
+            params.append(int(start))
+        if end is not None:
+            query += " AND ts < ?"
+            params.append(int(end))
+        query += " ORDER BY ts"
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        columns = BAR_COLUMNS + ["Count"]
+        if not rows:
+            return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], tz="UTC"))
+        frame = pd.DataFrame(rows, columns=["ts"] + columns)
+        frame.index = pd.to_datetime(frame.pop("ts"), unit="s", utc=True)
+        return frame
+
+    def _iter_table(self, table: str, columns: List[str], key: str,
+                    symbols: Optional[Iterable[str]], start: Any, end: Any,
+                    chunk_size: int) -> Iterator[List[Tuple]]:
+        """Đọc bảng theo từng chunk (keyset pagination theo symbol, key)"""
+        symbols = sorted(symbols) if symbols is not None else None
+        base = f"SELECT {', '.join(columns)} FROM {table} WHERE 1 = 1"
+        params: List[Any] = []
+        if symbols is not None:
+            base += f" AND symbol IN ({', '.join('?' * len(symbols))})"
+            params.extend(symbols)
+        if start is not None:
+            base += f" AND {key} >= ?"
+            params.append(start)
+        if end is not None:
+            base += f" AND {key} < ?"
+            params.append(end)
+
+        last = None
+        while True:
+            query, args = base, list(params)
+            if last is not None:
+                query += f" AND (symbol, {key}) > (?, ?)"
+                args.extend(last)
+            query += f" ORDER BY symbol, {key} LIMIT ?"
+            args.append(chunk_size)
+
+            with self._lock:
+                rows = self.conn.execute(query, args).fetchall()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk_size:
+                return
+            last = (rows[-1][0], rows[-1][1])
+
+    def iter_bars(self, symbols: Optional[Iterable[str]] = None, start: Optional[int] = None,
+                  end: Optional[int] = None, chunk_size: int = 10000) -> Iterator[List[Tuple]]:
+        """
+        Đọc bars theo từng chunk mà không nạp toàn bộ vào bộ nhớ
+
+        Args:
+            symbols: Các mã cần đọc (mặc định tất cả)
+            start: Epoch seconds bắt đầu (bao gồm)
+            end: Epoch seconds kết thúc (không bao gồm)
+            chunk_size: Số dòng mỗi chunk
+
+        Yields:
+            List tuple (symbol, ts, open, high, low, close, volume), sắp theo symbol, ts
+        """
+        columns = ["symbol", "ts", "open", "high", "low", "close", "volume"]
+        return self._iter_table("bars", columns, "ts", symbols, start, end, chunk_size)
+
+    def iter_quotes(self, symbols: Optional[Iterable[str]] = None, start: Optional[str] = None,
+                    end: Optional[str] = None, chunk_size: int = 10000) -> Iterator[List[Tuple]]:
+        """
+        Đọc các quote đã lưu theo từng chunk
+
+        Args:
+            symbols: Các mã cần đọc (mặc định tất cả)
+            start: Timestamp ISO bắt đầu (bao gồm)
+            end: Timestamp ISO kết thúc (không bao gồm)
+            chunk_size: Số dòng mỗi chunk
+
+        Yields:
+            List tuple theo thứ tự cột QUOTE_COLUMNS, sắp theo symbol, timestamp
+        """
+        return self._iter_table("quotes", QUOTE_COLUMNS, "timestamp", symbols, start, end, chunk_size)
+
+    def latest_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Lấy quote mới nhất của một mã"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT symbol, timestamp, current_price, change, change_percent, "
+                "high, low, volume FROM quotes WHERE symbol = ? "
+                "ORDER BY timestamp DESC LIMIT 1",
+                (symbol,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(QUOTE_COLUMNS, row))
+
+    def completed_chunks(self, symbol: str) -> set:
+        """
+        Các khoảng ngày đã backfill xong của một mã
+
+        Returns:
+            Set các tuple (chunk_start, chunk_end)
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT chunk_start, chunk_end FROM backfill_chunks WHERE symbol = ?",
+                (symbol,)
+            ).fetchall()
+        return {(row[0], row[1]) for row in rows}
+
+    def save_backfill_chunk(self, symbol: str, chunk_start: str, chunk_end: str,
+                            hist: pd.DataFrame) -> int:
+        """
+        Ghi dữ liệu của một chunk backfill và checkpoint trong cùng transaction
+
+        Args:
+            symbol: Mã chứng khoán
+            chunk_start: Ngày bắt đầu chunk
+            chunk_end: Ngày kết thúc chunk
+            hist: DataFrame OHLCV của chunk (có thể rỗng)
+
+        Returns:
+            Số dòng đã ghi
+        """
+        rows = self._bar_rows(symbol, hist) if hist is not None and len(hist) > 0 else []
+        with self._lock, self.conn:
+            if rows:
+                self._write_bars(rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO backfill_chunks VALUES (?, ?, ?, ?, ?)",
+                (symbol, chunk_start, chunk_end, len(rows), datetime.now().isoformat())
+            )
+        return len(rows)
+
+    def symbols(self) -> List[str]:
+        """Danh sách các mã đã có dữ liệu giá"""
+        with self._lock:
+            rows = self.conn.execute("SELECT DISTINCT symbol FROM bars").fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        """Đóng kết nối database"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
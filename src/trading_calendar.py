@@ -0,0 +1,397 @@
+"""
+Trading calendars with precomputed, time-zone-correct session tables
+"""
+
+import math
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# Trading hours per market as (open, close) minutes from local midnight of the
+# session date; a negative open means the session starts the evening before
+MARKET_SESSIONS = {
+    "US": [(9 * 60 + 30, 16 * 60)],
+    "VN": [(9 * 60, 11 * 60 + 30), (13 * 60, 15 * 60)],
+    "FX": [(-7 * 60, 17 * 60)],
+    "FUTURES": [(-6 * 60, 17 * 60)],
+}
+
+# Time zone the trading hours are quoted in, when it differs from
+# config.MARKET_TIMEZONES (the FX week runs Sunday to Friday 17:00 New York)
+SESSION_TIMEZONES = {
+    "FX": "America/New_York",
+}
+
+# Early close (minutes from midnight) on half days
+EARLY_CLOSE = {
+    "US": 13 * 60,
+}
+
+Moment = Union[str, date, pd.Timestamp, None]
+
+
+def _observed(day: date, saturday_to_friday: bool = True) -> Optional[date]:
+    """Weekday on which a holiday falling on a weekend is observed"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1) if saturday_to_friday else None
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def _day(value: Union[str, date]) -> np.datetime64:
+    return pd.Timestamp(value).to_datetime64().astype("datetime64[D]")
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th given weekday of a month (n = -1 for the last one)"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> date:
+    """Western Easter Sunday (anonymous Gregorian algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    return date(year, month, (h + l - 7 * m + 114) % 31 + 1)
+
+
+def us_holidays(year: int) -> Tuple[Set[date], Set[date]]:
+    """
+    NYSE full-day holidays and early-close days of a year
+
+    Returns:
+        Tuple (holidays, early closes)
+    """
+    holidays = {
+        _observed(date(year, 1, 1), saturday_to_friday=False),
+        _nth_weekday(year, 2, 0, 3),                 # Presidents' Day
+        _easter(year) - timedelta(days=2),           # Good Friday
+        _nth_weekday(year, 5, 0, -1),                # Memorial Day
+        _observed(date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),                 # Labor Day
+        _nth_weekday(year, 11, 3, 4),                # Thanksgiving
+        _observed(date(year, 12, 25)),
+    }
+    if year >= 1998:
+        holidays.add(_nth_weekday(year, 1, 0, 3))    # Martin Luther King Jr. Day
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))   # Juneteenth
+    # 1/1 rơi vào thứ Bảy: NYSE không nghỉ bù vào 31/12 năm trước
+    holidays.discard(None)
+
+    early = {
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+        date(year, 12, 24),
+    }
+    early = {day for day in early if day.weekday() < 5 and day not in holidays}
+    return holidays, early
+
+
+# Múi giờ dùng để tính âm lịch Việt Nam (UTC+7)
+VN_LUNAR_TIMEZONE = 7.0
+
+# Số ngày Julian của 0001-01-01 trừ 1 (date.toordinal() + offset = JDN)
+_JDN_OFFSET = 1721425
+
+
+def _new_moon_day(k: int) -> int:
+    """Julian day number (UTC+7) of the k-th new moon after 1900-01-01"""
+    t = k / 1236.85
+    t2, t3 = t * t, t * t * t
+    dr = math.pi / 180
+    jd = 2415020.75933 + 29.53058868 * k + 0.0001178 * t2 - 0.000000155 * t3
+    jd += 0.00033 * math.sin((166.56 + 132.87 * t - 0.009173 * t2) * dr)
+    m = 359.2242 + 29.10535608 * k - 0.0000333 * t2 - 0.00000347 * t3
+    mpr = 306.0253 + 385.81691806 * k + 0.0107306 * t2 + 0.00001236 * t3
+    f = 21.2964 + 390.67050646 * k - 0.0016528 * t2 - 0.00000239 * t3
+    c1 = (0.1734 - 0.000393 * t) * math.sin(m * dr) + 0.0021 * math.sin(2 * dr * m)
+    c1 += -0.4068 * math.sin(mpr * dr) + 0.0161 * math.sin(dr * 2 * mpr) - 0.0004 * math.sin(dr * 3 * mpr)
+    c1 += 0.0104 * math.sin(dr * 2 * f) - 0.0051 * math.sin(dr * (m + mpr))
+    c1 += -0.0074 * math.sin(dr * (m - mpr)) + 0.0004 * math.sin(dr * (2 * f + m))
+    c1 += -0.0004 * math.sin(dr * (2 * f - m)) - 0.0006 * math.sin(dr * (2 * f + mpr))
+    c1 += 0.0010 * math.sin(dr * (2 * f - mpr)) + 0.0005 * math.sin(dr * (2 * mpr + m))
+    if t < -11:
+        delta_t = 0.001 + 0.000839 * t + 0.0002261 * t2 - 0.00000845 * t3 - 0.000000081 * t * t3
+    else:
+        delta_t = -0.000278 + 0.000265 * t + 0.000262 * t2
+    return math.floor(jd + c1 - delta_t + 0.5 + VN_LUNAR_TIMEZONE / 24)
+
+
+def _sun_longitude_sector(day_number: int) -> int:
+    """Sun longitude at local midnight of a Julian day, in 30-degree sectors (0-11)"""
+    t = (day_number - 0.5 - VN_LUNAR_TIMEZONE / 24 - 2451545.0) / 36525
+    t2 = t * t
+    dr = math.pi / 180
+    m = 357.52910 + 35999.05030 * t - 0.0001559 * t2 - 0.00000048 * t * t2
+    l0 = 280.46645 + 36000.76983 * t + 0.0003032 * t2
+    dl = (1.914600 - 0.004817 * t - 0.000014 * t2) * math.sin(dr * m)
+    dl += (0.019993 - 0.000101 * t) * math.sin(dr * 2 * m) + 0.000290 * math.sin(dr * 3 * m)
+    longitude = (l0 + dl) * dr
+    longitude -= 2 * math.pi * math.floor(longitude / (2 * math.pi))
+    return math.floor(longitude / math.pi * 6)
+
+
+def _lunar_month_11(year: int) -> int:
+    """Julian day number of the first day of lunar month 11 (the winter solstice month)"""
+    k = math.floor((date(year, 12, 31).toordinal() + _JDN_OFFSET - 2415021) / 29.530588853)
+    new_moon = _new_moon_day(k)
+    if _sun_longitude_sector(new_moon) >= 9:
+        new_moon = _new_moon_day(k - 1)
+    return new_moon
+
+
+def _leap_month_offset(month_11: int) -> int:
+    """Offset from lunar month 11 of the leap month of a 13-month year"""
+    k = math.floor((month_11 - 2415021.076998695) / 29.530588853 + 0.5)
+    i = 1
+    arc = _sun_longitude_sector(_new_moon_day(k + i))
+    while True:
+        last = arc
+        i += 1
+        arc = _sun_longitude_sector(_new_moon_day(k + i))
+        if arc == last or i >= 14:
+            return i - 1
+
+
+def lunar_to_solar(day: int, month: int, year: int) -> date:
+    """
+    Solar date of a (non-leap) day of the Vietnamese lunar calendar
+
+    Args:
+        day: Lunar day (1-30)
+        month: Lunar month (1-12)
+        year: Lunar year
+
+    Returns:
+        Gregorian date
+    """
+    if month < 11:
+        a11, b11 = _lunar_month_11(year - 1), _lunar_month_11(year)
+    else:
+        a11, b11 = _lunar_month_11(year), _lunar_month_11(year + 1)
+    k = math.floor(0.5 + (a11 - 2415021.076998695) / 29.530588853)
+    offset = (month - 11) % 12
+    if b11 - a11 > 365 and offset >= _leap_month_offset(a11):
+        # Năm nhuận: các tháng từ tháng nhuận trở đi lùi thêm một tuần trăng
+        offset += 1
+    return date.fromordinal(_new_moon_day(k + offset) + day - 1 - _JDN_OFFSET)
+
+
+def vn_lunar_holidays(year: int) -> Set[date]:
+    """
+    HOSE closures for Tet
+
+    Tet closes five weekdays starting on the first weekday on or after
+    the 28th/29th of the last lunar month (two days before Tet), which
+    matches the closures announced for 2017-2026.
+    """
+    holidays = set()
+    day = lunar_to_solar(1, 1, year) - timedelta(days=2)
+    while len(holidays) < 5:
+        if day.weekday() < 5:
+            holidays.add(day)
+        day += timedelta(days=1)
+    return holidays
+
+
+def vn_holidays(year: int) -> Set[date]:
+    """
+    HOSE holidays: Tet (see vn_lunar_holidays), fixed solar dates and Hung
+    Kings' day (10th of the 3rd lunar month, a holiday since 2007), moved to
+    the next free weekday; config.VN_EXTRA_HOLIDAYS adds announced extra days
+    """
+    fixed = [date(year, 1, 1), date(year, 4, 30), date(year, 5, 1), date(year, 9, 2)]
+    if year >= 2007:
+        fixed.append(lunar_to_solar(10, 3, year))
+    holidays = vn_lunar_holidays(year)
+    for day in sorted(fixed):
+        # Nghỉ bù vào ngày làm việc kế tiếp nếu trùng cuối tuần
+        while day.weekday() >= 5 or day in holidays:
+            day += timedelta(days=1)
+        holidays.add(day)
+    return holidays
+
+
+def market_holidays(market: str, year: int) -> Tuple[Set[date], Set[date]]:
+    """
+    Full-day holidays and early-close days of a market
+
+    Args:
+        market: Market code (US, VN, FX, FUTURES)
+        year: Calendar year
+
+    Returns:
+        Tuple (holidays, early closes)
+    """
+    if market == "US":
+        return us_holidays(year)
+    if market == "VN":
+        extra = {pd.Timestamp(day).date() for day in config.VN_EXTRA_HOLIDAYS}
+        return vn_holidays(year) | {day for day in extra if day.year == year}, set()
+    if market == "FUTURES":
+        # COMEX đóng cửa cả ngày dịp Năm mới, Good Friday và Giáng sinh
+        return {
+            _observed(date(year, 1, 1), saturday_to_friday=False),
+            _easter(year) - timedelta(days=2),
+            _observed(date(year, 12, 25)),
+        } - {None}, set()
+    return set(), set()
+
+
+class TradingCalendar:
+    """
+    Lớp lịch giao dịch của một thị trường với bảng phiên được tính sẵn
+
+    Ngày giao dịch (theo giờ địa phương) và các khoảng mở cửa (epoch ns
+    UTC, các phiên liền nhau được gộp) được lưu dưới dạng mảng NumPy đã
+    sắp xếp, nên mọi truy vấn chỉ là một lần np.searchsorted (O(log n)).
+    """
+
+    def __init__(self, market: str, start_year: Optional[int] = None,
+                 end_year: Optional[int] = None):
+        if market not in MARKET_SESSIONS:
+            raise ValueError(f"Unknown market: {market}")
+        self.market = market
+        self.timezone = SESSION_TIMEZONES.get(market) or config.MARKET_TIMEZONES.get(market, "UTC")
+        self.start_year = start_year or pd.Timestamp(config.BACKFILL_START).year
+        self.end_year = end_year or date.today().year + config.TRADING_CALENDAR_YEARS_AHEAD
+        self.sessions_table, self.opens, self.closes = self._build()
+
+    def _build(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        holidays: Set[date] = set()
+        early: Set[date] = set()
+        for year in range(self.start_year, self.end_year + 1):
+            year_holidays, year_early = market_holidays(self.market, year)
+            holidays |= year_holidays
+            early |= year_early
+
+        days = pd.bdate_range(f"{self.start_year}-01-01", f"{self.end_year}-12-31")
+        days = days[~days.isin(pd.DatetimeIndex(sorted(holidays)))]
+        sessions = days.values.astype("datetime64[D]")
+        is_early = days.isin(pd.DatetimeIndex(sorted(early)))
+
+        opens: List[np.ndarray] = []
+        closes: List[np.ndarray] = []
+        intervals = MARKET_SESSIONS[self.market]
+        for position, (open_minute, close_minute) in enumerate(intervals):
+            close_minutes = np.full(len(days), close_minute)
+            if position == len(intervals) - 1 and self.market in EARLY_CLOSE:
+                close_minutes[is_early] = EARLY_CLOSE[self.market]
+            opens.append(self._to_utc(days, np.full(len(days), open_minute)))
+            closes.append(self._to_utc(days, close_minutes))
+
+        opens_all = np.concatenate(opens)
+        closes_all = np.concatenate(closes)
+        order = np.argsort(opens_all, kind="stable")
+        opens_all, closes_all = opens_all[order], closes_all[order]
+
+        # Gộp các phiên liền nhau (FX, futures chạy liên tục trong tuần)
+        if len(opens_all) > 1:
+            starts = np.concatenate(([True], opens_all[1:] > closes_all[:-1]))
+            ends = np.concatenate((starts[1:], [True]))
+            opens_all, closes_all = opens_all[starts], closes_all[ends]
+        return sessions, opens_all, closes_all
+
+    def _to_utc(self, days: pd.DatetimeIndex, minutes: np.ndarray) -> np.ndarray:
+        local = days + pd.to_timedelta(minutes, unit="min")
+        return local.tz_localize(
+            self.timezone, ambiguous=np.zeros(len(local), dtype=bool),
+            nonexistent="shift_forward"
+        ).tz_convert("UTC").as_unit("ns").asi8
+
+    @staticmethod
+    def _epoch(when: Moment) -> int:
+        """Epoch ns of a moment (naive values are taken as UTC)"""
+        stamp = pd.Timestamp.now(tz="UTC") if when is None else pd.Timestamp(when)
+        if stamp.tzinfo is None:
+            stamp = stamp.tz_localize("UTC")
+        return stamp.tz_convert("UTC").as_unit("ns").value
+
+    def _from_epoch(self, values: np.ndarray, position: int) -> Optional[pd.Timestamp]:
+        if position >= len(values):
+            return None
+        return pd.Timestamp(int(values[position]), unit="ns", tz="UTC")
+
+    def sessions(self, start: Union[str, date], end: Union[str, date]) -> np.ndarray:
+        """
+        Ngày giao dịch trong [start, end)
+
+        Args:
+            start: Ngày bắt đầu (bao gồm)
+            end: Ngày kết thúc (không bao gồm)
+
+        Returns:
+            Mảng datetime64[D] đã sắp xếp
+        """
+        lo, hi = np.searchsorted(self.sessions_table, [_day(start), _day(end)])
+        return self.sessions_table[lo:hi]
+
+    def is_session(self, day: Union[str, date]) -> bool:
+        """Ngày có phải ngày giao dịch không"""
+        key = _day(day)
+        position = np.searchsorted(self.sessions_table, key)
+        return position < len(self.sessions_table) and self.sessions_table[position] == key
+
+    def is_open(self, when: Moment = None) -> bool:
+        """
+        Thị trường có đang mở cửa tại thời điểm when không
+
+        Args:
+            when: Thời điểm (mặc định hiện tại; naive được hiểu là UTC)
+        """
+        moment = self._epoch(when)
+        position = np.searchsorted(self.opens, moment, side="right") - 1
+        return bool(position >= 0 and moment < self.closes[position])
+
+    def next_open(self, when: Moment = None) -> Optional[pd.Timestamp]:
+        """
+        Lần mở cửa kế tiếp sau thời điểm when (UTC, None nếu ngoài bảng)
+        """
+        return self._from_epoch(self.opens, np.searchsorted(self.opens, self._epoch(when), side="right"))
+
+    def next_close(self, when: Moment = None) -> Optional[pd.Timestamp]:
+        """
+        Lần đóng cửa kế tiếp sau thời điểm when (của phiên đang mở nếu thị
+        trường đang mở; UTC, None nếu ngoài bảng)
+        """
+        return self._from_epoch(self.closes, np.searchsorted(self.closes, self._epoch(when), side="right"))
+
+    def previous_close(self, when: Moment = None) -> Optional[pd.Timestamp]:
+        """Lần đóng cửa gần nhất tại hoặc trước thời điểm when (UTC)"""
+        position = np.searchsorted(self.closes, self._epoch(when), side="right") - 1
+        return self._from_epoch(self.closes, position) if position >= 0 else None
+
+
+_calendars: Dict[str, TradingCalendar] = {}
+
+
+def get_calendar(market: str) -> TradingCalendar:
+    """
+    Shared calendar of a market, built on first use
+
+    Args:
+        market: Market code (US, VN, FX, FUTURES)
+
+    Returns:
+        TradingCalendar
+    """
+    calendar = _calendars.get(market)
+    if calendar is None:
+        calendar = _calendars[market] = TradingCalendar(market)
+    return calendar
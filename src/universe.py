@@ -0,0 +1,112 @@
+"""
+Symbol universe loading and batching for large-scale fetches
+"""
+
+import csv
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import config
+
+
+def load_universe(path: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Load the symbol universe from file
+
+    The file is either a CSV with a ``symbol`` column (optional ``name`` and
+    ``market`` columns) or a plain text file with one symbol per line.
+    Blank lines and lines starting with ``#`` are ignored. Without a file
+    the universe falls back to ``config.SYMBOLS``.
+
+    Args:
+        path: Universe file path (defaults to config.UNIVERSE_FILE)
+
+    Returns:
+        List of dicts with symbol, name and market
+    """
+    path = path or config.UNIVERSE_FILE
+
+    if not os.path.exists(path):
+        return [
+            {"symbol": symbol, "name": name, "market": ""}
+            for name, symbol in config.SYMBOLS.items()
+        ]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+    if not lines:
+        return []
+
+    header = [column.strip().lower() for column in lines[0].split(",")]
+    if "symbol" in header:
+        reader = csv.DictReader(lines, fieldnames=header)
+        next(reader)
+        rows = [
+            {
+                "symbol": (row.get("symbol") or "").strip(),
+                "name": (row.get("name") or "").strip(),
+                "market": (row.get("market") or "").strip()
+            }
+            for row in reader
+        ]
+    else:
+        rows = [{"symbol": line.strip(), "name": "", "market": ""} for line in lines]
+
+    # Remove duplicates while keeping the file order
+    seen = set()
+    universe = []
+    for row in rows:
+        if row["symbol"] and row["symbol"] not in seen:
+            seen.add(row["symbol"])
+            universe.append(row)
+
+    return universe
+
+
+def batched(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    """
+    Split an iterable into lists of at most ``size`` items
+
+    Args:
+        items: Items to split
+        size: Batch size
+
+    Returns:
+        Iterator of batches
+    """
+    if size < 1:
+        raise ValueError("Batch size must be at least 1")
+
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+    from financial_data_fetcher import FinancialDataFetcher
+
+    parser = argparse.ArgumentParser(description="Fetch the whole symbol universe")
+    parser.add_argument("--file", default=config.UNIVERSE_FILE, help="Universe file")
+    parser.add_argument("--batch-size", type=int, default=config.UNIVERSE_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=config.MAX_WORKERS)
+    parser.add_argument("--period", default="1d")
+    args = parser.parse_args()
+
+    symbols = [entry["symbol"] for entry in load_universe(args.file)]
+    print(f"Fetching {len(symbols)} symbols...")
+
+    stats = FinancialDataFetcher().fetch_universe_data(
+        symbols,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        period=args.period
+    )
+    print(f"Universe fetch completed: {stats}")
@@ -2,12 +2,31 @@
 Utility functions for Financial Data Fetcher
 """
 
+from __future__ import annotations
+
+import hashlib
 import json
-import pandas as pd
-import numpy as np
+import math
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Any, Optional, Tuple, Union
 import os
+from lazy import lazy_import, loaded_module
+
+# pandas/numpy và lịch giao dịch chỉ được import khi thực sự cần
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+trading_calendar = lazy_import("trading_calendar")
+
+if TYPE_CHECKING:
+    from models import Bars
+
+
+def _is_bars(value: Any) -> bool:
+    """True if value is a models.Bars, checked without importing models (and numpy/pandas)"""
+    models = loaded_module("models")
+    return models is not None and isinstance(value, models.Bars)
+
 
 def format_currency(value: float, currency: str = "USD") -> str:
     """
@@ -74,34 +93,18 @@ def is_market_open(market: str = "US") -> bool:
     """
     Check if market is currently open
     
+    Uses the market's trading calendar (exchange time zone, holidays and
+    half days); markets without a calendar are treated as always open.
+    
     Args:
-        market: Market code (US, VN, EU, etc.)
+        market: Market code (US, VN, FX, FUTURES, etc.)
     
     Returns:
         Boolean indicating if market is open
     """
-    now = datetime.now()
-    weekday = now.weekday()  # 0=Monday, 6=Sunday
-    
-    if market == "US":
-        # US market: Monday-Friday, 9:30 AM - 4:00 PM ET
-        if weekday >= 5:  # Weekend
-            return False
-        
-        # Simplified check (ignoring timezone for now)
-        hour = now.hour
-        return 9 <= hour <= 16
-    
-    elif market == "VN":
-        # Vietnam market: Monday-Friday, 9:00 AM - 3:00 PM ICT
-        if weekday >= 5:  # Weekend
-            return False
-        
-        hour = now.hour
-        return 9 <= hour <= 15
-    
-    # Default to always open for other markets
-    return True
+    if market not in trading_calendar.MARKET_SESSIONS:
+        return True
+    return trading_calendar.get_calendar(market).is_open()
 
 def get_market_status(market: str = "US") -> Dict[str, Any]:
     """
@@ -115,40 +118,102 @@ def get_market_status(market: str = "US") -> Dict[str, Any]:
     """
     is_open = is_market_open(market)
     now = datetime.now()
-    
-    return {
+    status = {
         "market": market,
         "is_open": is_open,
         "current_time": now.isoformat(),
         "weekday": now.strftime("%A"),
         "status": "Open" if is_open else "Closed"
     }
+    
+    if market in trading_calendar.MARKET_SESSIONS:
+        calendar = trading_calendar.get_calendar(market)
+        next_open, next_close = calendar.next_open(), calendar.next_close()
+        status["next_open"] = next_open.isoformat() if next_open is not None else None
+        status["next_close"] = next_close.isoformat() if next_close is not None else None
+    
+    return status
+
+def _non_finite_positions(values: List[Any]) -> Optional[np.ndarray]:
+    """Positions of NaN/inf in a purely numeric list (None if not numeric)"""
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        return None
+    # Chuỗi, None hoặc phần tử lồng nhau được xử lý từng phần tử
+    if array.ndim != 1 or array.dtype.kind not in "biuf":
+        return None
+    return np.flatnonzero(~np.isfinite(array))
+
+
+def _clean_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Replace NaN/inf in a list of flat row dicts with None (in place)"""
+    frame = pd.DataFrame(records).select_dtypes(include="number")
+    if frame.shape[1] == 0:
+        return records
+    rows, cols = np.nonzero(~np.isfinite(frame.to_numpy(dtype=float)))
+    names = frame.columns
+    for row, col in zip(rows.tolist(), cols.tolist()):
+        record = records[row]
+        if names[col] in record:
+            record[names[col]] = None
+    return records
+
+
+def _clean_value(value: Any, in_place: bool) -> Any:
+    if isinstance(value, dict):
+        target = value if in_place else {}
+        for key, item in value.items():
+            target[key] = _clean_value(item, in_place)
+        return target
+
+    if _is_bars(value):
+        # Bars là mảng float; chuyển sang dạng cột để biểu diễn giá trị thiếu bằng None
+        return _clean_value(value.to_columns(), True)
+
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+        in_place = True
+
+    if isinstance(value, list):
+        if value and isinstance(value[0], dict) and all(isinstance(row, dict) for row in value):
+            flat = not any(isinstance(item, (dict, list)) for item in value[0].values())
+            if flat:
+                return _clean_records(value if in_place else [dict(row) for row in value])
+        else:
+            positions = _non_finite_positions(value)
+            if positions is not None:
+                target = value if in_place else list(value)
+                for position in positions.tolist():
+                    target[position] = None
+                return target
 
-def clean_financial_data(data: Dict[str, Any]) -> Dict[str, Any]:
+        target = value if in_place else [None] * len(value)
+        for i, item in enumerate(value):
+            target[i] = _clean_value(item, in_place)
+        return target
+
+    if isinstance(value, (float, np.floating)) and not math.isfinite(value):
+        return None
+    return value
+
+
+def clean_financial_data(data: Dict[str, Any], in_place: bool = False) -> Dict[str, Any]:
     """
     Clean and validate financial data
     
+    NaN and infinity values are replaced with None in nested dicts, lists,
+    row-dict histories and arrays. Histories are cleaned with vectorized
+    masks; Bars are converted to their column-oriented dict.
+    
     Args:
         data: Raw financial data
+        in_place: Modify ``data`` instead of building a cleaned copy
     
     Returns:
         Cleaned financial data
     """
-    cleaned = {}
-    
-    for key, value in data.items():
-        if isinstance(value, dict):
-            cleaned[key] = clean_financial_data(value)
-        elif isinstance(value, (int, float)):
-            # Remove NaN and infinity values
-            if np.isnan(value) or np.isinf(value):
-                cleaned[key] = None
-            else:
-                cleaned[key] = value
-        else:
-            cleaned[key] = value
-    
-    return cleaned
+    return _clean_value(data, in_place)
 
 def export_to_csv(data: Dict[str, Any], filename: str = "financial_data.csv"):
     """
@@ -172,10 +237,152 @@ def export_to_csv(data: Dict[str, Any], filename: str = "financial_data.csv"):
     except Exception as e:
         print(f"Error exporting to CSV: {str(e)}")
 
+class FlattenSchema:
+    """
+    Precompiled key paths of a nested dict shape
+
+    Compiling walks one sample dict; afterwards values of any dict with the
+    same shape are extracted along the stored paths without building key
+    strings or intermediate dicts.
+    """
+
+    def __init__(self, paths: List[Tuple[str, ...]], sep: str = '_',
+                 sizes: Optional[Dict[Tuple[str, ...], int]] = None):
+        self.paths = [tuple(path) for path in paths]
+        self.sep = sep
+        self.keys = [sep.join(str(key) for key in path) for path in self.paths]
+        self._plan = self._build_plan(self.paths, sizes or {})
+
+    @staticmethod
+    def _build_plan(paths: List[Tuple[str, ...]], sizes: Dict[Tuple[str, ...], int]) -> list:
+        # Mỗi node: [số key của dict khi compile (None nếu không rõ), [(key, node con hoặc vị trí leaf)]]
+        root = [sizes.get(()), []]
+        nodes = {(): root}
+        for position, path in enumerate(paths):
+            parent = root
+            for depth in range(1, len(path)):
+                prefix = path[:depth]
+                node = nodes.get(prefix)
+                if node is None:
+                    node = nodes[prefix] = [sizes.get(prefix), []]
+                    parent[1].append((path[depth - 1], node))
+                parent = node
+            parent[1].append((path[-1], position))
+        return root
+
+    @classmethod
+    def compile(cls, data: Dict[str, Any], sep: str = '_',
+                exclude: Iterable[str] = ()) -> "FlattenSchema":
+        """
+        Compile the schema of a sample dict
+
+        Args:
+            data: Sample nested dict
+            sep: Separator for flattened keys
+            exclude: Keys skipped at any depth
+
+        Returns:
+            FlattenSchema
+        """
+        exclude = set(exclude)
+        paths = []
+        sizes = {(): len(data)}
+        stack = [((key,), value) for key, value in reversed(list(data.items())) if key not in exclude]
+        while stack:
+            path, value = stack.pop()
+            if isinstance(value, dict):
+                sizes[path] = len(value)
+                stack.extend(
+                    ((*path, key), item) for key, item in reversed(list(value.items()))
+                    if key not in exclude
+                )
+            else:
+                paths.append(path)
+        return cls(paths, sep, sizes)
+
+    def values(self, data: Dict[str, Any], strict: bool = True) -> Optional[List[Any]]:
+        """
+        Extract leaf values in schema order
+
+        Args:
+            data: Nested dict
+            strict: Return None if ``data`` does not have exactly this shape;
+                otherwise missing values are None and extra keys are ignored
+
+        Returns:
+            List of values aligned with ``keys`` (None on strict mismatch)
+        """
+        values: List[Any] = [None] * len(self.paths)
+        stack = [(data, self._plan)]
+        while stack:
+            obj, (size, items) = stack.pop()
+            if strict and len(obj) != size:
+                return None
+            for key, child in items:
+                if key not in obj:
+                    if strict:
+                        return None
+                    continue
+                value = obj[key]
+                if type(child) is int:
+                    if strict and isinstance(value, dict):
+                        return None
+                    values[child] = value
+                elif isinstance(value, dict):
+                    stack.append((value, child))
+                elif strict:
+                    return None
+        return values
+
+    def flatten(self, data: Dict[str, Any], strict: bool = False) -> Optional[Dict[str, Any]]:
+        """Flatten ``data`` into a dict keyed by the flattened keys"""
+        values = self.values(data, strict)
+        return None if values is None else dict(zip(self.keys, values))
+
+    def unflatten(self, flat: Union[Dict[str, Any], List[Any]]) -> Dict[str, Any]:
+        """
+        Rebuild the nested dict from flattened keys or a list of values
+
+        Args:
+            flat: Dict keyed by ``keys`` or values in schema order
+
+        Returns:
+            Nested dict
+        """
+        if isinstance(flat, dict):
+            pairs = [(path, flat[key]) for path, key in zip(self.paths, self.keys) if key in flat]
+        else:
+            pairs = zip(self.paths, flat)
+
+        result: Dict[str, Any] = {}
+        for path, value in pairs:
+            node = result
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = value
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly form (see from_dict)"""
+        return {"sep": self.sep, "paths": [list(path) for path in self.paths]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FlattenSchema":
+        """Rebuild a schema saved with to_dict (lenient extraction only)"""
+        return cls([tuple(path) for path in data["paths"]], data.get("sep", '_'))
+
+
+# Cache LRU các schema đã compile theo (sep, các key cấp cao nhất)
+FLATTEN_SCHEMA_CACHE_SIZE = 64
+_flatten_schemas: "OrderedDict[tuple, FlattenSchema]" = OrderedDict()
+
+
 def flatten_dict(d: Dict[str, Any], parent_key: str = '', sep: str = '_') -> Dict[str, Any]:
     """
     Flatten nested dictionary
     
+    Schemas are compiled once per shape and reused for dicts of the same shape.
+    
     Args:
         d: Dictionary to flatten
         parent_key: Parent key for nested keys
@@ -184,39 +391,59 @@ def flatten_dict(d: Dict[str, Any], parent_key: str = '', sep: str = '_') -> Dic
     Returns:
         Flattened dictionary
     """
-    items = []
-    
-    for k, v in d.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        
-        if isinstance(v, dict):
-            items.extend(flatten_dict(v, new_key, sep=sep).items())
-        else:
-            items.append((new_key, v))
-    
-    return dict(items)
+    cache_key = (sep, tuple(d))
+    schema = _flatten_schemas.get(cache_key)
+    values = schema.values(d) if schema is not None else None
+    if values is None:
+        schema = _flatten_schemas[cache_key] = FlattenSchema.compile(d, sep)
+        values = schema.values(d, strict=False)
+    _flatten_schemas.move_to_end(cache_key)
+    if len(_flatten_schemas) > FLATTEN_SCHEMA_CACHE_SIZE:
+        _flatten_schemas.popitem(last=False)
 
-def calculate_technical_indicators(prices: List[float], window: int = 20) -> Dict[str, float]:
+    keys = schema.keys if not parent_key else [f"{parent_key}{sep}{key}" for key in schema.keys]
+    return dict(zip(keys, values))
+
+
+def unflatten_dict(flat: Dict[str, Any], schema: FlattenSchema) -> Dict[str, Any]:
+    """
+    Inverse of flatten_dict
+
+    Args:
+        flat: Flattened dictionary
+        schema: Schema of the original shape (keys may contain the separator,
+            so it cannot be split back without one)
+
+    Returns:
+        Nested dictionary
+    """
+    return schema.unflatten(flat)
+
+def calculate_technical_indicators(prices: Union[List[float], np.ndarray, Bars],
+                                   window: int = 20) -> Dict[str, float]:
     """
     Calculate basic technical indicators
     
     Args:
-        prices: List of price values
+        prices: List/array of price values, or Bars (uses the Close column)
         window: Window size for moving average
     
     Returns:
         Dict with technical indicators
     """
+    if _is_bars(prices):
+        prices = prices.close
+    
     if len(prices) < window:
         return {"error": f"Not enough data points. Need at least {window}"}
     
-    prices_array = np.array(prices)
+    prices_array = np.asarray(prices, dtype=float)
     
     # Simple Moving Average
     sma = np.mean(prices_array[-window:])
     
     # Exponential Moving Average
-    ema = pd.Series(prices).ewm(span=window).mean().iloc[-1]
+    ema = pd.Series(prices_array).ewm(span=window).mean().iloc[-1]
     
     # Volatility (standard deviation)
     volatility = np.std(prices_array[-window:])
@@ -242,47 +469,149 @@ def calculate_technical_indicators(prices: List[float], window: int = 20) -> Dic
         "rsi": float(rsi)
     }
 
-def get_data_quality_score(data: Dict[str, Any]) -> Dict[str, Any]:
+# Các key chứa chuỗi dữ liệu lịch sử (được kiểm tra dạng vector)
+HISTORY_KEYS = ("historical_data",)
+
+# Cache LRU kết quả chấm điểm theo từng section mã: path -> (fingerprint, counts)
+QUALITY_CACHE_SIZE = 1024
+_quality_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+
+def _is_valid_scalar(value) -> bool:
+    if value is None:
+        return False
+    if isinstance(value, str):
+        return "error" not in value.lower()
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return True
+
+
+def _history_counts(history) -> tuple:
+    """
+    Validate a history container in vectorized form
+
+    Returns:
+        Tuple (points, invalid_points) where a point is invalid if any of its
+        numeric values is missing or not finite
+    """
+    if _is_bars(history):
+        if len(history) == 0 or not history.columns:
+            return len(history), 0
+        values = np.column_stack([np.asarray(column, dtype=float) for column in history.columns.values()])
+    elif isinstance(history, dict):
+        # Định dạng "columns": {"index": [...], "tz": ..., "Open": [...], ...}
+        columns = [column for key, column in history.items() if key not in ("index", "tz")]
+        if not columns:
+            return 0, 0
+        values = np.column_stack([pd.to_numeric(pd.Series(column), errors="coerce").to_numpy(dtype=float)
+                                  for column in columns])
+    elif isinstance(history, list):
+        if not history:
+            return 0, 0
+        frame = pd.DataFrame(history).select_dtypes(include="number")
+        if frame.shape[1] == 0:
+            return len(history), 0
+        values = frame.to_numpy(dtype=float)
+    else:
+        return 1, int(not _is_valid_scalar(history))
+
+    invalid = ~np.isfinite(values).all(axis=1)
+    return len(values), int(invalid.sum())
+
+
+def _section_fingerprint(section: Dict[str, Any]) -> Optional[bytes]:
+    """
+    Hash of the full content of a symbol section, so an edit to any row of
+    its history changes it; None if the section cannot be cached
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for key, value in section.items():
+        if _is_bars(value):
+            digest.update(json.dumps([key, value.tz, list(value.columns)]).encode())
+            digest.update(np.ascontiguousarray(value.index).tobytes())
+            for column in value.columns.values():
+                digest.update(np.ascontiguousarray(column, dtype=float).tobytes())
+        elif (value is None or isinstance(value, (str, int, float, list))
+              or (isinstance(value, dict) and key in HISTORY_KEYS)):
+            digest.update(json.dumps([key, value], default=repr).encode())
+        else:
+            return None
+    return digest.digest()
+
+
+def _score_section(section: Dict[str, Any]) -> tuple:
+    """Đếm (total, valid, error, history_points, invalid_history_points) của một dict phẳng"""
+    total = valid = history_points = invalid_points = 0
+    for key, value in section.items():
+        total += 1
+        if key in HISTORY_KEYS or _is_bars(value):
+            points, invalid = _history_counts(value)
+            history_points += points
+            invalid_points += invalid
+            ok = invalid == 0
+        else:
+            ok = _is_valid_scalar(value)
+        valid += ok
+    return total, valid, total - valid, history_points, invalid_points
+
+
+def get_data_quality_score(data: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
     """
     Calculate data quality score
     
+    Scalar fields are walked iteratively; each history container counts as
+    one field that is valid only if all of its points are finite. Results for
+    symbol sections are cached and reused while the section is unchanged.
+    
     Args:
         data: Financial data to evaluate
+        use_cache: Reuse cached results of unchanged symbol sections
     
     Returns:
         Dict with quality metrics
     """
-    total_fields = 0
-    valid_fields = 0
-    error_fields = 0
-    
-    def check_value(value):
-        nonlocal total_fields, valid_fields, error_fields
-        total_fields += 1
-        
-        if value is None:
-            error_fields += 1
-        elif isinstance(value, str) and "error" in value.lower():
-            error_fields += 1
-        elif isinstance(value, (int, float)) and (np.isnan(value) or np.isinf(value)):
-            error_fields += 1
-        else:
-            valid_fields += 1
-    
-    def traverse(obj):
-        if isinstance(obj, dict):
-            for value in obj.values():
-                if isinstance(value, dict):
-                    traverse(value)
-                else:
-                    check_value(value)
-        elif isinstance(obj, list):
-            for item in obj:
-                traverse(item)
+    total_fields = valid_fields = error_fields = 0
+    history_points = invalid_history_points = 0
+
+    stack = [((), data)]
+    while stack:
+        path, obj = stack.pop()
+
+        if isinstance(obj, list):
+            stack.extend(((*path, i), item) for i, item in enumerate(obj))
+            continue
+        if not isinstance(obj, dict):
+            ok = _is_valid_scalar(obj)
+            total_fields += 1
+            valid_fields += ok
+            error_fields += not ok
+            continue
+
+        nested = {key: value for key, value in obj.items()
+                  if isinstance(value, dict) and key not in HISTORY_KEYS}
+        for key, value in nested.items():
+            stack.append(((*path, key), value))
+        flat = obj if not nested else {key: value for key, value in obj.items() if key not in nested}
+
+        fingerprint = _section_fingerprint(flat) if use_cache and "symbol" in flat else None
+        cached = _quality_cache.get(path) if fingerprint is not None else None
+        if cached is not None and cached[0] == fingerprint:
+            counts = cached[1]
+            _quality_cache.move_to_end(path)
         else:
-            check_value(obj)
-    
-    traverse(data)
+            counts = _score_section(flat)
+            if fingerprint is not None:
+                _quality_cache[path] = (fingerprint, counts)
+                _quality_cache.move_to_end(path)
+                if len(_quality_cache) > QUALITY_CACHE_SIZE:
+                    _quality_cache.popitem(last=False)
+
+        total_fields += counts[0]
+        valid_fields += counts[1]
+        error_fields += counts[2]
+        history_points += counts[3]
+        invalid_history_points += counts[4]
     
     quality_score = (valid_fields / total_fields * 100) if total_fields > 0 else 0
     
@@ -290,6 +619,8 @@ def get_data_quality_score(data: Dict[str, Any]) -> Dict[str, Any]:
         "total_fields": total_fields,
         "valid_fields": valid_fields,
         "error_fields": error_fields,
+        "history_points": history_points,
+        "invalid_history_points": invalid_history_points,
         "quality_score": quality_score,
         "quality_grade": get_quality_grade(quality_score)
     }
@@ -315,12 +646,14 @@ def get_quality_grade(score: float) -> str:
     else:
         return "F"
 
-def create_summary_report(data: Dict[str, Any]) -> str:
+def create_summary_report(data: Dict[str, Any],
+                          quality: Optional[Dict[str, Any]] = None) -> str:
     """
     Create a summary report of the financial data
     
     Args:
         data: Financial data
+        quality: Precomputed get_data_quality_score(data) result
     
     Returns:
         Formatted summary report
@@ -331,7 +664,7 @@ def create_summary_report(data: Dict[str, Any]) -> str:
     report.append("")
     
     # Data Quality
-    quality = get_data_quality_score(data)
+    quality = quality or get_data_quality_score(data)
     report.append(f"Data Quality Score: {quality['quality_score']:.1f}% (Grade: {quality['quality_grade']})")
     report.append(f"Valid Fields: {quality['valid_fields']}/{quality['total_fields']}")
     report.append("")
@@ -343,33 +676,9 @@ def create_summary_report(data: Dict[str, Any]) -> str:
     report.append(f"VN Market Status: {vn_status['status']}")
     report.append("")
     
-    # Key Metrics
-    if 'precious_metals' in data:
-        report.append("PRECIOUS METALS:")
-        metals = data['precious_metals']
-        if 'gold' in metals and 'current_price' in metals['gold']:
-            report.append(f"  Gold: {format_currency(metals['gold']['current_price'])}")
-        if 'silver' in metals and 'current_price' in metals['silver']:
-            report.append(f"  Silver: {format_currency(metals['silver']['current_price'])}")
-        report.append("")
-    
-    if 'stock_indices' in data:
-        report.append("STOCK INDICES:")
-        indices = data['stock_indices']
-        if 'dow_jones' in indices and 'current_price' in indices['dow_jones']:
-            report.append(f"  Dow Jones: {indices['dow_jones']['current_price']:,.2f}")
-        if 'vn_index' in indices and 'current_price' in indices['vn_index']:
-            report.append(f"  VN Index: {indices['vn_index']['current_price']:,.2f}")
-        report.append("")
-    
-    if 'fx' in data:
-        report.append("FOREIGN EXCHANGE:")
-        fx = data['fx']
-        if 'usd_vnd' in fx and 'current_price' in fx['usd_vnd']:
-            report.append(f"  USD/VND: {format_currency(fx['usd_vnd']['current_price'], 'VND')}")
-        if 'eur_usd' in fx and 'current_price' in fx['eur_usd']:
-            report.append(f"  EUR/USD: {fx['eur_usd']['current_price']:.4f}")
-        report.append("")
+    # Key Metrics (một dòng cho mỗi tài sản trong registry)
+    from assets import build_summary, report_lines
+    report.extend(report_lines(build_summary(data)))
     
     report.append("=" * 50)
     
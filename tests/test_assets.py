@@ -0,0 +1,66 @@
+"""
+Unit tests for the declarative asset registry
+"""
+
+import pytest
+import os
+import sys
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from assets import ASSETS, AssetSpec, build_summary, display_rows, grouped_rows, report_lines
+
+
+@pytest.fixture
+def snapshot():
+    """Snapshot with some assets present and one without a price"""
+    return {
+        "precious_metals": {"gold": {"current_price": 2000.0, "change": 5.0, "change_percent": 0.25},
+                            "silver": {"error": "timeout"}},
+        "bond_yields": {"us_10y_bond_yahoo": {"current_price": 4.25, "change": -0.05, "change_percent": -1.16}},
+        "fx": {"eur_usd": {"current_price": 1.0912, "change": 0.0021, "change_percent": 0.19}},
+        "timestamp": "2024-01-02T09:00:00"
+    }
+
+
+class TestAssetRegistry:
+    """Test cases for the registry-driven builders"""
+
+    def test_keys_are_unique(self):
+        """Test every registered asset has its own key"""
+        assert len({spec.key for spec in ASSETS}) == len(ASSETS)
+
+    def test_build_summary(self, snapshot):
+        """Test summary rows follow the legacy summary_data.json format"""
+        summary = build_summary(snapshot)
+        assert list(summary) == ["gold", "us_10y_bond", "eur_usd"]
+        assert summary["us_10y_bond"] == {
+            "name": "US 10Y Treasury", "price": 4.25, "change": -0.05,
+            "change_percent": -1.16, "currency": "USD", "unit": "%"
+        }
+        assert build_summary({}) == {} and build_summary(None) == {}
+
+    def test_formatting_and_groups(self, snapshot):
+        """Test per-asset formatters and group order"""
+        rows = display_rows(build_summary(snapshot))
+        texts = {row["spec"].key: (row["price_text"], row["change_text"]) for row in rows}
+        assert texts["gold"] == ("$2,000.00", "+5.00")
+        assert texts["us_10y_bond"] == ("4.25%", "-0.05")
+        assert texts["eur_usd"] == ("1.0912", "+0.0021")
+        assert [group for group, _, _ in grouped_rows(rows)] == ["precious_metals", "bonds", "fx"]
+
+        assert report_lines(build_summary(snapshot))[:3] == ["PRECIOUS METALS:", "  Gold: $2,000.00", ""]
+
+    def test_custom_registry_scales(self):
+        """Test a large registry is handled by the same generic code"""
+        registry = [AssetSpec(f"s{i}", f"Stock {i}", ("stocks", f"S{i}"), "stock_indices")
+                    for i in range(500)]
+        data = {"stocks": {f"S{i}": {"current_price": float(i)} for i in range(0, 500, 2)}}
+        summary = build_summary(data, registry)
+        assert len(summary) == 250
+        assert summary["s10"]["price"] == 10.0 and summary["s10"]["change"] == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
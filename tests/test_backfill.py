@@ -0,0 +1,115 @@
+"""
+Unit tests for the historical backfill engine
+"""
+
+import pytest
+import os
+import sys
+import tempfile
+from unittest.mock import MagicMock
+import pandas as pd
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from backfill import BackfillEngine, split_date_range
+from storage import DataStore
+from rate_limiter import RateLimiter
+
+
+def fake_history(symbol, start, end, interval="1d"):
+    """Return one bar per business day in [start, end)"""
+    index = pd.bdate_range(start, end, inclusive="left")
+    return pd.DataFrame({
+        "Open": 1.0, "High": 1.0, "Low": 1.0, "Close": 1.0, "Volume": 10
+    }, index=index)
+
+
+class TestBackfill:
+    """Test cases for BackfillEngine"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = DataStore(os.path.join(self.tmpdir, "test.db"))
+        self.fetcher = MagicMock()
+        self.fetcher.fetch_yahoo_history.side_effect = fake_history
+        self.engine = BackfillEngine(self.fetcher, self.store, chunk_days=7, max_workers=3)
+
+    def teardown_method(self):
+        self.store.close()
+
+    def test_split_date_range(self):
+        """Test chunks cover the range without overlap"""
+        chunks = split_date_range("2024-01-01", "2024-01-20", 7)
+        assert chunks == [
+            ("2024-01-01", "2024-01-08"),
+            ("2024-01-08", "2024-01-15"),
+            ("2024-01-15", "2024-01-20"),
+        ]
+
+    def test_backfill_writes_all_chunks(self):
+        """Test every chunk lands in the store"""
+        stats = self.engine.run(["AAA", "BBB"], start="2024-01-01", end="2024-02-01")
+
+        assert stats["chunks"] == 10
+        assert stats["completed"] == 10
+        assert stats["rows"] == 2 * 23
+        assert len(self.store.load_bars("AAA")) == 23
+
+    def test_resume_skips_completed_chunks(self):
+        """Test an interrupted backfill only retries the missing chunks"""
+        def flaky(symbol, start, end, interval="1d"):
+            if start == "2024-01-08":
+                raise ConnectionError("timeout")
+            return fake_history(symbol, start, end)
+
+        self.fetcher.fetch_yahoo_history.side_effect = flaky
+        first = self.engine.run(["AAA"], start="2024-01-01", end="2024-01-22")
+        assert first["failed"] == 1 and first["completed"] == 2
+
+        self.fetcher.fetch_yahoo_history.side_effect = fake_history
+        self.fetcher.fetch_yahoo_history.reset_mock()
+        second = self.engine.run(["AAA"], start="2024-01-01", end="2024-01-22")
+
+        assert second["chunks"] == 1
+        self.fetcher.fetch_yahoo_history.assert_called_once_with("AAA", "2024-01-08", "2024-01-15")
+        assert len(self.store.load_bars("AAA")) == 15
+
+    def test_in_flight_chunks_are_bounded(self):
+        """Test finished chunks are released instead of piling up until the end"""
+        fetched = []
+        saved = []
+        save = self.store.save_backfill_chunk
+
+        def counting_history(symbol, start, end, interval="1d"):
+            fetched.append(start)
+            # Chunk chưa ghi không vượt quá max_workers * 2 (đang chờ) + 1 (đang gửi)
+            assert len(fetched) - len(saved) <= 3 * 2 + 1
+            return fake_history(symbol, start, end)
+
+        def counting_save(*args):
+            saved.append(args[1])
+            return save(*args)
+
+        self.fetcher.fetch_yahoo_history.side_effect = counting_history
+        self.store.save_backfill_chunk = counting_save
+        stats = self.engine.run(["AAA", "BBB", "CCC"], start="2023-01-01", end="2024-01-01")
+
+        assert stats["failed"] == 0
+        assert stats["completed"] == len(saved) == 3 * 53
+
+
+class TestRateLimiter:
+    """Test cases for RateLimiter"""
+
+    def test_burst_within_capacity(self):
+        """Test requests up to the capacity are not delayed"""
+        limiter = RateLimiter(100)
+        for _ in range(100):
+            limiter.acquire()
+        assert limiter.tokens < 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
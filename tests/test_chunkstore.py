@@ -0,0 +1,151 @@
+"""
+Unit tests for the content-addressed bar store
+"""
+
+import pytest
+import glob
+import json
+import os
+import sys
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from chunkstore import CHUNK_KEY, ChunkStore, chunk_boundaries
+from exporter import iter_snapshot_files
+
+def make_bar(i):
+    close = 2000.0 + i * 1.37
+    return {"Date": f"2024-{i // 28 + 1:02d}-{i % 28 + 1:02d}T00:00:00", "Open": close - 0.7,
+            "High": close + 3.1, "Low": close - 2.7, "Close": close, "Volume": 150000 + i * 37}
+
+
+def make_snapshot(day, symbols=5, length=120):
+    """Snapshot with a rolling history window per symbol"""
+    quotes = {
+        f"S{j}": {"symbol": f"S{j}", "current_price": 1.0 + day,
+                  "historical_data": [make_bar(i + 1000 * j) for i in range(day, day + length)]}
+        for j in range(symbols)
+    }
+    return {"stocks": quotes, "timestamp": f"day {day}"}
+
+
+def object_count(store):
+    return len(glob.glob(os.path.join(store.objects_dir, "*", "*.json")))
+
+
+@pytest.fixture
+def store(tmp_path):
+    snapshots = tmp_path / "data"
+    snapshots.mkdir()
+    return ChunkStore(str(tmp_path / "chunks"), snapshot_dir=str(snapshots))
+
+
+class TestChunkBoundaries:
+    """Test cases for content-defined chunking"""
+
+    def test_ranges_cover_rows(self):
+        rows = [json.dumps(make_bar(i)).encode() for i in range(200)]
+        ranges = chunk_boundaries(rows, target=8)
+        assert ranges[0][0] == 0 and ranges[-1][1] == 200
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        assert all(end - start <= 32 for start, end in ranges)
+
+    def test_boundaries_survive_shift(self):
+        rows = [json.dumps(make_bar(i)).encode() for i in range(200)]
+        ends = {end for _, end in chunk_boundaries(rows, target=8)}
+        shifted = {end + 5 for _, end in chunk_boundaries(rows[5:], target=8)}
+        # Sau ranh giới đầu tiên, các ranh giới trùng với dãy gốc
+        assert len(ends & shifted) >= len(ends) - 3
+
+
+class TestChunkStore:
+    """Test cases for ChunkStore"""
+
+    def test_round_trip_records(self, store, tmp_path):
+        snapshot = make_snapshot(0)
+        path = os.path.join(store.snapshot_dir, "financial_data_1.json")
+        store.save_snapshot(snapshot, path)
+        with open(path) as f:
+            saved = json.load(f)
+        assert CHUNK_KEY in saved["stocks"]["S0"]["historical_data"]
+        assert saved["stocks"]["S0"]["current_price"] == 1.0
+        assert store.load_snapshot(path) == snapshot
+
+    def test_round_trip_columns(self, store):
+        history = {"index": ["2024-01-01", "2024-01-02"], "tz": None,
+                   "Close": [1.5, 2.5], "Volume": [10, 20]}
+        snapshot = {"fx": {"eur_usd": {"current_price": 1.1, "historical_data": history}}}
+        path = os.path.join(store.snapshot_dir, "financial_data_1.json")
+        store.save_snapshot(snapshot, path)
+        assert store.load_snapshot(path) == snapshot
+
+    def test_legacy_snapshot_loads(self, store):
+        snapshot = make_snapshot(0, symbols=1, length=3)
+        path = os.path.join(store.snapshot_dir, "financial_data_1.json")
+        with open(path, "w") as f:
+            json.dump(snapshot, f)
+        assert store.load_snapshot(path) == snapshot
+
+    def test_shifted_history_is_deduplicated(self, store):
+        store.save_snapshot(make_snapshot(0), os.path.join(store.snapshot_dir, "financial_data_1.json"))
+        first = object_count(store)
+        store.save_snapshot(make_snapshot(1), os.path.join(store.snapshot_dir, "financial_data_2.json"))
+        # Cửa sổ trượt một bar chỉ tạo chunk mới ở đầu và cuối mỗi history
+        assert object_count(store) - first <= 2 * 5 + 2
+
+    def test_loaded_snapshot_does_not_share_cached_chunks(self, store):
+        path = os.path.join(store.snapshot_dir, "financial_data_1.json")
+        store.save_snapshot(make_snapshot(0, symbols=1), path)
+        loaded = store.load_snapshot(path)
+        loaded["stocks"]["S0"]["historical_data"][0]["Close"] = -1.0
+        loaded["stocks"]["S0"]["historical_data"].pop()
+        assert store.load_snapshot(path) == make_snapshot(0, symbols=1)
+
+        history = {"index": ["2024-01-01", "2024-01-02"], "Close": [1.5, 2.5]}
+        store.save_snapshot({"fx": {"eur_usd": {"historical_data": history}}}, path)
+        store.load_snapshot(path)["fx"]["eur_usd"]["historical_data"]["Close"][0] = -1.0
+        assert store.load_snapshot(path)["fx"]["eur_usd"]["historical_data"] == history
+
+    def test_reused_chunk_is_not_collected(self, store):
+        old = os.path.join(store.snapshot_dir, "financial_data_1.json")
+        store.save_snapshot(make_snapshot(0), old)
+        for path in glob.glob(os.path.join(store.objects_dir, "*", "*.json")):
+            os.utime(path, (0, 0))
+
+        # Snapshot mới dùng lại các chunk cũ; trong lúc nó đang được ghi, GC
+        # chỉ thấy các chunk không được tham chiếu nhưng vừa được dùng lại
+        os.remove(old)
+        store.encode(make_snapshot(0))
+        assert store.collect_garbage(grace_seconds=3600) == 0
+
+    def test_collect_garbage(self, store):
+        old = os.path.join(store.snapshot_dir, "financial_data_1.json")
+        new = os.path.join(store.snapshot_dir, "financial_data_2.json")
+        store.save_snapshot(make_snapshot(0), old)
+        store.save_snapshot(make_snapshot(50), new)
+        assert store.collect_garbage(grace_seconds=0) == 0
+
+        os.remove(old)
+        # Chunk mới vẫn trong thời gian ân hạn
+        assert store.collect_garbage(grace_seconds=3600) == 0
+        assert store.collect_garbage(grace_seconds=0) > 0
+        assert object_count(store) == len(store.referenced())
+        assert store.load_snapshot(new) == make_snapshot(50)
+
+    def test_migrate(self, store):
+        snapshot = make_snapshot(0, symbols=2)
+        path = os.path.join(store.snapshot_dir, "financial_data_1.json")
+        with open(path, "w") as f:
+            json.dump(snapshot, f)
+        size = os.path.getsize(path)
+
+        assert store.migrate() == 1
+        assert store.migrate() == 0
+        assert os.path.getsize(path) < size
+        assert store.load_snapshot(path) == snapshot
+
+    def test_exporter_reads_chunked_snapshots(self, store):
+        store.save_snapshot(make_snapshot(0, symbols=1), os.path.join(store.snapshot_dir, "financial_data_1.json"))
+        snapshots = list(iter_snapshot_files(store.snapshot_dir, store=store))
+        assert snapshots == [make_snapshot(0, symbols=1)]
@@ -0,0 +1,175 @@
+"""
+Unit tests for the unified CLI and its warm daemon
+"""
+
+import pytest
+import json
+import os
+import socket
+import sys
+import threading
+from unittest.mock import MagicMock, patch
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+import cli
+
+TOKEN = "secret"
+
+
+@pytest.fixture
+def context():
+    """Command context with a mocked fetcher"""
+    ctx = cli.CommandContext()
+    ctx._fetcher = MagicMock()
+    ctx._fetcher.fetch_all_data.return_value = {"timestamp": "2024-01-01T00:00:00", "stocks": {}}
+    return ctx
+
+
+@pytest.fixture
+def daemon(context):
+    """Daemon on an ephemeral port, served from a background thread"""
+    server = cli.Daemon(port=0, context=context, token=TOKEN)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join(timeout=5)
+
+
+class TestCommandContext:
+    """Test cases for the shared command context"""
+
+    def test_snapshot_reused_within_max_age(self, context):
+        """Test report reuses the cached snapshot and fetch refreshes it"""
+        context.latest_snapshot()
+        context.latest_snapshot()
+        assert context.fetcher.fetch_all_data.call_count == 1
+
+        context.latest_snapshot(max_age=0)
+        assert context.fetcher.fetch_all_data.call_count == 2
+
+
+class TestDaemon:
+    """Test cases for the daemon protocol"""
+
+    def test_no_daemon_returns_none(self, daemon):
+        """Test the client reports when nothing is listening"""
+        port = daemon.server_address[1]
+        daemon.shutdown()
+        daemon.server_close()
+        assert cli.send_command("ping", port=port, token=TOKEN) is None
+
+    def test_round_trip_keeps_context_warm(self, daemon, context):
+        """Test commands share one context across connections"""
+        port = daemon.server_address[1]
+        assert cli.send_command("ping", port=port, token=TOKEN) == {"ok": True, "output": "pong",
+                                                       "version": cli.PROTOCOL_VERSION}
+
+        with patch("utils.create_summary_report", return_value="REPORT"):
+            first = cli.send_command("report", {"max_age": None}, port=port, token=TOKEN)
+            second = cli.send_command("report", {"max_age": None}, port=port, token=TOKEN)
+        assert first == second == {"ok": True, "output": "REPORT", "version": cli.PROTOCOL_VERSION}
+        assert context.fetcher.fetch_all_data.call_count == 1
+
+    def test_errors_are_reported(self, daemon):
+        """Test unknown commands and failures return an error response"""
+        port = daemon.server_address[1]
+        assert cli.send_command("nope", port=port, token=TOKEN)["ok"] is False
+        response = cli.send_command("report", {}, port=port, token=TOKEN)
+        assert response["ok"] is False and "max_age" in response["error"]
+
+    def test_stale_client_is_refused(self, daemon, context):
+        """Test commands from another protocol version are not run"""
+        with socket.create_connection(daemon.server_address, timeout=5) as connection:
+            payload = {"command": "fetch", "args": {"json": False}, "version": cli.PROTOCOL_VERSION - 1,
+                       "token": TOKEN}
+            connection.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+            response = json.loads(connection.makefile("r").readline())
+        assert response["ok"] is False and "version" in response["error"]
+        context.fetcher.fetch_all_data.assert_not_called()
+
+    def test_commands_without_the_token_are_refused(self, daemon, context):
+        """Test other local users cannot run commands or stop the daemon"""
+        port = daemon.server_address[1]
+        for token in ("", "guess"):
+            for command in ("fetch", "shutdown"):
+                response = cli.send_command(command, {"json": False}, port=port, token=token)
+                assert response["ok"] is False and "token" in response["error"]
+        context.fetcher.fetch_all_data.assert_not_called()
+        assert cli.send_command("ping", port=port, token=TOKEN)["ok"] is True
+
+    def test_export_outside_export_dir_is_refused(self, daemon, tmp_path, monkeypatch):
+        """Test the daemon does not write exports outside EXPORT_DIR"""
+        monkeypatch.setattr(cli.config, "EXPORT_DIR", str(tmp_path / "exports"))
+        port = daemon.server_address[1]
+        for output in (str(tmp_path / "elsewhere.csv"), "../elsewhere.csv"):
+            args = {"kind": "snapshots", "output": output, "format": None}
+            response = cli.send_command("export", args, port=port, token=TOKEN)
+            assert response["ok"] is False and "inside" in response["error"]
+        assert not (tmp_path / "elsewhere.csv").exists()
+
+
+class TestToken:
+    """Test cases for the daemon token file"""
+
+    def test_token_file_is_private_and_removed(self, tmp_path, monkeypatch):
+        """Test the daemon writes a 0600 token file and removes it on close"""
+        path = tmp_path / "token"
+        monkeypatch.setattr(cli.config, "DAEMON_TOKEN_FILE", str(path))
+        server = cli.Daemon(port=0, context=cli.CommandContext())
+
+        assert oct(os.stat(path).st_mode & 0o777) == "0o600"
+        assert cli.read_token() == server.token and len(server.token) == 64
+
+        server.server_close()
+        assert not path.exists()
+        assert cli.read_token() == ""
+
+
+class TestMain:
+    """Test cases for the command line entry point"""
+
+    def test_falls_back_to_local_run(self, capsys):
+        """Test commands run in-process when no daemon is listening"""
+        with patch.object(cli, "send_command", return_value=None) as send, \
+                patch.dict(cli.COMMANDS, {"report": lambda ctx, args: "LOCAL"}):
+            assert cli.main(["report"]) == 0
+        send.assert_called_once()
+        assert capsys.readouterr().out.strip() == "LOCAL"
+
+    def test_no_daemon_flag(self, capsys):
+        """Test --no-daemon skips the socket entirely"""
+        with patch.object(cli, "send_command") as send, \
+                patch.dict(cli.COMMANDS, {"report": lambda ctx, args: "LOCAL"}):
+            assert cli.main(["--no-daemon", "report"]) == 0
+        send.assert_not_called()
+
+    def test_output_path_is_resolved_on_the_client(self, tmp_path, monkeypatch):
+        """Test relative export paths are sent as absolute paths inside EXPORT_DIR"""
+        monkeypatch.setattr(cli.config, "EXPORT_DIR", str(tmp_path / "exports"))
+        response = {"ok": True, "output": "done", "version": cli.PROTOCOL_VERSION}
+        with patch.object(cli, "send_command", return_value=response) as send:
+            assert cli.main(["export", "bars", "out.csv"]) == 0
+        assert send.call_args[0][1]["output"] == os.path.realpath(tmp_path / "exports" / "out.csv")
+
+    def test_output_outside_export_dir_is_rejected(self, tmp_path, monkeypatch, capsys):
+        """Test the client refuses export paths outside EXPORT_DIR"""
+        monkeypatch.setattr(cli.config, "EXPORT_DIR", str(tmp_path / "exports"))
+        with patch.object(cli, "send_command") as send:
+            assert cli.main(["export", "bars", str(tmp_path / "out.csv")]) == 1
+        send.assert_not_called()
+        assert "inside" in capsys.readouterr().err
+
+    def test_stale_daemon_is_rejected(self, capsys):
+        """Test a daemon without a matching protocol version is not trusted"""
+        with patch.object(cli, "send_command", return_value={"ok": True, "output": "OLD"}):
+            assert cli.main(["report"]) == 1
+        captured = capsys.readouterr()
+        assert "OLD" not in captured.out and "protocol" in captured.err
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
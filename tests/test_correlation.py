@@ -0,0 +1,126 @@
+"""
+Unit tests for the rolling correlation service
+"""
+
+import pytest
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from correlation import CorrelationService, RollingCorrelation
+from storage import DataStore
+
+
+class TestRollingCorrelation:
+    """Test cases for the incremental pairwise matrices"""
+
+    def test_matches_pandas_with_missing_values(self):
+        """Test incremental windows equal DataFrame.cov/corr on the window"""
+        rng = np.random.default_rng(1)
+        data = rng.normal(size=(80, 4))
+        data[rng.random(data.shape) < 0.1] = np.nan
+
+        state = RollingCorrelation(4, window=30, min_periods=2)
+        for start in range(0, 80, 7):
+            state.add(data[start:start + 7])
+
+        window = pd.DataFrame(data[-30:])
+        np.testing.assert_allclose(state.covariance(), window.cov().to_numpy(), rtol=1e-9)
+        np.testing.assert_allclose(state.correlation(), window.corr().to_numpy(), rtol=1e-9)
+
+
+class TestCorrelationService:
+    """Test cases for CorrelationService"""
+
+    def setup_method(self):
+        """Setup a store with two correlated US series and one FX series"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = DataStore(os.path.join(self.tmpdir, "test.db"))
+        rng = np.random.default_rng(5)
+        dates = pd.bdate_range("2024-01-01", periods=60)
+        base = np.cumsum(rng.normal(0, 0.01, 60))
+        self.closes = pd.DataFrame({
+            "AAA": 100 * np.exp(base),
+            "BBB": 50 * np.exp(base + rng.normal(0, 0.002, 60)),
+            "EURUSD=X": 1.1 * np.exp(np.cumsum(rng.normal(0, 0.005, 60))),
+        }, index=dates)
+
+    def teardown_method(self):
+        self.store.close()
+
+    def save(self, rows):
+        for symbol in self.closes.columns:
+            timezone = "UTC" if symbol.endswith("=X") else "America/New_York"
+            frame = pd.DataFrame({"Close": self.closes[symbol].iloc[rows]})
+            frame.index = frame.index.tz_localize(timezone)
+            self.store.save_bars(symbol, frame)
+
+    def test_incremental_refresh_matches_full_recompute(self):
+        """Test refreshing twice equals computing the window from scratch"""
+        service = CorrelationService(list(self.closes.columns), self.store, windows=(20,))
+        self.save(slice(0, 40))
+        assert service.refresh() == 40
+        first = service.correlation(20)
+        assert service.correlation(20) is first
+
+        self.save(slice(40, 60))
+        assert service.refresh() == 20
+        assert service.refresh() == 0
+
+        returns = np.log(self.closes).diff().iloc[-20:]
+        np.testing.assert_allclose(service.correlation(20).to_numpy(), returns.corr().to_numpy(), rtol=1e-9)
+        assert service.correlation(20).loc["AAA", "BBB"] > 0.9
+
+    def save_symbol(self, symbol, rows):
+        timezone = "UTC" if symbol.endswith("=X") else "America/New_York"
+        frame = pd.DataFrame({"Close": self.closes[symbol].iloc[rows]})
+        frame.index = frame.index.tz_localize(timezone)
+        self.store.save_bars(symbol, frame)
+
+    def test_late_bar_of_one_symbol_is_ingested(self):
+        """Test a bar arriving after another market's bar of the same date still counts"""
+        service = CorrelationService(list(self.closes.columns), self.store, windows=(20, 40))
+        self.save_symbol("AAA", slice(0, 40))
+        self.save_symbol("BBB", slice(0, 40))
+        self.save_symbol("EURUSD=X", slice(0, 35))
+        assert service.refresh() == 40
+
+        # EURUSD=X đến muộn cho các ngày AAA/BBB đã xử lý, rồi cùng các ngày mới
+        self.save_symbol("EURUSD=X", slice(35, 40))
+        assert service.refresh() == 5
+        self.save(slice(40, 45))
+        assert service.refresh() == 5
+        assert service.refresh() == 0
+
+        fresh = CorrelationService(list(self.closes.columns), self.store, windows=(20, 40))
+        fresh.refresh()
+        for window in (20, 40):
+            np.testing.assert_allclose(service.covariance(window).to_numpy(),
+                                       fresh.covariance(window).to_numpy(), rtol=1e-9)
+
+    def test_late_bar_on_a_new_date_is_inserted(self):
+        """Test a late bar on a date no other symbol traded is inserted in order"""
+        service = CorrelationService(list(self.closes.columns), self.store, windows=(20,))
+        rows = [i for i in range(40) if i != 30]
+        self.save_symbol("AAA", rows)
+        self.save_symbol("BBB", rows)
+        self.save_symbol("EURUSD=X", slice(0, 28))
+        service.refresh()
+
+        self.save_symbol("EURUSD=X", slice(28, 40))
+        assert service.refresh() == 12
+
+        fresh = CorrelationService(list(self.closes.columns), self.store, windows=(20,))
+        fresh.refresh()
+        assert service.dates == fresh.dates
+        np.testing.assert_allclose(service.correlation(20).to_numpy(),
+                                   fresh.correlation(20).to_numpy(), rtol=1e-9)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
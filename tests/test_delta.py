@@ -0,0 +1,168 @@
+"""
+Unit tests for snapshot delta encoding
+"""
+
+import pytest
+import os
+import sys
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from delta import DeltaStore, apply, diff
+from publish import minify_json
+
+def make_bar(i, close=None):
+    """Daily bar in the default "records" history format"""
+    close = 2000.0 + i * 1.37 + 0.123456789 if close is None else close
+    return {"Date": f"2024-01-{i + 1:02d}T00:00:00", "Open": close - 0.71234567, "High": close + 3.1415926,
+            "Low": close - 2.7182818, "Close": close, "Volume": 150000 + i * 37,
+            "Dividends": 0.0, "Stock Splits": 0.0}
+
+
+def make_snapshot(day, last_close=None, symbols=10):
+    """Snapshot with a rolling 22-bar history per symbol"""
+    quotes = {}
+    for j in range(symbols):
+        history = [make_bar(i + j) for i in range(day, day + 22)]
+        if last_close is not None:
+            history[-1] = make_bar(day + 21 + j, close=last_close + j)
+        last = history[-1]
+        quotes[f"S{j}"] = {
+            "symbol": f"S{j}", "current_price": last["Close"], "change": last["Close"] - history[-2]["Close"],
+            "change_percent": 0.5, "high": last["High"], "low": last["Low"], "volume": last["Volume"],
+            "timestamp": f"2024-01-{day + 1:02d}T{last_close or 0}", "historical_data": history
+        }
+    return {"stocks": quotes, "timestamp": f"2024-01-{day + 1:02d}T{last_close or 0}"}
+
+
+class TestDiff:
+    """Test cases for diff/apply"""
+
+    def test_round_trip_shares_unchanged_subtrees(self):
+        """Test apply(old, diff(old, new)) == new without touching old"""
+        old, new = make_snapshot(0), make_snapshot(1)
+        new["stocks"]["S3"]["extra"] = {"a": 1}
+        del new["stocks"]["S4"]["volume"]
+        result = apply(old, diff(old, new))
+
+        assert result == new
+        assert old == make_snapshot(0)
+        same = make_snapshot(0)
+        assert apply(same, diff(same, same)) is same
+
+    def test_rolling_history_is_spliced(self):
+        """Test a shifted history window is encoded as one splice"""
+        old, new = make_snapshot(0), make_snapshot(1)
+        delta = diff(old["stocks"]["S0"]["historical_data"], new["stocks"]["S0"]["historical_data"])
+        assert delta == ["l", 1, 21, [new["stocks"]["S0"]["historical_data"][-1]]]
+
+    def test_intraday_delta_is_small(self):
+        """Test an intraday update costs well under 10% of a full snapshot"""
+        old, new = make_snapshot(5, last_close=120.0), make_snapshot(5, last_close=121.0)
+        delta = diff(old, new)
+        assert apply(old, delta) == new
+        assert len(minify_json(delta)) < 0.1 * len(minify_json(new))
+
+    def test_type_change_and_root_replacement(self):
+        """Test values changing type are replaced"""
+        assert apply({"a": [1]}, diff({"a": [1]}, {"a": {"b": 1}})) == {"a": {"b": 1}}
+        assert apply([1, 2], diff([1, 2], [3])) == [3]
+        assert diff({"a": [1, 2]}, {"a": [1, 2]}) == {}
+
+
+class TestDeltaStore:
+    """Test cases for DeltaStore"""
+
+    def test_keyframes_and_reconstruction(self, tmp_path):
+        """Test versions are stored as keyframes plus deltas and rebuilt exactly"""
+        store = DeltaStore(str(tmp_path), keyframe_interval=4)
+        snapshots = [make_snapshot(day) for day in range(10)]
+        assert [store.append(snapshot) for snapshot in snapshots] == list(range(10))
+        assert store.index["keyframes"] == [0, 4, 8]
+        assert sorted(os.listdir(tmp_path))[:3] == ["d_1.json", "d_2.json", "d_3.json"]
+
+        reopened = DeltaStore(str(tmp_path), keyframe_interval=4)
+        assert all(reopened.get(version) == snapshot for version, snapshot in enumerate(snapshots))
+        assert reopened.latest() == snapshots[-1]
+        with pytest.raises(KeyError):
+            reopened.get(10)
+
+    def test_delta_since(self, tmp_path):
+        """Test clients receive only what changed since their version"""
+        store = DeltaStore(str(tmp_path), keyframe_interval=4)
+        assert store.delta_since(None) == {"version": None, "snapshot": None}
+        snapshots = [make_snapshot(day) for day in range(7)]
+        for snapshot in snapshots:
+            store.append(snapshot)
+
+        assert store.delta_since(6) == {"version": 6, "delta": {}}
+        for version in (2, 5):
+            response = store.delta_since(version)
+            assert apply(snapshots[version], response["delta"]) == snapshots[6]
+        assert store.delta_since(None)["snapshot"] == snapshots[6]
+        assert store.delta_since(42)["snapshot"] == snapshots[6]
+
+
+    def test_truncate(self, tmp_path):
+        """Test versions before a keyframe are dropped and the rest still load"""
+        store = DeltaStore(str(tmp_path), keyframe_interval=4)
+        snapshots = [make_snapshot(day) for day in range(10)]
+        for snapshot in snapshots:
+            store.append(snapshot)
+        assert [version for version, _ in store.iter_versions(2, 6)] == [2, 3, 4, 5]
+        assert [snapshot for _, snapshot in store.iter_versions(2, 6)] == snapshots[2:6]
+
+        with pytest.raises(KeyError):
+            store.truncate(5)
+        assert store.truncate(4) == 4
+        assert store.first_version == 4 and sorted(os.listdir(tmp_path))[0] == "d_5.json"
+
+        # Một tiến trình khác vẫn giữ index cũ trong bộ nhớ
+        stale = DeltaStore(str(tmp_path), keyframe_interval=4)
+        stale.index["keyframes"].insert(0, 0)
+        assert stale.append(make_snapshot(10)) == 10
+        reopened = DeltaStore(str(tmp_path), keyframe_interval=4)
+        assert reopened.index["keyframes"] == [4, 8]
+        assert reopened.get(9) == snapshots[9]
+        with pytest.raises(KeyError):
+            reopened.get(3)
+        assert reopened.delta_since(3)["snapshot"] == make_snapshot(10)
+
+class TestDashboardPatch:
+    """Test cases for sending deltas to the dashboard"""
+
+    def test_to_patch(self):
+        """Test a delta becomes a dash Patch with one operation per change"""
+        pytest.importorskip("dash")
+        from dashboard import to_patch
+
+        old, new = {"a": {"b": 1, "c": 2}, "h": [1, 2, 3]}, {"a": {"b": 5}, "h": [2, 3, 4]}
+        operations = to_patch(diff(old, new), old).to_plotly_json()["operations"]
+        assert [(op["operation"], op["location"]) for op in operations] == [
+            ("Assign", ["a", "b"]), ("Delete", ["a", "c"]), ("Delete", ["h", 0]), ("Extend", ["h"])
+        ]
+        assert operations[3]["params"]["value"] == [4]
+
+    def test_to_patch_splice_replays_on_the_client(self):
+        """Test list splices are sent as head/tail deletes plus the new tail only"""
+        pytest.importorskip("dash")
+        from dashboard import to_patch
+
+        old = {"h": list(range(20))}
+        new = {"h": list(range(3, 18)) + [100, 101]}
+        operations = to_patch(diff(old, new), old).to_plotly_json()["operations"]
+
+        # Phát lại các thao tác như dash-renderer
+        replayed = list(old["h"])
+        for op in operations:
+            if op["operation"] == "Delete":
+                del replayed[op["location"][1]]
+            else:
+                replayed.extend(op["params"]["value"])
+        assert replayed == new["h"]
+        assert all(len(op["params"].get("value", [])) <= 2 for op in operations)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
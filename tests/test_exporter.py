@@ -0,0 +1,81 @@
+"""
+Unit tests for the streaming exporter
+"""
+
+import pytest
+import os
+import sys
+import json
+import tempfile
+import pandas as pd
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from exporter import export_bars, export_quotes, export_snapshots, iter_snapshot_files, read_snapshots
+from storage import DataStore
+
+
+class TestExporter:
+    """Test cases for chunked CSV/Parquet export"""
+
+    def setup_method(self):
+        """Setup a store with bars for two symbols"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = DataStore(os.path.join(self.tmpdir, "test.db"))
+        index = pd.date_range("2024-01-01", periods=25, freq="D", tz="UTC")
+        for offset, symbol in enumerate(["BBB", "AAA"]):
+            self.store.save_bars(symbol, pd.DataFrame({
+                "Open": 1.0, "High": 2.0, "Low": 0.5, "Close": range(offset, offset + 25), "Volume": 10
+            }, index=index))
+
+    def teardown_method(self):
+        self.store.close()
+
+    def test_bars_stream_in_chunks(self):
+        """Test chunked bar export covers the range in symbol/time order"""
+        path = os.path.join(self.tmpdir, "bars.csv")
+        start = int(pd.Timestamp("2024-01-05", tz="UTC").timestamp())
+        assert export_bars(path, self.store, start=start, chunk_size=7) == 42
+
+        frame = pd.read_csv(path)
+        assert list(frame.columns) == ["symbol", "timestamp", "open", "high", "low", "close", "volume"]
+        assert frame["symbol"].tolist() == ["AAA"] * 21 + ["BBB"] * 21
+        assert frame["timestamp"].iloc[0] == "2024-01-05T00:00:00Z"
+        assert frame["close"].iloc[-1] == 24
+
+    def test_empty_export_writes_header(self):
+        """Test an empty range still yields a file with the schema"""
+        path = os.path.join(self.tmpdir, "quotes.csv")
+        assert export_quotes(path, self.store) == 0
+        assert pd.read_csv(path).columns[0] == "symbol"
+
+    def test_snapshots_use_fixed_schema(self):
+        """Test snapshot files stream with the first snapshot's columns"""
+        for i, extra in enumerate([{}, {"new_key": 1}]):
+            snapshot = {"timestamp": f"2024-01-0{i + 1}",
+                        "fx": {"eur_usd": {"current_price": 1.1 + i, "historical_data": [{"Close": 1}]}}}
+            snapshot.update(extra)
+            with open(os.path.join(self.tmpdir, f"financial_data_{i}.json"), "w") as f:
+                json.dump(snapshot, f)
+
+        path = os.path.join(self.tmpdir, "snapshots.csv")
+        assert export_snapshots(iter_snapshot_files(self.tmpdir), path, chunk_size=1) == 2
+
+        frame = pd.read_csv(path)
+        assert list(frame.columns) == ["timestamp", "fx_eur_usd_current_price"]
+        assert frame["fx_eur_usd_current_price"].tolist() == [1.1, 2.1]
+
+        restored = list(read_snapshots(path))
+        assert restored[1] == {"timestamp": "2024-01-02", "fx": {"eur_usd": {"current_price": 2.1}}}
+
+    def test_parquet_matches_csv(self):
+        """Test Parquet output has the same rows as CSV"""
+        pytest.importorskip("pyarrow")
+        path = os.path.join(self.tmpdir, "bars.parquet")
+        assert export_bars(path, self.store, symbols=["AAA"], chunk_size=10) == 25
+        assert pd.read_parquet(path)["close"].tolist() == list(range(1, 26))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,105 @@
+"""
+Unit tests for the single-pass GitHub Pages publish pipeline
+"""
+
+import pytest
+import json
+import os
+import sys
+from datetime import datetime
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import our modules
+root = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(root, 'src'))
+sys.path.insert(0, os.path.join(root, 'scripts'))
+
+import config
+import fetch_data_github
+import generate_html_report
+import utils
+from delta import DeltaStore
+from site_builder import SiteBuilder
+
+
+@pytest.fixture
+def snapshot():
+    """Minimal snapshot as returned by fetch_all_data"""
+    return {
+        "precious_metals": {"gold": {"current_price": 2000.0, "change": 5.0, "change_percent": 0.25}},
+        "fx": {"usd_vnd": {"current_price": 24000.0, "change": 10.0, "change_percent": 0.04}},
+        "timestamp": "2024-01-02T09:00:00"
+    }
+
+
+class TestPublishData:
+    """Test cases for publish_data"""
+
+    def test_derived_artifacts_computed_once(self, tmp_path, snapshot):
+        """Test quality and summary are computed once and shared by every output"""
+        with patch.object(fetch_data_github, "get_data_quality_score",
+                          wraps=utils.get_data_quality_score) as quality:
+            written = fetch_data_github.publish_data(snapshot, str(tmp_path),
+                                                     now=datetime(2024, 1, 2, 9, 0))
+        assert quality.call_count == 1
+
+        data_dir = tmp_path / "data"
+        latest = (data_dir / "latest_data.json").read_bytes()
+        assert json.loads(latest) == snapshot
+        assert json.loads((data_dir / "snapshots" / "k_0.json").read_bytes()) == snapshot
+
+        summary = json.loads((data_dir / "summary_data.json").read_text(encoding="utf-8"))
+        history = json.loads((data_dir / "historical_data.json").read_text(encoding="utf-8"))
+        assert history[-1]["data"] == summary
+        assert set(summary["assets"]) == {"gold", "usd_vnd"}
+        assert "latest_report.txt" in written
+
+        manifest = json.loads((data_dir / "manifest.json").read_text(encoding="utf-8"))
+        assert manifest["snapshots"] == {"path": "snapshots", "version": 0, "keyframe": 0}
+        hashed = manifest["files"]["latest_data.json"]["file"]
+        assert (data_dir / hashed).read_bytes() == latest
+        assert not list(data_dir.glob("*.tmp"))
+
+    def test_history_is_appended_and_bounded(self, tmp_path, snapshot):
+        """Test history grows by one entry per run up to HISTORY_LENGTH"""
+        with patch.object(fetch_data_github, "HISTORY_LENGTH", 2):
+            for hour in range(3):
+                fetch_data_github.publish_data(snapshot, str(tmp_path),
+                                               now=datetime(2024, 1, 2, hour))
+        history = json.loads((tmp_path / "data" / "historical_data.json").read_text(encoding="utf-8"))
+        assert [entry["timestamp"] for entry in history] == ["2024-01-02T01:00:00", "2024-01-02T02:00:00"]
+
+    def test_snapshot_store_is_bounded(self, tmp_path, snapshot):
+        """Test only the last SNAPSHOT_KEYFRAMES keyframes and their deltas are kept"""
+        with patch.object(fetch_data_github, "SNAPSHOT_KEYFRAMES", 2), \
+                patch.object(config, "DELTA_KEYFRAME_INTERVAL", 2):
+            for hour in range(10):
+                snapshot["precious_metals"]["gold"]["current_price"] = 2000.0 + hour
+                fetch_data_github.publish_data(snapshot, str(tmp_path), now=datetime(2024, 1, 2, hour))
+
+        snapshots = tmp_path / "data" / "snapshots"
+        assert sorted(path.name for path in snapshots.iterdir()) == [
+            "d_7.json", "d_9.json", "index.json", "k_6.json", "k_8.json"
+        ]
+        assert DeltaStore(str(snapshots)).get(9)["precious_metals"]["gold"]["current_price"] == 2009.0
+        manifest = json.loads((tmp_path / "data" / "manifest.json").read_text(encoding="utf-8"))
+        assert manifest["snapshots"] == {"path": "snapshots", "version": 9, "keyframe": 8}
+
+
+class TestGenerateHtmlPage:
+    """Test cases for the incremental index page"""
+
+    def test_rerun_with_same_data_skips_index(self, tmp_path, snapshot):
+        """Test the per-run timestamp alone does not rebuild index.html"""
+        builder = SiteBuilder(output_dir=str(tmp_path / "docs"), cache_dir=str(tmp_path / "cache"))
+        first = fetch_data_github.create_summary_data(snapshot, now=datetime(2024, 1, 2, 9, 0))
+        second = fetch_data_github.create_summary_data(snapshot, now=datetime(2024, 1, 2, 9, 30))
+        assert generate_html_report.generate_html_page(first, builder) is True
+        assert generate_html_report.generate_html_page(second, builder) is False
+
+        snapshot["precious_metals"]["gold"]["current_price"] = 2010.0
+        changed = fetch_data_github.create_summary_data(snapshot, now=datetime(2024, 1, 2, 10, 0))
+        assert generate_html_report.generate_html_page(changed, builder) is True
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,117 @@
+"""
+Unit tests for gap detection and repair
+"""
+
+import pytest
+import os
+import sys
+import tempfile
+from unittest.mock import MagicMock
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from gaps import GapScanner, missing_ranges, infer_market
+from storage import DataStore
+
+
+def bars_for(dates):
+    """Daily bars stamped at midnight New York time"""
+    index = pd.DatetimeIndex(dates).tz_localize("America/New_York")
+    return pd.DataFrame({
+        "Open": 1.0, "High": 1.0, "Low": 1.0, "Close": 1.0, "Volume": 1
+    }, index=index)
+
+
+class TestGaps:
+    """Test cases for gap detection"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = DataStore(os.path.join(self.tmpdir, "test.db"))
+
+    def teardown_method(self):
+        self.store.close()
+
+    def test_infer_market(self):
+        """Test market inference from symbol suffixes"""
+        assert infer_market("EURUSD=X") == "FX"
+        assert infer_market("VNM.VN") == "VN"
+        assert infer_market("CL=F") == "FUTURES"
+        assert infer_market("AAPL") == "US"
+        assert infer_market("CSUSHPISA") == "FRED"
+
+    def test_fred_series_have_no_gaps(self):
+        """Test monthly FRED series are not scanned against daily sessions"""
+        self.store.save_bars("CSUSHPISA", bars_for(["2024-01-01", "2024-02-01", "2024-03-01"]))
+
+        assert GapScanner(self.store).find_gaps("CSUSHPISA", end="2024-03-02") == []
+        fetcher = MagicMock()
+        GapScanner(self.store, fetcher).repair({"CSUSHPISA": [("2024-01-02", "2024-02-01")]})
+        fetcher.fetch_yahoo_batch.assert_not_called()
+
+    def test_repair_uses_the_universe_market(self):
+        """Test repair follows the market configured in the universe, not the inferred one"""
+        fetcher = MagicMock()
+        fetcher.fetch_yahoo_batch.return_value = {}
+        gaps = {"MORTGAGE30US": [("2024-01-02", "2024-02-01")]}
+        universe = [{"symbol": "MORTGAGE30US", "market": "FRED"}]
+
+        GapScanner(self.store, fetcher).repair(gaps, universe)
+        fetcher.fetch_yahoo_batch.assert_not_called()
+        GapScanner(self.store, fetcher).repair(gaps)
+        fetcher.fetch_yahoo_batch.assert_called_once()
+
+    def test_fx_bars_stamped_at_london_midnight(self):
+        """Test FX bars stamped at 00:00 London (23:00 UTC in summer) keep their date"""
+        index = pd.DatetimeIndex(["2024-06-06", "2024-06-07", "2024-06-10"]).tz_localize("Europe/London")
+        bars = pd.DataFrame({"Open": 1.0, "High": 1.0, "Low": 1.0, "Close": 1.0, "Volume": 0}, index=index)
+        self.store.save_bars("EURUSD=X", bars)
+
+        assert GapScanner(self.store).find_gaps("EURUSD=X", end="2024-06-11") == []
+
+    def test_missing_ranges_are_minimal(self):
+        """Test consecutive missing sessions collapse into one range"""
+        expected = np.arange("2024-01-01", "2024-01-11", dtype="datetime64[D]")
+        present = expected[[0, 1, 5, 9]]
+
+        assert missing_ranges(expected, present) == [
+            ("2024-01-03", "2024-01-06"),
+            ("2024-01-07", "2024-01-10"),
+        ]
+        assert missing_ranges(expected, present, merge_within=1) == [
+            ("2024-01-03", "2024-01-10"),
+        ]
+
+    def test_find_gaps_ignores_weekends(self):
+        """Test weekends are not reported as gaps"""
+        # 2024-01-05 is a Friday, 2024-01-08 a Monday
+        self.store.save_bars("AAPL", bars_for(["2024-01-04", "2024-01-05", "2024-01-08", "2024-01-11"]))
+
+        gaps = GapScanner(self.store).find_gaps("AAPL", end="2024-01-12")
+        assert gaps == [("2024-01-09", "2024-01-11")]
+
+    def test_repair_batches_identical_ranges(self):
+        """Test symbols sharing a gap are repaired with one request"""
+        fetcher = MagicMock()
+        fetcher.fetch_yahoo_batch.return_value = {
+            "AAA": bars_for(["2024-01-09"]), "BBB": bars_for(["2024-01-09"])
+        }
+        scanner = GapScanner(self.store, fetcher)
+
+        stats = scanner.repair({
+            "AAA": [("2024-01-09", "2024-01-10")],
+            "BBB": [("2024-01-09", "2024-01-10")],
+        })
+
+        assert stats == {"requests": 1, "rows": 2, "failed": 0}
+        fetcher.fetch_yahoo_batch.assert_called_once_with(
+            ["AAA", "BBB"], start="2024-01-09", end="2024-01-10"
+        )
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,189 @@
+"""
+Unit tests for vectorized technical indicators
+"""
+
+import pytest
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from indicators import compute_indicator_panel, compute_indicators, history_closes, rolling_mean, rolling_std, IndicatorState
+from models import Bars
+from utils import calculate_technical_indicators
+
+
+class TestIndicatorPanel:
+    """Test cases for the panel indicator engine"""
+
+    def setup_method(self):
+        """Setup a random walk panel with very different price levels"""
+        rng = np.random.default_rng(42)
+        steps = rng.normal(0, 1, size=(120, 3))
+        self.prices = np.cumsum(steps, axis=0) + np.array([100.0, 40000.0, 1.1])
+
+    def test_last_row_matches_scalar_version(self):
+        """Test the panel agrees with calculate_technical_indicators per symbol"""
+        panel = compute_indicator_panel(self.prices, windows=(10, 20))
+
+        for window in (10, 20):
+            for column in range(self.prices.shape[1]):
+                expected = calculate_technical_indicators(self.prices[:, column].tolist(), window)
+                for name in ("sma", "ema", "volatility", "rsi"):
+                    assert panel[name][window][-1, column] == pytest.approx(expected[name], rel=1e-9, abs=1e-9)
+
+    def test_rolling_series_alignment(self):
+        """Test full series are aligned and NaN before the first window"""
+        sma = rolling_mean(self.prices, 5)
+        assert sma.shape == self.prices.shape
+        assert np.isnan(sma[:4]).all()
+        np.testing.assert_allclose(sma[4:, 0], np.convolve(self.prices[:, 0], np.ones(5) / 5, "valid"))
+
+    def test_nan_only_poisons_its_window(self):
+        """Test a missing price only affects windows that contain it"""
+        prices = self.prices.copy()
+        prices[50, 1] = np.nan
+        std = rolling_std(prices, 5)
+
+        assert np.isnan(std[50:55, 1]).all()
+        assert not np.isnan(std[55:, 1]).any()
+        np.testing.assert_allclose(std[60, 1], np.std(prices[56:61, 1]))
+
+
+class TestFusedIndicators:
+    """Test cases for the fused extended indicator pass"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(3)
+        close = np.cumsum(rng.normal(0, 1, 150)) + 100
+        index = pd.date_range("2024-01-01", periods=150, freq="D")
+        self.frame = pd.DataFrame({
+            "Open": close, "High": close + rng.uniform(0, 2, 150),
+            "Low": close - rng.uniform(0, 2, 150), "Close": close, "Volume": 1
+        }, index=index)
+
+    def test_matches_pandas_reference(self):
+        """Test every output against a straightforward pandas computation"""
+        out = compute_indicators(Bars.from_dataframe(self.frame), window=20)
+        close, high, low = self.frame["Close"], self.frame["High"], self.frame["Low"]
+
+        sma = close.rolling(20).mean()
+        std = close.rolling(20).std(ddof=0)
+        macd = close.ewm(span=12).mean() - close.ewm(span=26).mean()
+        prev = close.shift(1)
+        true_range = pd.concat([high - low, (high - prev).abs(), (low - prev).abs()], axis=1).max(axis=1)
+        returns = close.pct_change()
+
+        expected = {
+            "sma": sma,
+            "bollinger_upper": sma + 2 * std,
+            "macd": macd,
+            "macd_signal": macd.ewm(span=9).mean(),
+            "atr": true_range.ewm(alpha=1 / 20, adjust=False).mean(),
+            "drawdown": close / close.rolling(20, min_periods=1).max() - 1,
+            "sharpe": returns.rolling(20).mean() / returns.rolling(20).std(ddof=0) * np.sqrt(252),
+        }
+        for name, series in expected.items():
+            np.testing.assert_allclose(out[name][:, 0], series.to_numpy(), rtol=1e-7, atol=1e-9,
+                                       err_msg=name)
+
+    def test_only_requested_outputs(self):
+        """Test only the requested indicators are emitted"""
+        out = compute_indicators(self.frame["Close"].to_numpy(), indicators=["drawdown"])
+        assert list(out) == ["drawdown"]
+
+        with pytest.raises(ValueError):
+            compute_indicators(self.frame["Close"].to_numpy(), indicators=["atr"])
+
+
+class TestIndicatorState:
+    """Test cases for streaming indicators"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(7)
+        self.prices = (np.cumsum(rng.normal(0, 1, 200)) + 40000).tolist()
+
+    def test_matches_batch_computation(self):
+        """Test O(1) updates agree with the full recomputation"""
+        state = IndicatorState(window=14)
+        for price in self.prices:
+            values = state.update(price)
+
+        series = pd.Series(self.prices)
+        assert values["sma"] == pytest.approx(np.mean(self.prices[-14:]), rel=1e-12)
+        assert values["volatility"] == pytest.approx(np.std(self.prices[-14:]), rel=1e-6)
+        assert values["ema"] == pytest.approx(series.ewm(span=14).mean().iloc[-1], rel=1e-12)
+
+        # Wilder RSI reference
+        deltas = np.diff(self.prices)
+        gains, losses = np.clip(deltas, 0, None), np.clip(-deltas, 0, None)
+        avg_gain, avg_loss = gains[:14].mean(), losses[:14].mean()
+        for gain, loss in zip(gains[14:], losses[14:]):
+            avg_gain = (avg_gain * 13 + gain) / 14
+            avg_loss = (avg_loss * 13 + loss) / 14
+        assert values["rsi"] == pytest.approx(100 - 100 / (1 + avg_gain / avg_loss), rel=1e-9)
+
+    def test_same_bar_revises_instead_of_appending(self):
+        """Test ticks within one bar only keep the latest price"""
+        live = IndicatorState(window=5)
+        final = IndicatorState(window=5)
+        for day, price in enumerate(self.prices[:30]):
+            live.update(price - 3, bar_key=str(day))
+            live.update(price + 1, bar_key=str(day))
+            live.update(price, bar_key=str(day))
+            final.update(price, bar_key=str(day))
+
+        for name, value in final.values().items():
+            assert live.values()[name] == pytest.approx(value, rel=1e-9)
+
+    def test_serialization_round_trip(self):
+        """Test state restored from JSON continues identically"""
+        original = IndicatorState(window=10)
+        for price in self.prices[:50]:
+            original.update(price)
+
+        restored = IndicatorState.from_dict(json.loads(json.dumps(original.to_dict())))
+        for price in self.prices[50:]:
+            original.update(price)
+            restored.update(price)
+
+        assert restored.values() == original.values()
+
+    def test_non_finite_prices_are_skipped(self):
+        """Test a failed quote (NaN/inf/None) does not poison the running sums"""
+        clean = IndicatorState(window=10)
+        noisy = IndicatorState(window=10)
+        for day, price in enumerate(self.prices[:40]):
+            clean.update(price, bar_key=str(day))
+            noisy.update(price, bar_key=str(day))
+            if day % 7 == 0:
+                noisy.update(float("nan"), bar_key=str(day + 1000))
+                noisy.update(float("inf"), bar_key=str(day))
+                noisy.update(None)
+
+        assert noisy.values() == clean.values()
+        assert all(value is not None and np.isfinite(value) for value in noisy.values().values())
+
+    def test_seed_from_history(self):
+        """Test seeding from fetched history matches feeding the same bars live"""
+        records = [{"Open": price, "Close": price} for price in self.prices[:30]]
+        columns = {"index": [str(i) for i in range(30)], "tz": None, "Close": self.prices[:30]}
+        bars = Bars(np.arange(30).astype("datetime64[D]").astype("datetime64[ns]"),
+                    {"Close": np.array(self.prices[:30])})
+
+        live = IndicatorState(window=14)
+        for price in self.prices[:30]:
+            live.update(price)
+        for history in (records, columns, bars):
+            seeded = IndicatorState(window=14).seed(history_closes(history), bar_key="today")
+            assert seeded.values() == pytest.approx(live.values(), rel=1e-12)
+            # Giá cùng ngày sửa bar cuối thay vì thêm bar mới
+            assert seeded.update(self.prices[29], bar_key="today") == pytest.approx(live.values(), rel=1e-12)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,65 @@
+"""
+Import-time budget tests for lightweight entry points
+"""
+
+import pytest
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+
+# Các thư viện nặng không được phép bị import bởi entry point nhẹ
+HEAVY_MODULES = ["pandas", "numpy", "dash", "plotly", "yfinance"]
+
+# Thời gian import tối đa (giây), đủ rộng cho máy CI chậm
+IMPORT_BUDGET = 0.5
+
+
+def run_isolated(code, cwd=SRC):
+    """Run code in a fresh interpreter and return its JSON output"""
+    script = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        f"{code}\n"
+        "elapsed = time.perf_counter() - started\n"
+        f"heavy = [name for name in {HEAVY_MODULES!r} if name in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], cwd=cwd, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class TestLazyImports:
+    """Test cases for lazy loading"""
+
+    def test_utils_and_config_stay_light(self):
+        """Test formatting helpers load without heavy dependencies"""
+        result = run_isolated(
+            "import config, utils\n"
+            "utils.format_currency(1234.5)\n"
+            "utils.flatten_dict({'a': {'b': 1}})\n"
+            "utils.get_data_quality_score({'gold': {'symbol': 'GC=F', 'current_price': 1.0}})"
+        )
+        assert result["heavy"] == []
+        assert result["elapsed"] < IMPORT_BUDGET
+
+    def test_package_attributes_load_on_demand(self):
+        """Test importing the package itself imports none of its submodules"""
+        result = run_isolated("import src\nassert 'Dashboard' in dir(src)", cwd=ROOT)
+        assert result["heavy"] == []
+
+    def test_heavy_modules_load_when_used(self):
+        """Test the proxies import the real module on first use"""
+        result = run_isolated(
+            "import utils\n"
+            "assert utils.calculate_technical_indicators([1.0, 2.0, 3.0], window=2)['sma'] == 2.5"
+        )
+        assert "numpy" in result["heavy"]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
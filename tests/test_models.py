@@ -0,0 +1,108 @@
+"""
+Unit tests for compact Quote and Bars records
+"""
+
+import pytest
+import os
+import sys
+import json
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from models import Quote, Bars
+from financial_data_fetcher import FinancialDataFetcher, json_default
+from utils import calculate_technical_indicators
+
+
+def make_history():
+    """Ticker.history-like frame"""
+    index = pd.date_range("2024-01-02", periods=4, freq="D", tz="America/New_York")
+    return pd.DataFrame({
+        "Open": [1.0, 2.0, 3.0, 4.0],
+        "High": [1.5, 2.5, 3.5, 4.5],
+        "Low": [0.5, 1.5, 2.5, 3.5],
+        "Close": [1.0, 2.0, 3.0, 5.0],
+        "Volume": np.array([10, 20, 30, 40], dtype=np.int64),
+        "Dividends": [0.0, 0.0, 0.0, 0.0],
+    }, index=index)
+
+
+class TestModels:
+    """Test cases for Quote and Bars"""
+
+    def test_quote_is_slotted(self):
+        """Test Quote has no per-instance dict"""
+        quote = Quote("AAPL", 1.0, 0.0, 0.0, 1.0, 1.0, 0, "2024-01-01T00:00:00")
+        assert not hasattr(quote, "__dict__")
+        assert Quote.from_dict(quote.to_dict()) == quote
+
+    def test_bars_match_legacy_records(self):
+        """Test the legacy conversion equals to_dict('records')"""
+        hist = make_history()
+        bars = Bars.from_dataframe(hist)
+
+        assert bars.to_records() == hist.to_dict('records')
+        assert bars.close.dtype == np.float64
+        assert bars.to_dataframe().equals(hist)
+
+    def test_indicators_accept_bars(self):
+        """Test technical indicators read the Close column of Bars"""
+        bars = Bars.from_dataframe(make_history())
+        assert calculate_technical_indicators(bars, window=3) == \
+            calculate_technical_indicators([1.0, 2.0, 3.0, 5.0], window=3)
+
+
+class TestFetcherEdgeConversion:
+    """Test cases for the legacy dict produced by the fetcher"""
+
+    @patch('yfinance.Ticker')
+    def test_fetch_yahoo_finance_data(self, mock_ticker):
+        """Test the legacy dict shape is preserved"""
+        mock_ticker.return_value.history.return_value = make_history()
+
+        result = FinancialDataFetcher().fetch_yahoo_finance_data("AAPL", period="5d")
+
+        assert result["current_price"] == 5.0
+        assert result["change"] == 2.0
+        assert result["volume"] == 40
+        assert result["historical_data"] == make_history().to_dict('records')
+
+    @patch('yfinance.Ticker')
+    def test_columns_history_keeps_index(self, mock_ticker):
+        """Test the column-oriented format keeps timestamps and round-trips"""
+        mock_ticker.return_value.history.return_value = make_history()
+
+        result = FinancialDataFetcher().fetch_yahoo_finance_data("AAPL", history_format="columns")
+        history = result["historical_data"]
+
+        assert history["index"][0] == "2024-01-02T00:00:00"
+        assert history["tz"] == "America/New_York"
+        assert history["Close"] == [1.0, 2.0, 3.0, 5.0]
+        restored = Bars.from_columns(json.loads(json.dumps(history)))
+        assert restored.datetime_index().equals(make_history().index)
+
+    @patch('yfinance.Ticker')
+    def test_bars_history_is_lazy(self, mock_ticker):
+        """Test the bars format defers conversion until serialization"""
+        mock_ticker.return_value.history.return_value = make_history()
+
+        result = FinancialDataFetcher().fetch_yahoo_finance_data("AAPL", history_format="bars")
+
+        assert isinstance(result["historical_data"], Bars)
+        assert json.loads(json.dumps(result, default=json_default))["historical_data"]["Close"][-1] == 5.0
+
+    @patch('yfinance.Ticker')
+    def test_fetch_yahoo_finance_data_empty(self, mock_ticker):
+        """Test empty history still reports an error dict"""
+        mock_ticker.return_value.history.return_value = pd.DataFrame()
+
+        result = FinancialDataFetcher().fetch_yahoo_finance_data("NOPE")
+        assert result == {"error": "No data found for NOPE"}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
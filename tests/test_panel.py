@@ -0,0 +1,70 @@
+"""
+Unit tests for the time-aligned panel builder
+"""
+
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from panel import PanelBuilder, asof_align, series_kind
+
+
+class TestAsofAlign:
+    """Test cases for the searchsorted as-of join"""
+
+    def test_latest_value_within_tolerance(self):
+        """Test each target takes the last observation no older than tolerance"""
+        times = np.array(["2024-01-01", "2024-01-05"], dtype="datetime64[ns]")
+        target = np.array(["2023-12-31", "2024-01-01", "2024-01-03", "2024-01-05", "2024-01-09"],
+                          dtype="datetime64[ns]")
+        result = asof_align(target, times, np.array([1.0, 2.0]), np.timedelta64(3, "D"))
+
+        np.testing.assert_array_equal(result, [np.nan, 1.0, 1.0, 2.0, np.nan])
+
+
+class TestPanelBuilder:
+    """Test cases for PanelBuilder"""
+
+    def test_series_kind(self):
+        """Test symbols map to their forward-fill rule"""
+        assert series_kind("AAPL") == "equity"
+        assert series_kind("EURUSD=X") == "fx"
+        assert series_kind("GC=F") == "futures"
+        assert series_kind("CPIAUCSL") == "macro"
+
+    def test_sessions_align_on_local_trading_date(self):
+        """Test a VN session and a US session of the same date share a row"""
+        builder = PanelBuilder()
+        vn = pd.DatetimeIndex(["2024-03-04 00:00", "2024-03-05 00:00"]).tz_localize("Asia/Ho_Chi_Minh")
+        us = pd.DatetimeIndex(["2024-03-04 16:00", "2024-03-05 16:00"]).tz_localize("America/New_York")
+        builder.add_series("VNI", vn.tz_convert("UTC"), [1200.0, 1210.0], timezone="Asia/Ho_Chi_Minh")
+        builder.add_series("SPX", us.tz_convert("UTC"), [5100.0, 5080.0], timezone="America/New_York")
+
+        panel = builder.build()
+        assert list(panel.index) == list(pd.to_datetime(["2024-03-04", "2024-03-05"]))
+        assert panel.loc["2024-03-05"].tolist() == [1210.0, 5080.0]
+
+    def test_fill_rules_per_kind(self):
+        """Test monthly macro data carries forward but stale equities do not"""
+        builder = PanelBuilder()
+        builder.add_series("CPI", pd.to_datetime(["2024-01-01"]), [310.0], kind="macro")
+        builder.add_series("AAA", pd.to_datetime(["2024-01-02"]), [10.0], kind="equity")
+        target = pd.bdate_range("2024-01-02", "2024-01-31")
+
+        panel = builder.build(index=target)
+        assert (panel["CPI"] == 310.0).all()
+        assert panel["AAA"].loc["2024-01-05"] == 10.0
+        assert np.isnan(panel["AAA"].loc["2024-01-15"])
+
+        exact = builder.build(index=target, fill=False)
+        assert exact["CPI"].isna().all()
+        assert exact["AAA"].notna().sum() == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
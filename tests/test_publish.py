@@ -0,0 +1,76 @@
+"""
+Unit tests for precompressed, content-hashed publishing
+"""
+
+import pytest
+import gzip
+import json
+import os
+import sys
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from publish import MANIFEST_FILE, Publisher, compress_file, minify_json
+
+
+class TestPublisher:
+    """Test cases for Publisher"""
+
+    def test_minified_hashed_and_compressed(self, tmp_path):
+        """Test a payload is written minified under a content hash with a .gz sibling"""
+        publisher = Publisher(str(tmp_path))
+        payload = {"price": 1.5, "name": "Vàng"}
+        file_name = publisher.publish_json("summary_data.json", payload)
+
+        assert file_name.startswith("summary_data.") and file_name.endswith(".json")
+        raw = (tmp_path / file_name).read_bytes()
+        assert raw == minify_json(payload)
+        assert b" " not in raw
+        assert gzip.decompress((tmp_path / (file_name + ".gz")).read_bytes()) == raw
+
+        assert publisher.publish_json("summary_data.json", {"name": "Vàng", "price": 1.5}) != file_name
+
+    def test_manifest_keeps_current_and_previous(self, tmp_path):
+        """Test the manifest maps names to hashed files and prunes old versions"""
+        publisher = Publisher(str(tmp_path))
+        first = publisher.publish_json("a.json", [1])
+        publisher.write_manifest()
+        second = publisher.publish_json("a.json", [2])
+        publisher.write_manifest()
+        third = publisher.publish_json("a.json", [3])
+        publisher.write_manifest(generated_at="now")
+
+        manifest = json.loads((tmp_path / MANIFEST_FILE).read_text(encoding="utf-8"))
+        assert manifest["files"]["a.json"] == {"file": third, "bytes": 3, "previous": second}
+        assert manifest["generated_at"] == "now"
+        assert not (tmp_path / first).exists() and not (tmp_path / (first + ".gz")).exists()
+        assert (tmp_path / second).exists()
+
+    def test_manifest_is_shared_between_publishers(self, tmp_path):
+        """Test separate build steps add to the same manifest"""
+        data = Publisher(str(tmp_path))
+        data.publish_json("summary_data.json", {})
+        data.write_manifest()
+
+        charts = Publisher(str(tmp_path))
+        chart = tmp_path / "chart.html"
+        chart.write_text("<html></html>", encoding="utf-8")
+        charts.publish_file(str(chart))
+        charts.write_manifest()
+
+        assert set(Publisher(str(tmp_path)).manifest["files"]) == {"summary_data.json", "chart.html"}
+
+    def test_compress_file(self, tmp_path):
+        """Test compressed siblings of an immutable file"""
+        bundle = tmp_path / "bundle-1.0.js"
+        bundle.write_bytes(b"var x = 1;" * 100)
+        siblings = compress_file(str(bundle))
+        assert gzip.decompress(open(siblings[".gz"], "rb").read()) == bundle.read_bytes()
+        if ".br" in siblings:
+            brotli = pytest.importorskip("brotli")
+            assert brotli.decompress(open(siblings[".br"], "rb").read()) == bundle.read_bytes()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,196 @@
+"""
+Unit tests for snapshot retention and compaction
+"""
+
+import pytest
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from chunkstore import ChunkStore
+from delta import DeltaStore
+from retention import RetentionEngine, RetentionPolicy, snapshot_time
+
+NOW = datetime(2024, 6, 30, 12, 0, 0)
+
+
+def snapshot_name(stamp):
+    return f"financial_data_{stamp.strftime('%Y%m%d_%H%M%S')}.json"
+
+
+def make_snapshot(stamp):
+    bars = [{"Date": f"2024-01-{i + 1:02d}", "Close": 100.0 + i} for i in range(20)]
+    return {"timestamp": stamp.isoformat(),
+            "precious_metals": {"gold": {"symbol": "GC=F", "current_price": stamp.hour + stamp.minute / 60,
+                                         "historical_data": bars}}}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    chunks = ChunkStore(str(tmp_path / "chunks"), snapshot_dir=str(data_dir))
+    deltas = DeltaStore(str(tmp_path / "deltas"), keyframe_interval=4)
+    return RetentionEngine(str(data_dir), str(tmp_path / "archive"), chunks=chunks, batch_size=10,
+                           archive_format="csv", deltas=deltas)
+
+
+def write_snapshots(engine, stamps):
+    for stamp in stamps:
+        engine.chunks.save_snapshot(make_snapshot(stamp), os.path.join(engine.data_dir, snapshot_name(stamp)))
+
+
+def kept_times(engine):
+    return sorted(engine.snapshot_times().values())
+
+
+class TestRetentionPolicy:
+    """Test cases for RetentionPolicy"""
+
+    def test_snapshot_time(self):
+        assert snapshot_time("data/financial_data_20240630_120501.json") == datetime(2024, 6, 30, 12, 5, 1)
+        assert snapshot_time("data/financial_data_20240630_120501_v7.json") == datetime(2024, 6, 30, 12, 5, 1)
+        assert snapshot_time("data/financial_data_latest.json") is None
+
+    def test_tiers(self):
+        recent = [NOW - timedelta(minutes=5 * i) for i in range(1, 12)]
+        hourly = [NOW - timedelta(days=2, minutes=10 * i) for i in range(12)]
+        daily = [NOW - timedelta(days=60, hours=i) for i in range(0, 10, 3)]
+        stamps = {snapshot_name(stamp): stamp for stamp in recent + hourly + daily}
+
+        evicted = set(RetentionPolicy().evictions(stamps, NOW))
+        kept = sorted(stamp for name, stamp in stamps.items() if name not in evicted)
+
+        assert set(recent) <= set(kept)
+        # Mỗi giờ (trong 30 ngày) và mỗi ngày (sau đó) còn đúng một snapshot, là bản mới nhất
+        assert [stamp for stamp in kept if stamp in hourly] == [max(s for s in hourly if s.hour == hour)
+                                                                 for hour in sorted({s.hour for s in hourly})]
+        assert [stamp for stamp in kept if stamp in daily] == [max(daily)]
+
+    def test_kept_snapshot_stays_kept(self):
+        stamps = {snapshot_name(NOW - timedelta(days=1, minutes=m)): NOW - timedelta(days=1, minutes=m)
+                  for m in (5, 20, 70)}
+        kept = set(stamps) - set(RetentionPolicy().evictions(stamps, NOW))
+        later = NOW + timedelta(days=40)
+        assert set(RetentionPolicy().evictions({name: stamps[name] for name in kept}, later)) <= kept
+        assert len(kept - set(RetentionPolicy().evictions({name: stamps[name] for name in kept}, later))) == 1
+
+
+class TestRetentionEngine:
+    """Test cases for RetentionEngine"""
+
+    def test_run_compacts_in_batches(self, engine):
+        # 12:00, 11:55, ..., 09:05 ba ngày trước: bốn giờ
+        stamps = [NOW - timedelta(days=3, minutes=5 * i) for i in range(36)]
+        write_snapshots(engine, stamps)
+
+        result = engine.run(NOW)
+        assert result["compacted"] == 32
+        assert len(kept_times(engine)) == 4
+        assert len(engine.archives()) == 4
+        assert engine.plan(NOW) == []
+
+        archived = list(engine.iter_archived())
+        assert len(archived) == 32
+        assert {row["timestamp"] for row in archived} == \
+            {stamp.isoformat() for stamp in stamps} - {stamp.isoformat() for stamp in kept_times(engine)}
+        assert all(row["precious_metals"]["gold"]["current_price"] is not None for row in archived)
+
+    def test_kept_snapshots_still_load(self, engine):
+        stamps = [NOW - timedelta(days=3, minutes=5 * i) for i in range(6)]
+        write_snapshots(engine, stamps)
+        engine.run(NOW)
+        engine.chunks.collect_garbage(grace_seconds=0)
+        for path in engine.snapshot_times():
+            snapshot = engine.chunks.load_snapshot(path)
+            assert len(snapshot["precious_metals"]["gold"]["historical_data"]) == 20
+
+    def test_other_files_are_untouched(self, engine):
+        other = os.path.join(engine.data_dir, "universe.csv")
+        with open(other, "w") as f:
+            f.write("symbol\n")
+        write_snapshots(engine, [NOW - timedelta(days=3, minutes=m) for m in (5, 10)])
+        engine.run(NOW)
+        assert os.path.exists(other)
+
+    def test_archive_schema_covers_the_whole_batch(self, engine):
+        stamps = [NOW - timedelta(days=3, minutes=5 * i) for i in range(1, 6)]
+        for position, stamp in enumerate(sorted(stamps)):
+            snapshot = make_snapshot(stamp)
+            # Cột chỉ xuất hiện từ snapshot thứ ba, cột có giá trị đầu tiên là None
+            snapshot["precious_metals"]["gold"]["change"] = None if position == 0 else 1.5 * position
+            if position >= 2:
+                snapshot["precious_metals"]["silver"] = {"symbol": "SI=F", "current_price": 20.0 + position}
+            engine.chunks.save_snapshot(snapshot, os.path.join(engine.data_dir, snapshot_name(stamp)))
+
+        assert engine.run(NOW)["compacted"] == 4
+        archived = sorted(engine.iter_archived(), key=lambda row: row["timestamp"])
+        assert [row["precious_metals"]["gold"]["change"] for row in archived] == [None, 1.5, 3.0, 4.5]
+        assert [row["precious_metals"].get("silver", {}).get("current_price") for row in archived] == \
+            [None, None, 22.0, 23.0]
+
+    def test_snapshot_that_does_not_round_trip_is_kept(self, engine):
+        stamps = [NOW - timedelta(days=3, minutes=5 * i) for i in range(1, 4)]
+        write_snapshots(engine, stamps)
+        odd = os.path.join(engine.data_dir, snapshot_name(stamps[1]))
+        snapshot = make_snapshot(stamps[1])
+        # Giá trị không phải số trong cột số không đọc lại được y nguyên từ CSV
+        snapshot["precious_metals"]["gold"]["volume"] = "n/a"
+        snapshot["precious_metals"]["gold"]["tags"] = ["a", "b"]
+        engine.chunks.save_snapshot(snapshot, odd)
+
+        result = engine.run(NOW)
+        assert result["compacted"] == 1
+        assert odd in engine.skipped and os.path.exists(odd)
+        assert engine.chunks.load_snapshot(odd) == snapshot
+        assert [row["timestamp"] for row in engine.iter_archived()] == [stamps[2].isoformat()]
+
+    def test_old_delta_versions_are_released(self, engine):
+        # Mỗi 30 phút một phiên bản trong ba ngày, keyframe mỗi 4 phiên bản
+        stamps = [NOW - timedelta(minutes=30 * i) for i in range(143, -1, -1)]
+        for stamp in stamps:
+            engine.deltas.append(make_snapshot(stamp))
+
+        result = engine.run(NOW)
+        store = DeltaStore(engine.deltas.directory, keyframe_interval=4)
+        first = store.first_version
+        # Phiên bản 95 (24 giờ trước) là bản cũ nhất trong cửa sổ, keyframe của nó là 92
+        assert first == 92 and result["deltas_released"] == 92
+        assert store.get(first) == make_snapshot(stamps[first])
+        assert sorted(store.index["timestamps"], key=int) == [str(v) for v in range(first, 144)]
+        assert not os.path.exists(os.path.join(store.directory, "k_0.json"))
+
+        # Các phiên bản cũ theo cùng tầng lưu giữ với snapshot: mỗi giờ một bản
+        released = {stamp.isoformat() for stamp in stamps[:first]}
+        kept = {stamp.isoformat() for stamp in kept_times(engine)}
+        archived = {row["timestamp"] for row in engine.iter_archived()}
+        assert kept | archived == released and not kept & archived
+        assert len(kept) == len({stamp.replace(minute=0) for stamp in stamps[:first]})
+        assert len(archived) > 0
+
+        # Lượt sau không còn gì để chuyển
+        assert engine.run(NOW)["deltas_released"] == 0
+
+    def test_versions_in_the_same_second_are_all_released(self, engine):
+        stamp = NOW - timedelta(days=2)
+        for version in range(8):
+            snapshot = make_snapshot(stamp)
+            snapshot["precious_metals"]["gold"]["current_price"] = float(version)
+            engine.deltas.append(snapshot)
+        engine.deltas.append(make_snapshot(NOW))
+
+        assert engine.release_deltas(NOW) == 8
+        assert engine.deltas.first_version == 8
+        prices = sorted(engine.chunks.load_snapshot(path)["precious_metals"]["gold"]["current_price"]
+                        for path in engine.snapshot_times())
+        assert prices == [float(version) for version in range(8)]
+
+    def test_start_runs_in_background(self, engine):
+        write_snapshots(engine, [NOW - timedelta(days=40, hours=h) for h in range(3)])
+        thread = engine.start()
+        thread.join(timeout=30)
+        assert not thread.is_alive()
+        assert len(kept_times(engine)) == 1
@@ -0,0 +1,88 @@
+"""
+Unit tests for the OHLCV rollup engine
+"""
+
+import pytest
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from rollup import RollupEngine, select_resolution
+from storage import DataStore
+
+
+def minute_bars(start, periods, seed=0):
+    """Random intraday bars every 15 minutes"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=periods, freq="15min", tz="UTC")
+    close = 100 + np.cumsum(rng.normal(0, 0.5, periods))
+    return pd.DataFrame({
+        "Open": close - 0.1, "High": close + rng.uniform(0, 1, periods),
+        "Low": close - rng.uniform(0, 1, periods), "Close": close,
+        "Volume": rng.integers(1, 100, periods).astype(float)
+    }, index=index)
+
+
+class TestRollupEngine:
+    """Test cases for RollupEngine"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = DataStore(os.path.join(self.tmpdir, "test.db"))
+        self.engine = RollupEngine(self.store)
+
+    def teardown_method(self):
+        self.store.close()
+
+    def test_daily_rollup_matches_resample(self):
+        """Test daily buckets follow the market time zone and match pandas"""
+        bars = minute_bars("2024-03-01", 96 * 20)
+        self.store.save_bars("AAPL", bars)
+        _, daily = self.engine.query("AAPL", resolution="1d")
+
+        local = bars.tz_convert("America/New_York")
+        expected = local.resample("1D").agg({
+            "Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"
+        }).dropna()
+        expected.index = expected.index.tz_convert("UTC")
+        pd.testing.assert_frame_equal(daily, expected, check_freq=False, check_index_type=False,
+                                      check_names=False)
+
+    def test_incremental_refresh_equals_full_rebuild(self):
+        """Test refreshing after new bars equals rebuilding from scratch"""
+        bars = minute_bars("2024-01-25", 96 * 20, seed=1)
+        self.store.save_bars("AAPL", bars.iloc[:1000])
+        assert self.engine.refresh() > 0
+        assert self.engine.refresh() == 0
+
+        self.store.save_bars("AAPL", bars.iloc[1000:])
+        self.engine.refresh()
+        incremental = {res: self.store.load_rollups("AAPL", res) for res in ("1h", "1w", "1mo")}
+
+        self.engine.rebuild("AAPL")
+        for res, frame in incremental.items():
+            pd.testing.assert_frame_equal(frame, self.store.load_rollups("AAPL", res), check_dtype=False)
+        assert incremental["1mo"]["Count"].sum() == len(bars)
+
+    def test_query_routing(self):
+        """Test queries pick the coarsest resolution that satisfies them"""
+        assert select_resolution(86400 * 30, max_points=2000) == "1h"
+        assert select_resolution(86400 * 365 * 20, max_points=2000) == "1w"
+        assert select_resolution(86400 * 365, interval=86400) == "1d"
+        assert select_resolution(86400, interval=60) == "raw"
+
+        self.store.save_bars("AAPL", minute_bars("2024-01-01", 96 * 60))
+        resolution, frame = self.engine.query("AAPL", max_points=50)
+        assert resolution == "1w"
+        assert len(frame) <= 50
+        assert list(frame.columns) == ["Open", "High", "Low", "Close", "Volume"]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
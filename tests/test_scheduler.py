@@ -0,0 +1,116 @@
+"""
+Unit tests for the scheduler's indicator updates
+"""
+
+import pytest
+import os
+import sys
+import logging
+from unittest.mock import MagicMock
+import pandas as pd
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+import config
+from indicators import IndicatorState
+from models import Bars
+
+SATURDAY = pd.Timestamp("2026-10-17 15:00", tz="UTC")
+SUNDAY = pd.Timestamp("2026-10-18 15:00", tz="UTC")
+MONDAY_OPEN = pd.Timestamp("2026-10-19 15:00", tz="UTC")
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    """Scheduler with a mocked fetcher (the module logs to a file in the cwd)"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "INDICATOR_STATE_FILE", str(tmp_path / "indicator_state.json"))
+    import scheduler as scheduler_module
+
+    instance = scheduler_module.FinancialDataScheduler.__new__(scheduler_module.FinancialDataScheduler)
+    instance.fetcher = MagicMock()
+    instance.logger = logging.getLogger("test_scheduler")
+    instance.indicators = {}
+    return instance
+
+
+def history_until(last_day, sessions=30):
+    """Daily bars stamped at midnight New York time, one close per session"""
+    index = pd.bdate_range(end=last_day, periods=sessions).tz_localize("America/New_York")
+    closes = [100.0 + i for i in range(sessions)]
+    return pd.DataFrame({
+        "Open": closes, "High": closes, "Low": closes, "Close": closes, "Volume": 1
+    }, index=index)
+
+
+def expected_values(*updates):
+    """Indicators seeded from history_until("2026-10-16"), then fed (price, bar_key) updates"""
+    closes = history_until("2026-10-16")["Close"].tolist()
+    state = IndicatorState(config.INDICATOR_WINDOW).seed(closes[-config.INDICATOR_WINDOW:], "2026-10-16")
+    for price, bar_key in updates:
+        state.update(price, bar_key)
+    return state.values()
+
+
+def quote(price, history=None):
+    return {"stock_indices": {"dow_jones": {
+        "symbol": "^DJI", "current_price": price, "historical_data": history or []
+    }}}
+
+
+class TestUpdateIndicators:
+    """Test cases for session-keyed indicator bars"""
+
+    def test_new_symbol_seeds_from_a_window_length_fetch(self, scheduler):
+        scheduler.fetcher.fetch_yahoo_batch.return_value = {"^DJI": history_until("2026-10-16")}
+
+        scheduler.update_indicators(quote(129.0), now=SATURDAY)
+
+        symbols = scheduler.fetcher.fetch_yahoo_batch.call_args[0][0]
+        start = pd.Timestamp(scheduler.fetcher.fetch_yahoo_batch.call_args[1]["start"])
+        assert symbols == ["^DJI"]
+        assert (SATURDAY.tz_localize(None) - start).days >= config.INDICATOR_WINDOW * 7 / 5
+        state = scheduler.indicators["^DJI"]
+        assert len(state.rolling.values) == config.INDICATOR_WINDOW
+        assert state.bar_key == "2026-10-16"
+        assert os.path.exists(config.INDICATOR_STATE_FILE)
+
+    def test_weekend_runs_revise_the_last_session(self, scheduler):
+        scheduler.fetcher.fetch_yahoo_batch.return_value = {"^DJI": history_until("2026-10-16")}
+
+        scheduler.update_indicators(quote(140.0), now=SATURDAY)
+        scheduler.update_indicators(quote(141.0), now=SUNDAY)
+
+        state = scheduler.indicators["^DJI"]
+        assert state.bar_key == "2026-10-16"
+        assert state.values() == pytest.approx(expected_values((141.0, "2026-10-16")))
+        scheduler.fetcher.fetch_yahoo_batch.assert_called_once()
+
+    def test_session_run_appends_a_new_bar(self, scheduler):
+        scheduler.fetcher.fetch_yahoo_batch.return_value = {"^DJI": history_until("2026-10-16")}
+        scheduler.update_indicators(quote(129.0), now=SATURDAY)
+
+        scheduler.update_indicators(quote(131.0), now=MONDAY_OPEN)
+
+        state = scheduler.indicators["^DJI"]
+        assert state.bar_key == "2026-10-19"
+        assert state.values() == pytest.approx(expected_values((131.0, "2026-10-19")))
+
+    def test_bar_key_comes_from_the_history_timestamp(self, scheduler):
+        bars = Bars.from_dataframe(history_until("2026-10-16"))
+
+        # Thứ Hai nhưng bar cuối vẫn là phiên thứ Sáu
+        assert scheduler.session_key("US", bars.to_columns(), now=MONDAY_OPEN) == "2026-10-16"
+        assert scheduler.session_key("US", bars, now=MONDAY_OPEN) == "2026-10-16"
+        assert scheduler.session_key("US", [], now=MONDAY_OPEN) == "2026-10-19"
+
+    def test_failed_seed_is_retried(self, scheduler):
+        scheduler.fetcher.fetch_yahoo_batch.side_effect = [RuntimeError("offline"), {}]
+
+        scheduler.update_indicators(quote(129.0), now=SATURDAY)
+        assert "^DJI" not in scheduler.indicators
+
+        scheduler.update_indicators(quote(129.0), now=SATURDAY)
+        assert scheduler.indicators["^DJI"].bar_key == "2026-10-16"
+        assert len(scheduler.indicators["^DJI"].rolling.values) == 1
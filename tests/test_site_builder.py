@@ -0,0 +1,85 @@
+"""
+Unit tests for the incremental static site builder
+"""
+
+import pytest
+import os
+import sys
+from unittest.mock import MagicMock
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from site_builder import SiteBuilder, fingerprint, plotly_bundle_name
+
+
+@pytest.fixture
+def site(tmp_path):
+    """Template and output directories for a throwaway site"""
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "page.html").write_text("<p>{{ value }}</p>", encoding="utf-8")
+    return tmp_path
+
+
+def make_builder(site):
+    return SiteBuilder(output_dir=str(site / "out"), template_dir=str(site / "templates"),
+                       cache_dir=str(site / "cache"))
+
+
+class TestSiteBuilder:
+    """Test cases for SiteBuilder"""
+
+    def test_fingerprint_is_order_independent(self):
+        """Test dict key order does not change the fingerprint"""
+        assert fingerprint({"a": 1, "b": 2}) == fingerprint({"b": 2, "a": 1})
+        assert fingerprint({"a": 1}) != fingerprint({"a": 2})
+
+    def test_unchanged_pages_are_skipped(self, site):
+        """Test a page is only re-rendered when its data or template changes"""
+        builder = make_builder(site)
+        assert builder.render_page("page.html", "page.html", value=1) is True
+        builder.save_state()
+        assert (site / "out" / "page.html").read_text(encoding="utf-8") == "<p>1</p>"
+
+        builder = make_builder(site)
+        assert builder.render_page("page.html", "page.html", value=1) is False
+        assert builder.render_page("page.html", "page.html", value=2) is True
+
+        (site / "templates" / "page.html").write_text("<b>{{ value }}</b>", encoding="utf-8")
+        assert builder.render_page("page.html", "page.html", value=2) is True
+        assert (site / "out" / "page.html").read_text(encoding="utf-8") == "<b>2</b>"
+
+    def test_missing_output_is_rebuilt(self, site):
+        """Test a deleted output is rebuilt even if its fingerprint is stored"""
+        builder = make_builder(site)
+        builder.render_page("page.html", "page.html", value=1)
+        os.remove(site / "out" / "page.html")
+        assert builder.render_page("page.html", "page.html", value=1) is True
+
+    def test_fingerprint_inputs_replace_context(self, site):
+        """Test context outside the fingerprint inputs does not force a rebuild"""
+        builder = make_builder(site)
+        assert builder.render_page("page.html", "page.html", inputs={"stable": 1}, value=1) is True
+        assert builder.render_page("page.html", "page.html", inputs={"stable": 1}, value=2) is False
+        assert builder.render_page("page.html", "page.html", inputs={"stable": 2}, value=2) is True
+        assert (site / "out" / "page.html").read_text(encoding="utf-8") == "<p>2</p>"
+
+    def test_chart_uses_shared_bundle(self, site):
+        """Test charts reference one shared Plotly bundle and build lazily"""
+        go = pytest.importorskip("plotly.graph_objects")
+        builder = make_builder(site)
+        make_figure = MagicMock(side_effect=lambda: go.Figure(go.Bar(x=["a"], y=[1])))
+
+        assert builder.write_chart("charts/a.html", make_figure, [1]) is True
+        assert builder.write_chart("charts/a.html", make_figure, [1]) is False
+        assert make_figure.call_count == 1
+
+        html = (site / "out" / "charts" / "a.html").read_text(encoding="utf-8")
+        assert f'src="{plotly_bundle_name()}"' in html
+        assert len(html) < 100_000
+        assert (site / "out" / "charts" / plotly_bundle_name()).exists()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
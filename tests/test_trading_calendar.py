@@ -0,0 +1,77 @@
+"""
+Unit tests for trading calendars
+"""
+
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from datetime import date
+
+from trading_calendar import TradingCalendar, lunar_to_solar, vn_holidays
+
+
+class TestTradingCalendar:
+    """Test cases for TradingCalendar"""
+
+    def setup_class(self):
+        self.us = TradingCalendar("US", 2023, 2025)
+        self.vn = TradingCalendar("VN", 2023, 2025)
+        self.fx = TradingCalendar("FX", 2023, 2025)
+
+    def test_us_holidays_and_half_days(self):
+        """Test NYSE holidays, observed days and early closes"""
+        sessions = self.us.sessions("2024-11-25", "2024-12-03")
+        assert "2024-11-28" not in sessions.astype(str)  # Thanksgiving
+        assert not self.us.is_session("2024-03-29")  # Good Friday
+        assert not self.us.is_session("2023-01-02")  # New Year observed
+
+        # Day after Thanksgiving closes at 13:00 New York time
+        close = self.us.next_close("2024-11-29 15:00Z")
+        assert close == pd.Timestamp("2024-11-29 13:00", tz="America/New_York")
+
+    def test_time_zone_correct_open(self):
+        """Test opening hours follow the exchange time zone and DST"""
+        assert self.us.is_open("2024-07-01 13:31Z")       # 09:31 EDT
+        assert not self.us.is_open("2024-01-02 14:00Z")   # 09:00 EST
+        assert self.us.next_open("2024-01-02 14:00Z") == pd.Timestamp("2024-01-02 14:30Z")
+
+        # VN lunch break
+        assert self.vn.is_open("2024-03-04 03:00Z")       # 10:00 ICT
+        assert not self.vn.is_open("2024-03-04 05:00Z")   # 12:00 ICT
+        assert self.vn.next_open("2024-03-04 05:00Z") == pd.Timestamp("2024-03-04 06:00Z")
+        assert not self.vn.is_session("2024-02-12")       # Tết
+
+    def test_fx_runs_continuously_through_the_week(self):
+        """Test FX sessions merge from Sunday evening to Friday evening"""
+        assert self.fx.is_open("2024-03-06 12:00Z")
+        assert not self.fx.is_open("2024-03-09 12:00Z")   # Saturday
+        assert self.fx.next_close("2024-03-04 12:00Z") == pd.Timestamp("2024-03-08 17:00", tz="America/New_York")
+        assert self.fx.next_open("2024-03-09 12:00Z") == pd.Timestamp("2024-03-10 17:00", tz="America/New_York")
+        np.testing.assert_array_equal(
+            self.fx.sessions("2024-03-04", "2024-03-11"),
+            pd.bdate_range("2024-03-04", "2024-03-08").values.astype("datetime64[D]")
+        )
+
+    def test_vn_lunar_holidays_outside_configured_years(self):
+        """Test Tết and Hùng Kings are computed for any year"""
+        assert lunar_to_solar(1, 1, 2019) == date(2019, 2, 5)
+        # 2030: trăng mới lúc 23:07 giờ Hà Nội, Tết sớm hơn Trung Quốc một ngày
+        assert lunar_to_solar(1, 1, 2030) == date(2030, 2, 2)
+
+        holidays = vn_holidays(2026)
+        assert {date(2026, 2, d) for d in range(16, 21)} <= holidays
+        assert date(2026, 4, 27) in holidays                 # Giỗ Tổ 10/3 âm lịch
+
+        vn = TradingCalendar("VN", 2019, 2019)
+        sessions = vn.sessions("2019-02-01", "2019-02-13").astype(str)
+        assert list(sessions) == ["2019-02-01", "2019-02-11", "2019-02-12"]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
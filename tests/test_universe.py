@@ -0,0 +1,107 @@
+"""
+Unit tests for universe loading and batched universe fetches
+"""
+
+import pytest
+import os
+import sqlite3
+import sys
+import tempfile
+from unittest.mock import patch
+import pandas as pd
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from universe import load_universe, batched
+from storage import DataStore
+from financial_data_fetcher import FinancialDataFetcher
+
+
+def make_history(start_price, periods=3):
+    """Build a small OHLCV frame"""
+    index = pd.date_range("2024-01-02", periods=periods, freq="D", tz="America/New_York")
+    close = [start_price + i for i in range(periods)]
+    return pd.DataFrame({
+        "Open": close, "High": close, "Low": close, "Close": close,
+        "Volume": [1000] * periods
+    }, index=index)
+
+
+class TestUniverse:
+    """Test cases for universe helpers"""
+
+    def test_batched(self):
+        """Test batch splitting keeps order and remainder"""
+        assert list(batched(["a", "b", "c", "d", "e"], 2)) == [["a", "b"], ["c", "d"], ["e"]]
+        with pytest.raises(ValueError):
+            list(batched(["a"], 0))
+
+    def test_load_csv_universe(self):
+        """Test loading a CSV universe with duplicates and comments"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
+            f.write("symbol,name,market\n# comment\nAAPL,Apple,US\nVNM.VN,Vinamilk,VN\nAAPL,Apple,US\n")
+            path = f.name
+
+        try:
+            universe = load_universe(path)
+            assert [entry["symbol"] for entry in universe] == ["AAPL", "VNM.VN"]
+            assert universe[1]["market"] == "VN"
+        finally:
+            os.unlink(path)
+
+    def test_load_text_universe(self):
+        """Test loading a plain text universe"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+            f.write("AAPL\nMSFT\n\n")
+            path = f.name
+
+        try:
+            assert [entry["symbol"] for entry in load_universe(path)] == ["AAPL", "MSFT"]
+        finally:
+            os.unlink(path)
+
+
+class TestFetchUniverse:
+    """Test cases for FinancialDataFetcher.fetch_universe_data"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = DataStore(os.path.join(self.tmpdir, "test.db"))
+        self.fetcher = FinancialDataFetcher()
+
+    def teardown_method(self):
+        self.store.close()
+
+    def test_streams_batches_into_store(self):
+        """Test every batch is written to the store"""
+        def fake_batch(symbols, period="1d"):
+            return {
+                symbol: (pd.DataFrame() if symbol == "BAD" else make_history(100))
+                for symbol in symbols
+            }
+
+        with patch.object(self.fetcher, 'fetch_yahoo_batch', side_effect=fake_batch):
+            stats = self.fetcher.fetch_universe_data(
+                ["AAA", "BBB", "BAD", "CCC", "DDD"],
+                store=self.store, batch_size=2, max_workers=2
+            )
+
+        assert stats == {"batches": 3, "succeeded": 4, "failed": 1}
+        assert sorted(self.store.symbols()) == ["AAA", "BBB", "CCC", "DDD"]
+        assert len(self.store.load_bars("AAA")) == 3
+        assert self.store.latest_quote("CCC")["current_price"] == 102
+
+    def test_default_store_is_closed(self):
+        """Test a store opened by the fetcher is closed again"""
+        with patch('financial_data_fetcher.DataStore', return_value=self.store) as opened, \
+                patch.object(self.fetcher, 'fetch_yahoo_batch', return_value={"AAA": make_history(100)}):
+            self.fetcher.fetch_universe_data(["AAA"], batch_size=1, max_workers=1)
+        opened.assert_called_once_with()
+        with pytest.raises(sqlite3.ProgrammingError):
+            self.store.symbols()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
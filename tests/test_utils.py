@@ -0,0 +1,232 @@
+"""
+Unit tests for utility functions
+"""
+
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+import utils
+from models import Bars
+from utils import FlattenSchema, clean_financial_data, flatten_dict, get_data_quality_score, unflatten_dict
+
+
+def snapshot(history):
+    return {
+        "timestamp": "2024-01-02T10:00:00",
+        "precious_metals": {
+            "gold": {"symbol": "GC=F", "current_price": 2050.5, "change": float("nan"),
+                     "historical_data": history},
+            "silver": {"error": "Error fetching SI=F"},
+        },
+        "bond_yields": {"us_10y": {"value": 4.1, "date": None}},
+    }
+
+
+class TestDataQualityScore:
+    """Test cases for get_data_quality_score"""
+
+    def setup_method(self):
+        close = np.linspace(100, 110, 50)
+        self.frame = pd.DataFrame({"Open": close, "High": close, "Low": close,
+                                   "Close": close, "Volume": 1.0},
+                                  index=pd.date_range("2024-01-01", periods=50, tz="UTC"))
+        utils._quality_cache.clear()
+
+    def test_counts_fields_and_history_points(self):
+        """Test scalar counting and vectorized history validation"""
+        quality = get_data_quality_score(snapshot(self.frame.to_dict("records")))
+
+        # timestamp, gold (4 fields), silver error, us_10y (2 fields)
+        assert quality["total_fields"] == 8
+        assert quality["error_fields"] == 3
+        assert quality["history_points"] == 50
+        assert quality["invalid_history_points"] == 0
+        assert quality["quality_score"] == pytest.approx(5 / 8 * 100)
+
+    def test_history_formats_agree(self):
+        """Test records, columns and Bars histories score identically"""
+        frame = self.frame.copy()
+        frame.iloc[[3, 7], 1] = np.nan
+        bars = Bars.from_dataframe(frame)
+
+        results = [
+            get_data_quality_score(snapshot(history), use_cache=False)
+            for history in (bars.to_records(), bars.to_columns(), bars)
+        ]
+        for quality in results:
+            assert quality["invalid_history_points"] == 2
+            assert quality["error_fields"] == 4
+        assert results[0] == results[1] == results[2]
+
+    def test_cache_reuses_unchanged_sections(self, monkeypatch):
+        """Test unchanged symbol sections are not re-scored"""
+        data = snapshot(self.frame.to_dict("records"))
+        first = get_data_quality_score(data)
+
+        calls = []
+        original = utils._history_counts
+        monkeypatch.setattr(utils, "_history_counts", lambda h: calls.append(1) or original(h))
+        assert get_data_quality_score(data) == first
+        assert calls == []
+
+        data["precious_metals"]["gold"]["current_price"] = float("inf")
+        changed = get_data_quality_score(data)
+        assert calls == [1]
+        assert changed["error_fields"] == first["error_fields"] + 1
+
+    def test_cache_detects_edits_to_middle_rows(self):
+        """Test an in-place edit inside the history invalidates the cached score"""
+        bars = Bars.from_dataframe(self.frame)
+        for history in (self.frame.to_dict("records"), bars.to_columns(), bars):
+            data = snapshot(history)
+            assert get_data_quality_score(data)["invalid_history_points"] == 0
+
+            if history is bars:
+                close = bars.columns["Close"].copy()
+                close[10] = np.nan
+                bars.columns["Close"] = close
+            elif isinstance(history, dict):
+                history["Close"][10] = None
+            else:
+                history[10]["Close"] = None
+            assert get_data_quality_score(data)["invalid_history_points"] == 1
+
+    def test_cache_is_bounded(self, monkeypatch):
+        """Test the least recently used sections are evicted"""
+        monkeypatch.setattr(utils, "QUALITY_CACHE_SIZE", 2)
+        data = {f"symbol_{i}": {"symbol": f"S{i}", "current_price": float(i)} for i in range(5)}
+
+        get_data_quality_score(data)
+
+        assert len(utils._quality_cache) == 2
+
+
+class TestCleanFinancialData:
+    """Test cases for clean_financial_data"""
+
+    def setup_method(self):
+        self.data = {
+            "gold": {
+                "current_price": float("nan"),
+                "volume": 10,
+                "historical_data": [
+                    {"Date": "2024-01-01", "Close": 1.0, "Volume": float("inf")},
+                    {"Date": "2024-01-02", "Close": float("nan"), "Volume": 5.0},
+                ],
+                "closes": [1.0, float("nan"), 3.0],
+                "labels": ["nan", None],
+                "array": np.array([np.inf, 2.0]),
+            }
+        }
+
+    def test_replaces_non_finite_values_everywhere(self):
+        """Test NaN/inf become None in scalars, records, lists and arrays"""
+        cleaned = clean_financial_data(self.data)
+        gold = cleaned["gold"]
+
+        assert gold["current_price"] is None
+        assert gold["volume"] == 10
+        assert gold["historical_data"][0] == {"Date": "2024-01-01", "Close": 1.0, "Volume": None}
+        assert gold["historical_data"][1]["Close"] is None
+        assert gold["closes"] == [1.0, None, 3.0]
+        assert gold["labels"] == ["nan", None]
+        assert gold["array"] == [None, 2.0]
+
+        # Bản gốc không bị thay đổi
+        assert np.isnan(self.data["gold"]["historical_data"][1]["Close"])
+
+    def test_in_place_and_bars(self):
+        """Test in-place cleaning and Bars conversion"""
+        frame = pd.DataFrame({"Close": [1.0, np.nan]}, index=pd.date_range("2024-01-01", periods=2))
+        self.data["gold"]["bars"] = Bars.from_dataframe(frame)
+
+        history = self.data["gold"]["historical_data"]
+        cleaned = clean_financial_data(self.data, in_place=True)
+
+        assert cleaned is self.data
+        assert cleaned["gold"]["historical_data"] is history
+        assert history[0]["Volume"] is None
+        assert cleaned["gold"]["bars"]["Close"] == [1.0, None]
+
+
+def reference_flatten(d, parent_key='', sep='_'):
+    """Original recursive implementation"""
+    items = []
+    for k, v in d.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        if isinstance(v, dict):
+            items.extend(reference_flatten(v, new_key, sep=sep).items())
+        else:
+            items.append((new_key, v))
+    return dict(items)
+
+
+class TestFlatten:
+    """Test cases for schema-based flattening"""
+
+    def setup_method(self):
+        self.data = {
+            "timestamp": "2024-01-02",
+            "fx": {"eur_usd": {"current_price": 1.1, "change": None}, "empty": {}},
+            "bond_yields": {"us_10y": {"value": 4.1, "history": [1, 2]}},
+        }
+
+    def test_matches_recursive_flatten(self):
+        """Test output equals the recursive version, including shape changes"""
+        assert list(flatten_dict(self.data).items()) == list(reference_flatten(self.data).items())
+        assert flatten_dict(self.data, "root", ".") == reference_flatten(self.data, "root", ".")
+
+        # Cùng key cấp cao nhất nhưng khác hình dạng bên trong
+        self.data["fx"]["eur_usd"] = {"error": "Error fetching"}
+        self.data["bond_yields"]["us_10y"]["value"] = {"raw": 4.1}
+        assert flatten_dict(self.data) == reference_flatten(self.data)
+
+    def test_unflatten_round_trip(self):
+        """Test unflatten restores the nested dict despite separators in keys"""
+        schema = FlattenSchema.compile(self.data)
+        flat = flatten_dict(self.data)
+        expected = {key: value for key, value in self.data.items()}
+        expected["fx"] = {"eur_usd": self.data["fx"]["eur_usd"]}
+        assert unflatten_dict(flat, schema) == expected
+        assert schema.unflatten(schema.values(self.data)) == expected
+
+    def test_lenient_values(self):
+        """Test lenient extraction fills missing paths and ignores extras"""
+        schema = FlattenSchema.compile(self.data, exclude=["history"])
+        other = {"timestamp": "x", "fx": {"eur_usd": "n/a"}, "extra": 1}
+
+        assert schema.values(other) is None
+        assert schema.flatten(other) == {
+            "timestamp": "x", "fx_eur_usd_current_price": None, "fx_eur_usd_change": None,
+            "bond_yields_us_10y_value": None
+        }
+
+    def test_strict_values_reject_other_shapes(self):
+        """Test strict extraction returns None for added, missing or nested keys"""
+        schema = FlattenSchema.compile(self.data)
+        nested = {**self.data, "timestamp": {"raw": "2024-01-02"}}
+        missing = {**self.data, "fx": {"eur_usd": {"current_price": 1.1}, "empty": {}}}
+
+        assert schema.values({**self.data, "extra": 1}) is None
+        assert schema.values(nested) is None
+        assert schema.values(missing) is None
+
+    def test_schema_cache_evicts_least_recently_used(self, monkeypatch):
+        """Test the schema cache keeps recently used shapes when full"""
+        monkeypatch.setattr(utils, "FLATTEN_SCHEMA_CACHE_SIZE", 2)
+        monkeypatch.setattr(utils, "_flatten_schemas", utils.OrderedDict())
+
+        for shape in ({"a": 1}, {"b": 1}, {"a": 2}, {"c": 1}):
+            flatten_dict(shape)
+
+        assert list(utils._flatten_schemas) == [("_", ("a",)), ("_", ("c",))]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])